@@ -0,0 +1,163 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+from archinstall.lib.disk.fs_tuning import DeviceTopology
+from archinstall.lib.disk.fstab import target_mounts
+from archinstall.lib.disk.utils import underlying_disks
+from archinstall.lib.hardware import read_meminfo
+from archinstall.lib.log import debug, info
+from archinstall.lib.models.application import PerformanceConfiguration, PerformanceTuning
+from archinstall.lib.translationhandler import tr
+
+if TYPE_CHECKING:
+	from archinstall.lib.installer import Installer
+
+# Background writeback starts once the slowest disk has about a second worth of
+# dirty data and writers are throttled at twice that, which bounds the stall of
+# an fsync. The percentage defaults allow gigabytes on machines with a lot of memory.
+_BACKGROUND_WRITEBACK_SECONDS: Final = 1
+_BACKGROUND_WRITEBACK_MEMORY_SHARE: Final = 0.05
+
+_UDEV_RULES: Final = 'etc/udev/rules.d/60-ioschedulers.rules'
+_SYSCTL_CONF: Final = 'etc/sysctl.d/98-vm-writeback.conf'
+
+
+@dataclass
+class PerformanceSettings:
+	udev_rules: list[str] = field(default_factory=list)
+	sysctls: dict[str, int] = field(default_factory=dict)
+	kernel_params: list[str] = field(default_factory=list)
+
+
+def probe_disks(devices: Iterable[Path]) -> dict[str, DeviceTopology]:
+	"""
+	The topology of the disks the given block devices are on, rather than of every
+	disk of the machine, which includes the installation medium. Virtual block
+	devices like loop or zram have no device in sysfs.
+	"""
+	disks = {}
+
+	for device in devices:
+		for disk in underlying_disks(device):
+			if (Path('/sys/block') / disk.name / 'device').exists():
+				disks[disk.name] = DeviceTopology.from_device(disk)
+
+	return dict(sorted(disks.items()))
+
+
+def io_scheduler(name: str, topology: DeviceTopology, server: bool) -> str:
+	"""
+	NVMe drives are fastest without a scheduler, as are virtio disks whose requests
+	the host schedules. SATA SSDs only need requests merged and bfq keeps desktops
+	responsive while a hard disk is busy.
+	"""
+	if topology.nvme or name.startswith('vd'):
+		return 'none'
+	if topology.rotational and not server:
+		return 'bfq'
+	return 'mq-deadline'
+
+
+def _udev_rules(server: bool) -> list[str]:
+	nvme = DeviceTopology(rotational=False, nvme=True)
+	ssd = DeviceTopology(rotational=False)
+	hdd = DeviceTopology(rotational=True)
+
+	# partitions share the queue of their disk
+	match = 'ACTION=="add|change", ENV{DEVTYPE}=="disk"'
+
+	return [
+		f'{match}, KERNEL=="nvme[0-9]*|vd[a-z]*", ATTR{{queue/scheduler}}="{io_scheduler("nvme", nvme, server)}"',
+		f'{match}, KERNEL=="sd[a-z]*|mmcblk[0-9]*", ATTR{{queue/rotational}}=="0", ATTR{{queue/scheduler}}="{io_scheduler("sd", ssd, server)}"',
+		f'{match}, KERNEL=="sd[a-z]*", ATTR{{queue/rotational}}=="1", ATTR{{queue/scheduler}}="{io_scheduler("sd", hdd, server)}"',
+	]
+
+
+def dirty_writeback(write_rate: int, mem_total: int) -> dict[str, int]:
+	"""
+	Writeback limits in bytes for the write rate of the slowest disk in bytes/s
+	and the memory in KiB, setting them replaces the vm.dirty_*ratio defaults.
+	"""
+	background = int(min(write_rate * _BACKGROUND_WRITEBACK_SECONDS, mem_total * 1024 * _BACKGROUND_WRITEBACK_MEMORY_SHARE))
+
+	return {
+		'vm.dirty_background_bytes': background,
+		'vm.dirty_bytes': 2 * background,
+	}
+
+
+def performance_settings(
+	config: PerformanceConfiguration,
+	disks: dict[str, DeviceTopology],
+	mem_total: int,
+	server: bool,
+	power_management: bool,
+) -> PerformanceSettings:
+	settings = PerformanceSettings()
+
+	if PerformanceTuning.IO_SCHEDULER in config.tunings:
+		settings.udev_rules = _udev_rules(server)
+
+	if PerformanceTuning.DIRTY_WRITEBACK in config.tunings and disks:
+		settings.sysctls = dirty_writeback(min(t.write_rate for t in disks.values()), mem_total)
+
+	# the default of always makes latency sensitive services like databases stall on compaction
+	if PerformanceTuning.TRANSPARENT_HUGEPAGES in config.tunings and server:
+		settings.kernel_params.append('transparent_hugepage=madvise')
+
+	# power-profiles-daemon and tuned manage the governor themselves
+	if PerformanceTuning.CPU_GOVERNOR in config.tunings and server and not power_management:
+		settings.kernel_params.append('cpufreq.default_governor=performance')
+
+	return settings
+
+
+def performance_preview(config: PerformanceConfiguration, devices: list[Path]) -> str:
+	disks = probe_disks(devices)
+	mem_total = read_meminfo().mem_total
+	lines = []
+
+	if PerformanceTuning.IO_SCHEDULER in config.tunings:
+		for name, topology in disks.items():
+			desktop, server = io_scheduler(name, topology, False), io_scheduler(name, topology, True)
+			scheduler = desktop if desktop == server else tr('{} ({} on servers)').format(desktop, server)
+			lines.append(f'{tr("I/O scheduler")} {name}: {scheduler}')
+
+	settings = performance_settings(config, disks, mem_total, server=True, power_management=False)
+	lines += [f'{key} = {value}' for key, value in settings.sysctls.items()]
+
+	if settings.kernel_params:
+		lines.append(tr('Server profiles: {}').format(' '.join(settings.kernel_params)))
+
+	return '\n'.join(lines)
+
+
+class PerformanceApp:
+	def install(
+		self,
+		install_session: Installer,
+		performance_config: PerformanceConfiguration,
+		server: bool = False,
+		power_management: bool = False,
+	) -> None:
+		debug(f'Applying performance tuning: {", ".join(t.value for t in performance_config.tunings)}')
+
+		devices = [Path(mount.source) for mount in target_mounts(install_session.target) if mount.source.startswith('/dev/')]
+		disks = probe_disks(devices)
+		settings = performance_settings(performance_config, disks, read_meminfo().mem_total, server, power_management)
+
+		if settings.udev_rules:
+			rules = install_session.target / _UDEV_RULES
+			rules.parent.mkdir(parents=True, exist_ok=True)
+			rules.write_text('\n'.join(settings.udev_rules) + '\n')
+
+		if settings.sysctls:
+			info(f'Writeback limits: {settings.sysctls}')
+			sysctl_conf = install_session.target / _SYSCTL_CONF
+			sysctl_conf.parent.mkdir(parents=True, exist_ok=True)
+			sysctl_conf.write_text(''.join(f'{key} = {value}\n' for key, value in settings.sysctls.items()))
+
+		if settings.kernel_params:
+			install_session.add_kernel_params(settings.kernel_params)
@@ -157,6 +157,9 @@ class Profile:
 	def is_desktop_profile(self) -> bool:
 		return self.profile_type == ProfileType.Desktop
 
+	def is_server_profile(self) -> bool:
+		return self.profile_type == ProfileType.Server
+
 	def is_server_type_profile(self) -> bool:
 		return self.profile_type == ProfileType.ServerType
 
@@ -1,6 +1,8 @@
+from pathlib import Path
 from typing import TYPE_CHECKING, override
 
 from archinstall.default_profiles.profile import Profile, ProfileType
+from archinstall.lib.database_tuning import DatabaseResources, fastest_mountpoint, mariadb_settings, prepare_data_dir, write_settings
 
 if TYPE_CHECKING:
 	from archinstall.lib.installer import Installer
@@ -25,4 +27,17 @@ class MariadbProfile(Profile):
 
 	@override
 	def post_install(self, install_session: Installer) -> None:
-		install_session.arch_chroot('mariadb-install-db --user=mysql --basedir=/usr --datadir=/var/lib/mysql')
+		data_dir = Path('/var/lib/mysql')
+		prepare_data_dir(install_session, data_dir, 'mysql')
+
+		# the redo log is written synchronously on every commit
+		redo_log_dir = None
+		if (mountpoint := fastest_mountpoint(install_session.target, data_dir)) is not None:
+			redo_log_dir = mountpoint / 'mysql-redo'
+			prepare_data_dir(install_session, redo_log_dir, 'mysql')
+
+		# mariadb-install-db reads the drop-in as well, it creates the redo log
+		settings = mariadb_settings(DatabaseResources.probe(install_session.target, data_dir), redo_log_dir)
+		write_settings(install_session.target / 'etc/my.cnf.d/archinstall.cnf', settings, '[mysqld]')
+
+		install_session.arch_chroot(f'mariadb-install-db --user=mysql --basedir=/usr --datadir={data_dir}')
@@ -1,6 +1,8 @@
+from pathlib import Path
 from typing import TYPE_CHECKING, override
 
 from archinstall.default_profiles.profile import Profile, ProfileType
+from archinstall.lib.database_tuning import DatabaseResources, fastest_mountpoint, postgresql_settings, prepare_data_dir, write_settings
 
 if TYPE_CHECKING:
 	from archinstall.lib.installer import Installer
@@ -25,4 +27,18 @@ class PostgresqlProfile(Profile):
 
 	@override
 	def post_install(self, install_session: Installer) -> None:
-		install_session.arch_chroot('initdb -D /var/lib/postgres/data', run_as='postgres')
+		data_dir = Path('/var/lib/postgres/data')
+		prepare_data_dir(install_session, data_dir, 'postgres')
+
+		initdb = f'initdb -D {data_dir}'
+
+		# the WAL is written synchronously on every commit
+		if (mountpoint := fastest_mountpoint(install_session.target, data_dir)) is not None:
+			wal_dir = mountpoint / 'postgresql-wal'
+			prepare_data_dir(install_session, wal_dir, 'postgres')
+			initdb += f' --waldir={wal_dir}'
+
+		install_session.arch_chroot(initdb, run_as='postgres')
+
+		settings = postgresql_settings(DatabaseResources.probe(install_session.target, data_dir))
+		write_settings(install_session.target / data_dir.relative_to('/') / 'postgresql.conf', settings, '# Sized for this machine by archinstall')
@@ -4,10 +4,12 @@ from archinstall.applications.audio import AudioApp
 from archinstall.applications.bluetooth import BluetoothApp
 from archinstall.applications.firewall import FirewallApp
 from archinstall.applications.fonts import FontsApp
+from archinstall.applications.performance import PerformanceApp
 from archinstall.applications.power_management import PowerManagementApp
 from archinstall.applications.print_service import PrintServiceApp
 from archinstall.lib.models import Audio
 from archinstall.lib.models.application import ApplicationConfiguration
+from archinstall.lib.models.profile import ProfileConfiguration
 from archinstall.lib.models.users import User
 
 if TYPE_CHECKING:
@@ -18,6 +20,22 @@ class ApplicationHandler:
 	def __init__(self) -> None:
 		pass
 
+	def tune_performance(self, install_session: Installer, app_config: ApplicationConfiguration, profile_config: ProfileConfiguration | None = None) -> None:
+		"""
+		Runs before the bootloader is added, as the tuning extends the kernel command line.
+		"""
+		if not app_config.performance_config:
+			return
+
+		server = profile_config is not None and profile_config.profile is not None and profile_config.profile.is_server_profile()
+
+		PerformanceApp().install(
+			install_session,
+			app_config.performance_config,
+			server=server,
+			power_management=app_config.power_management_config is not None,
+		)
+
 	def install_applications(self, install_session: Installer, app_config: ApplicationConfiguration, users: list[User] | None = None) -> None:
 		if app_config.bluetooth_config and app_config.bluetooth_config.enabled:
 			BluetoothApp().install(install_session)
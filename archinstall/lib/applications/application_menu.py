@@ -1,5 +1,6 @@
 from typing import override
 
+from archinstall.applications.performance import performance_preview
 from archinstall.lib.hardware import SysInfo
 from archinstall.lib.menu.abstract_menu import AbstractSubMenu
 from archinstall.lib.menu.helpers import Confirmation, Selection
@@ -12,10 +13,13 @@ from archinstall.lib.models.application import (
 	FirewallConfiguration,
 	FontPackage,
 	FontsConfiguration,
+	PerformanceConfiguration,
+	PerformanceTuning,
 	PowerManagement,
 	PowerManagementConfiguration,
 	PrintServiceConfiguration,
 )
+from archinstall.lib.models.device import DiskLayoutConfiguration
 from archinstall.lib.translationhandler import tr
 from archinstall.tui.menu_item import MenuItem, MenuItemGroup
 from archinstall.tui.result import ResultType
@@ -25,12 +29,16 @@ class ApplicationMenu(AbstractSubMenu[ApplicationConfiguration]):
 	def __init__(
 		self,
 		preset: ApplicationConfiguration | None = None,
+		disk_config: DiskLayoutConfiguration | None = None,
 	):
 		if preset:
 			self._app_config = preset
 		else:
 			self._app_config = ApplicationConfiguration()
 
+		# the disks the performance tuning is previewed for
+		self._disk_config = disk_config
+
 		menu_options = self._define_menu_options()
 		self._item_group = MenuItemGroup(menu_options, checkmarks=True)
 
@@ -86,6 +94,13 @@ class ApplicationMenu(AbstractSubMenu[ApplicationConfiguration]):
 				preview_action=self._prev_fonts,
 				key='fonts_config',
 			),
+			MenuItem(
+				text=tr('Performance tuning'),
+				action=select_performance,
+				value=self._app_config.performance_config,
+				preview_action=self._prev_performance,
+				key='performance_config',
+			),
 		]
 
 	def _prev_power_management(self, item: MenuItem) -> str | None:
@@ -131,6 +146,14 @@ class ApplicationMenu(AbstractSubMenu[ApplicationConfiguration]):
 			return f'{tr("Additional fonts")}: {packages}'
 		return None
 
+	def _prev_performance(self, item: MenuItem) -> str | None:
+		if item.value is not None:
+			config: PerformanceConfiguration = item.value
+			tunings = ', '.join(t.value for t in config.tunings)
+			devices = [mod.device_path for mod in self._disk_config.device_modifications] if self._disk_config else []
+			return f'{tr("Performance tuning")}: {tunings}\n\n{performance_preview(config, devices)}'
+		return None
+
 
 async def select_power_management(preset: PowerManagementConfiguration | None = None) -> PowerManagementConfiguration | None:
 	group = MenuItemGroup.from_enum(PowerManagement)
@@ -261,3 +284,31 @@ async def select_fonts(preset: FontsConfiguration | None = None) -> FontsConfigu
 			return None
 		case ResultType.Reset:
 			return None
+
+
+async def select_performance(preset: PerformanceConfiguration | None = None) -> PerformanceConfiguration | None:
+	items = [MenuItem(f'{t.value} ({t.description()})', value=t) for t in PerformanceTuning]
+	group = MenuItemGroup(items, sort_items=False)
+
+	if preset:
+		for t in preset.tunings:
+			group.set_selected_by_value(t)
+
+	result = await Selection[PerformanceTuning](
+		group,
+		header=tr('Select the tuning derived from the hardware of this machine'),
+		allow_skip=True,
+		allow_reset=True,
+		multi=True,
+	).show()
+
+	match result.type_:
+		case ResultType.Skip:
+			return preset
+		case ResultType.Selection:
+			selected = result.get_values()
+			if selected:
+				return PerformanceConfiguration(tunings=selected)
+			return None
+		case ResultType.Reset:
+			return None
@@ -41,6 +41,11 @@ from archinstall.tui.components import tui
 
 class SubCommand(Enum):
 	SHARE_LOG = 'share-log'
+	MIRRORS = 'mirrors'
+
+
+class MirrorsCommand(Enum):
+	RANK = 'rank'
 
 
 @p_dataclass
@@ -68,6 +73,12 @@ class Arguments:
 	verbose: bool = False
 
 	command: SubCommand | None = None
+	mirrors_command: MirrorsCommand | None = None
+	rank_regions: list[str] | None = None
+	rank_output: Path | None = None
+	rank_mirrorlist: bool = False
+	rank_limit: int | None = None
+	rank_workers: int = 8
 
 
 class ArchConfigType(StrEnum):
@@ -505,6 +516,50 @@ class ArchConfigHandler:
 		subparsers = self._parser.add_subparsers(dest='command', help='Available subcommands')
 		_ = subparsers.add_parser(SubCommand.SHARE_LOG.value, help='Upload log file to public server')
 
+		mirrors_parser = subparsers.add_parser(SubCommand.MIRRORS.value, help='Mirror tools that run without the installer')
+		mirrors_subparsers = mirrors_parser.add_subparsers(dest='mirrors_command', required=True)
+
+		rank_parser = mirrors_subparsers.add_parser(
+			MirrorsCommand.RANK.value,
+			help='Benchmark mirrors and print the ranking as JSON',
+			formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+		)
+		rank_parser.add_argument(
+			'--regions',
+			dest='rank_regions',
+			nargs='+',
+			default=None,
+			help='Mirror regions to rank (as named in the mirror status, e.g. "Germany"), defaults to all regions',
+		)
+		rank_parser.add_argument(
+			'--output',
+			dest='rank_output',
+			type=Path,
+			default=None,
+			help='Write the result to a file instead of stdout',
+		)
+		rank_parser.add_argument(
+			'--mirrorlist',
+			dest='rank_mirrorlist',
+			action='store_true',
+			default=False,
+			help='Emit a ready to use pacman mirrorlist instead of JSON',
+		)
+		rank_parser.add_argument(
+			'--limit',
+			dest='rank_limit',
+			type=int,
+			default=None,
+			help='Only output the N best mirrors',
+		)
+		rank_parser.add_argument(
+			'--workers',
+			dest='rank_workers',
+			type=int,
+			default=8,
+			help='Number of mirrors benchmarked concurrently',
+		)
+
 	def _define_arguments(self) -> ArgumentParser:
 		parser = ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
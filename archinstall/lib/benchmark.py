@@ -0,0 +1,41 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Final
+
+# Libraries and binaries make up most of an initramfs image and of the installed system
+SAMPLE_GLOBS: Final = ('usr/lib/libsystemd-shared*.so', 'usr/lib/libc.so.6', 'usr/lib/systemd/systemd-udevd', 'usr/bin/bash')
+SAMPLE_SIZE: Final = 4 * 1024**2
+BENCHMARK_ROUNDS: Final = 3
+
+
+def compression_sample(root: Path, size: int = SAMPLE_SIZE) -> bytes:
+	"""
+	A sample of the libraries and binaries below the given root to benchmark compressors on.
+	"""
+	sample = b''
+
+	for pattern in SAMPLE_GLOBS:
+		for path in sorted(root.glob(pattern)):
+			with path.open('rb') as fp:
+				sample += fp.read(size - len(sample))
+
+			if len(sample) >= size:
+				return sample
+
+	return sample
+
+
+def timed(func: Callable[[], object], rounds: int = BENCHMARK_ROUNDS) -> float:
+	"""
+	The fastest of several runs of the function in seconds,
+	the first run usually pays for cold caches.
+	"""
+	timings = []
+
+	for _ in range(rounds):
+		started = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - started)
+
+	return min(timings)
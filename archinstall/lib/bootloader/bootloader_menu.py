@@ -3,7 +3,7 @@ from typing import override
 
 from archinstall.lib.menu.abstract_menu import AbstractSubMenu
 from archinstall.lib.menu.helpers import Confirmation, Selection
-from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration, PlymouthTheme
+from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration, InitramfsCompression, PlymouthTheme
 from archinstall.lib.translationhandler import tr
 from archinstall.tui.menu_item import MenuItem, MenuItemGroup
 from archinstall.tui.result import ResultType
@@ -73,6 +73,20 @@ class BootloaderMenu(AbstractSubMenu[BootloaderConfiguration]):
 				preview_action=self._prev_plymouth,
 				key='plymouth',
 			),
+			MenuItem(
+				text=tr('Initramfs compression'),
+				action=select_initramfs_compression,
+				value=self._bootloader_conf.initramfs_compression,
+				preview_action=self._prev_initramfs_compression,
+				key='initramfs_compression',
+			),
+			MenuItem(
+				text=tr('Fast boot'),
+				action=self._select_fast_boot,
+				value=self._bootloader_conf.fast_boot,
+				preview_action=self._prev_fast_boot,
+				key='fast_boot',
+			),
 		]
 
 	def _prev_bootloader(self, item: MenuItem) -> str | None:
@@ -97,6 +111,32 @@ class BootloaderMenu(AbstractSubMenu[BootloaderConfiguration]):
 			return f'{tr("Plymouth")}: {item.value.value}'
 		return None
 
+	def _prev_initramfs_compression(self, item: MenuItem) -> str | None:
+		if item.value is None:
+			return f'{tr("Initramfs compression")}: {tr("Default")}'
+
+		text = f'{tr("Initramfs compression")}: {item.value.value}'
+
+		if item.value == InitramfsCompression.AUTO:
+			text += '\n\n' + tr('Picks the compression with the shortest load and unpack time on this CPU and boot device')
+
+		return text
+
+	def _prev_fast_boot(self, item: MenuItem) -> str | None:
+		if not item.value:
+			return f'{tr("Fast boot")}: {tr("Disabled")}'
+
+		return (
+			f'{tr("Fast boot")}: {tr("Enabled")}\n\n'
+			+ tr('A systemd based initramfs with only the modules and hooks this machine needs')
+			+ '\n'
+			+ tr('Unified kernel images and no bootloader menu timeout')
+			+ '\n'
+			+ tr('The network is not waited for during boot')
+			+ '\n'
+			+ tr('A systemd-analyze report of the first boot is saved')
+		)
+
 	@override
 	async def show(self) -> BootloaderConfiguration:
 		_ = await super().show()
@@ -173,6 +213,19 @@ class BootloaderMenu(AbstractSubMenu[BootloaderConfiguration]):
 			case ResultType.Reset:
 				raise ValueError('Unhandled result type')
 
+	async def _select_fast_boot(self, preset: bool) -> bool:
+		prompt = tr('Would you like to optimize the installed system for boot time?') + '\n'
+
+		result = await Confirmation(header=prompt, allow_skip=True, preset=preset).show()
+
+		match result.type_:
+			case ResultType.Skip:
+				return preset
+			case ResultType.Selection:
+				return result.get_value()
+			case ResultType.Reset:
+				raise ValueError('Unhandled result type')
+
 	async def _select_removable(self, preset: bool) -> bool:
 		prompt = (
 			tr('Would you like to install the bootloader to the default removable media search location?')
@@ -279,3 +332,24 @@ async def select_plymouth_theme(preset: PlymouthTheme | None = None) -> Plymouth
 			return None
 		case ResultType.Selection:
 			return PlymouthTheme(result.get_value())
+
+
+async def select_initramfs_compression(preset: InitramfsCompression | None = None) -> InitramfsCompression | None:
+	items = [MenuItem(c.value, value=c) for c in InitramfsCompression]
+	group = MenuItemGroup(items, sort_items=False)
+	group.set_focus_by_value(preset)
+
+	result = await Selection[InitramfsCompression](
+		group,
+		header=tr('Select the compression of the initramfs images'),
+		allow_reset=True,
+		allow_skip=True,
+	).show()
+
+	match result.type_:
+		case ResultType.Skip:
+			return preset
+		case ResultType.Reset:
+			return None
+		case ResultType.Selection:
+			return result.get_value()
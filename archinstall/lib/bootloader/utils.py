@@ -69,7 +69,7 @@ def validate_bootloader_layout(
 		# When the ESP is the boot partition but mounted outside /boot and
 		# UKI is disabled, kernels end up on the root filesystem which
 		# Limine cannot access.
-		if not bootloader_config.uki:
+		if not bootloader_config.uki_enabled(SysInfo.has_uefi()):
 			efi_part = next(
 				(p for m in disk_config.device_modifications if (p := m.get_efi_partition())),
 				None,
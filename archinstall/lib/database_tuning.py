@@ -0,0 +1,163 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, Self
+
+from archinstall.lib.command import SysCommand
+from archinstall.lib.disk.fs_tuning import DeviceTopology
+from archinstall.lib.disk.fstab import TargetMount, target_mounts
+from archinstall.lib.exceptions import SysCallError
+from archinstall.lib.hardware import read_meminfo
+from archinstall.lib.log import info, warn
+
+if TYPE_CHECKING:
+	from archinstall.lib.installer import Installer
+
+# File systems a data or WAL directory can be placed on
+_DATA_FILESYSTEMS: Final = ('ext4', 'xfs', 'btrfs', 'f2fs')
+# The database services can't write there, ProtectHome and ProtectSystem=full
+_PROTECTED_DIRS: Final = ('/boot', '/efi', '/etc', '/home', '/root', '/usr')
+_MAX_CONNECTIONS: Final = 100
+# PostgreSQL relies on the page cache as well, InnoDB bypasses it with O_DIRECT
+_POSTGRESQL_SHARED_BUFFERS_SHARE: Final = 0.25
+_POSTGRESQL_CACHE_SHARE: Final = 0.75
+_INNODB_BUFFER_POOL_SHARE: Final = 0.5
+
+
+@dataclass(frozen=True)
+class DatabaseResources:
+	# KiB
+	mem_total: int
+	cores: int
+	rotational: bool
+
+	@classmethod
+	def probe(cls, target: Path, data_dir: Path) -> Self:
+		mount = _mount_of(target_mounts(target), data_dir)
+		rotational = DeviceTopology.from_device(Path(mount.source)).rotational if mount else True
+
+		return cls(
+			mem_total=read_meminfo().mem_total,
+			cores=os.cpu_count() or 1,
+			rotational=rotational,
+		)
+
+	@property
+	def mem_mib(self) -> int:
+		return self.mem_total // 1024
+
+
+def _mount_of(mounts: list[TargetMount], path: Path) -> TargetMount | None:
+	# the last mount wins if several are stacked on the same mountpoint
+	candidates = [mount for mount in mounts if path.is_relative_to(mount.mountpoint)]
+	return max(reversed(candidates), key=lambda mount: len(mount.mountpoint.parts), default=None)
+
+
+def postgresql_settings(resources: DatabaseResources) -> dict[str, str]:
+	shared_buffers = int(resources.mem_mib * _POSTGRESQL_SHARED_BUFFERS_SHARE)
+	# a sort or hash of every connection may use it, several times per query
+	work_mem = max(4, (resources.mem_mib - shared_buffers) // (_MAX_CONNECTIONS * 3))
+	parallel_workers = max(1, min(4, resources.cores // 2))
+
+	return {
+		'shared_buffers': f'{shared_buffers}MB',
+		'effective_cache_size': f'{int(resources.mem_mib * _POSTGRESQL_CACHE_SHARE)}MB',
+		'maintenance_work_mem': f'{min(2048, resources.mem_mib // 16)}MB',
+		'work_mem': f'{work_mem}MB',
+		'max_worker_processes': str(max(8, resources.cores)),
+		'max_parallel_workers': str(resources.cores),
+		'max_parallel_workers_per_gather': str(parallel_workers),
+		'max_parallel_maintenance_workers': str(parallel_workers),
+		# random reads cost about as much as sequential ones on SSDs
+		'random_page_cost': '4.0' if resources.rotational else '1.1',
+		'effective_io_concurrency': '2' if resources.rotational else '200',
+	}
+
+
+def mariadb_settings(resources: DatabaseResources, redo_log_dir: Path | None = None) -> dict[str, str]:
+	buffer_pool = int(resources.mem_mib * _INNODB_BUFFER_POOL_SHARE)
+	io_threads = max(4, min(64, resources.cores))
+
+	settings = {
+		'innodb_buffer_pool_size': f'{buffer_pool}M',
+		'innodb_log_file_size': f'{min(2048, max(48, buffer_pool // 4))}M',
+		'innodb_flush_method': 'O_DIRECT',
+		'innodb_read_io_threads': str(io_threads),
+		'innodb_write_io_threads': str(io_threads),
+		'innodb_io_capacity': '200' if resources.rotational else '2000',
+		# merging writes to neighbouring pages only pays off on hard disks
+		'innodb_flush_neighbors': '1' if resources.rotational else '0',
+	}
+
+	if redo_log_dir is not None:
+		settings['innodb_log_group_home_dir'] = str(redo_log_dir)
+
+	return settings
+
+
+def fastest_mountpoint(target: Path, data_dir: Path) -> Path | None:
+	"""
+	The mountpoint on the fastest device of the installation if that device
+	is faster than the one the data directory is on, for the write ahead log.
+	"""
+	mounts = [
+		mount
+		for mount in target_mounts(target)
+		if mount.fs_type in _DATA_FILESYSTEMS
+		and mount.source.startswith('/dev/')
+		and not any(mount.mountpoint.is_relative_to(protected) for protected in _PROTECTED_DIRS)
+	]
+
+	if (data_mount := _mount_of(mounts, data_dir)) is None:
+		return None
+
+	rates = {mount.mountpoint: DeviceTopology.from_device(Path(mount.source)).write_rate for mount in mounts}
+	fastest = max(rates, key=lambda mountpoint: rates[mountpoint])
+
+	if rates[fastest] <= rates[data_mount.mountpoint]:
+		return None
+
+	return fastest
+
+
+def write_settings(path: Path, settings: dict[str, str], header: str) -> None:
+	info(f'Writing {path}: {settings}')
+	path.parent.mkdir(parents=True, exist_ok=True)
+
+	with path.open('a') as fp:
+		fp.write(f'\n{header}\n')
+		fp.writelines(f'{key} = {value}\n' for key, value in settings.items())
+
+
+def prepare_data_dir(install_session: Installer, path: Path, owner: str) -> None:
+	"""
+	Creates an empty directory for database files owned by the database user.
+	On btrfs it's a dedicated subvolume, which snapshots of its parent leave out,
+	with copy-on-write disabled as databases rewrite their files in place.
+	"""
+	host_path = install_session.target / path.relative_to('/')
+	mount = _mount_of(target_mounts(install_session.target), path)
+
+	if host_path.exists():
+		if any(host_path.iterdir()):
+			warn(f'{path} is not empty, leaving it as it is')
+			return
+
+		host_path.rmdir()
+
+	host_path.parent.mkdir(parents=True, exist_ok=True)
+
+	if mount is not None and mount.fs_type == 'btrfs':
+		info(f'Creating a NOCOW subvolume for {path}')
+
+		try:
+			SysCommand(['btrfs', 'subvolume', 'create', str(host_path)])
+			SysCommand(['chattr', '+C', str(host_path)])
+		except SysCallError as err:
+			warn(f'Unable to create a subvolume for {path}: {err}')
+			host_path.mkdir(exist_ok=True)
+	else:
+		host_path.mkdir()
+
+	install_session.arch_chroot(f'chown {owner}:{owner} {path}')
+	install_session.arch_chroot(f'chmod 700 {path}')
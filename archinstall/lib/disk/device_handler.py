@@ -1,21 +1,29 @@
 import logging
 import os
 import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Final
 
 from parted import Device, Disk, DiskException, FileSystem, Geometry, IOException, Partition, PartitionException, freshDisk, getAllDevices, getDevice, newDisk
 
 from archinstall.lib.command import SysCommand
+from archinstall.lib.disk.fs_tuning import DeviceTopology, device_size, mkfs_tuning
 from archinstall.lib.disk.luks import Luks2, unlock_luks2_dev
+from archinstall.lib.disk.udev import UdevWatcher
 from archinstall.lib.disk.utils import (
 	find_lsblk_info,
 	get_all_lsblk_info,
 	get_lsblk_info,
+	get_lsblk_snapshot,
 	linux_root_guid,
+	lsblk_store,
 	mount,
 	udev_sync,
 	umount,
 )
+from archinstall.lib.disk.wipe import wipe_device
 from archinstall.lib.exceptions import DiskError, SysCallError, UnknownFilesystemFormat
 from archinstall.lib.hardware import SysInfo
 from archinstall.lib.log import debug, error, info, log
@@ -31,8 +39,10 @@ from archinstall.lib.models.device import (
 	PartitionFlag,
 	PartitionModification,
 	PartitionTable,
+	PbkdfParams,
 	SubvolumeModification,
 	Unit,
+	WipeMode,
 	_BtrfsSubvolumeInfo,
 	_DeviceInfo,
 	_PartitionInfo,
@@ -40,6 +50,9 @@ from archinstall.lib.models.device import (
 from archinstall.lib.models.users import Password
 from archinstall.lib.pathnames import ARCHISO_MOUNTPOINT
 
+# Maximum number of devices that are probed at the same time
+DEVICE_PROBE_WORKERS: Final = 8
+
 
 class DeviceHandler:
 	_TMP_BTRFS_MOUNT = Path('/mnt/arch_btrfs')
@@ -47,6 +60,12 @@ class DeviceHandler:
 	def __init__(self) -> None:
 		self._devices: dict[Path, BDevice] = {}
 		self._partition_table = PartitionTable.GPT if SysInfo.has_uefi() else PartitionTable.MBR
+		# libparted is not thread safe, disks are opened and committed one at a time
+		self._parted_lock = threading.Lock()
+		# hotplug events tell when the loaded devices are outdated
+		self._hotplug = UdevWatcher()
+		self._hotplug.open()
+		self._loaded_generation: int | None = None
 		self.load_devices()
 
 	@property
@@ -57,14 +76,53 @@ class DeviceHandler:
 	def partition_table(self) -> PartitionTable:
 		return self._partition_table
 
-	def load_devices(self) -> None:
-		block_devices = {}
+	def refresh_devices(self) -> None:
+		"""
+		Reloads the devices if disks were added, removed or modified since they
+		were last loaded, otherwise the previously loaded devices are kept.
+		"""
+		if self._devices_changed():
+			self.load_devices()
+		else:
+			debug('Block devices unchanged, reusing loaded devices')
+
+	def _devices_changed(self) -> bool:
+		if self._loaded_generation != lsblk_store.generation:
+			return True
+
+		try:
+			events = self._hotplug.drain()
+		except OSError as err:
+			debug(f'Missed udev events: {err}')
+			return True
 
+		for event in events:
+			if event.get('SUBSYSTEM') != 'block':
+				continue
+
+			# libparted opening a disk for probing causes change events as well,
+			# only media changes are of interest
+			if event.get('ACTION') in ('add', 'remove') or event.get('DISK_MEDIA_CHANGE'):
+				debug(f'Block device {event.get("ACTION")}: {event.get("DEVNAME")}')
+				return True
+
+		return False
+
+	def load_devices(self) -> None:
 		udev_sync()
+
+		# everything that happened up to now is covered by this load
+		try:
+			self._hotplug.drain()
+		except OSError:
+			pass
+
 		all_lsblk_info = get_all_lsblk_info()
 		devices = getAllDevices()
 		devices.extend(self.get_loop_devices())
 
+		probes: list[tuple[Device, LsblkInfo]] = []
+
 		for device in devices:
 			dev_lsblk_info = find_lsblk_info(device.path, all_lsblk_info)
 
@@ -79,44 +137,56 @@ class DeviceHandler:
 			if dev_lsblk_info.mountpoint == ARCHISO_MOUNTPOINT:
 				continue
 
-			try:
+			probes.append((device, dev_lsblk_info))
+
+		block_devices = {}
+
+		if probes:
+			with ThreadPoolExecutor(max_workers=min(DEVICE_PROBE_WORKERS, len(probes))) as executor:
+				for block_device in executor.map(lambda probe: self._probe_device(*probe), probes):
+					if block_device is not None:
+						block_devices[block_device.device_info.path] = block_device
+
+		self._devices = block_devices
+		self._loaded_generation = lsblk_store.generation
+
+	def _probe_device(self, device: Device, dev_lsblk_info: LsblkInfo) -> BDevice | None:
+		try:
+			with self._parted_lock:
 				if dev_lsblk_info.pttype:
 					disk = newDisk(device)
 				else:
 					disk = freshDisk(device, self.partition_table.value)
-			except DiskException as err:
-				debug(f'Unable to get disk from {device.path}: {err}')
-				continue
-
-			device_info = _DeviceInfo.from_disk(disk)
-			partition_infos = []
+		except DiskException as err:
+			debug(f'Unable to get disk from {device.path}: {err}')
+			return None
 
-			for partition in disk.partitions:
-				lsblk_info = find_lsblk_info(partition.path, dev_lsblk_info.children)
+		device_info = _DeviceInfo.from_disk(disk)
+		partition_infos = []
 
-				if not lsblk_info:
-					debug(f'Partition lsblk info not found: {partition.path}')
-					continue
+		for partition in disk.partitions:
+			lsblk_info = find_lsblk_info(partition.path, dev_lsblk_info.children)
 
-				fs_type = self._determine_fs_type(partition, lsblk_info)
-				subvol_infos = []
+			if not lsblk_info:
+				debug(f'Partition lsblk info not found: {partition.path}')
+				continue
 
-				if fs_type == FilesystemType.BTRFS:
-					subvol_infos = self.get_btrfs_info(partition.path, lsblk_info)
+			fs_type = self._determine_fs_type(partition, lsblk_info)
+			subvol_infos = []
 
-				partition_infos.append(
-					_PartitionInfo.from_partition(
-						partition,
-						lsblk_info,
-						fs_type,
-						subvol_infos,
-					),
-				)
+			if fs_type == FilesystemType.BTRFS:
+				subvol_infos = self.get_btrfs_info(partition.path, lsblk_info)
 
-			block_device = BDevice(disk, device_info, partition_infos)
-			block_devices[block_device.device_info.path] = block_device
+			partition_infos.append(
+				_PartitionInfo.from_partition(
+					partition,
+					lsblk_info,
+					fs_type,
+					subvol_infos,
+				),
+			)
 
-		self._devices = block_devices
+		return BDevice(disk, device_info, partition_infos)
 
 	@staticmethod
 	def get_loop_devices() -> list[Device]:
@@ -181,6 +251,10 @@ class DeviceHandler:
 		partition = self.find_partition(path)
 		return partition.partuuid if partition else None
 
+	def _tmp_btrfs_mount(self, dev_path: Path) -> Path:
+		# every device gets its own mountpoint as devices may be set up concurrently
+		return self._TMP_BTRFS_MOUNT.with_name(f'{self._TMP_BTRFS_MOUNT.name}_{dev_path.name}')
+
 	def get_btrfs_info(
 		self,
 		dev_path: Path,
@@ -192,8 +266,8 @@ class DeviceHandler:
 		subvol_infos: list[_BtrfsSubvolumeInfo] = []
 
 		if not lsblk_info.mountpoint:
-			mount(dev_path, self._TMP_BTRFS_MOUNT, create_target_mountpoint=True)
-			mountpoint = self._TMP_BTRFS_MOUNT
+			mountpoint = self._tmp_btrfs_mount(dev_path)
+			mount(dev_path, mountpoint, create_target_mountpoint=True)
 		else:
 			# when multiple subvolumes are mounted then the lsblk output may look like
 			# "mountpoint": "/mnt/archinstall/var/log"
@@ -263,6 +337,7 @@ class DeviceHandler:
 
 		if not command:
 			command = f'mkfs.{mkfs_type}'
+			options += mkfs_tuning(fs_type, DeviceTopology.from_device(path), device_size(path))
 
 		cmd = [command, *options, *additional_parted_options, str(path)]
 
@@ -274,6 +349,8 @@ class DeviceHandler:
 			msg = f'Could not format {path} with {fs_type.value}: {err.message}'
 			error(msg)
 			raise DiskError(msg) from err
+		finally:
+			lsblk_store.invalidate()
 
 	def encrypt(
 		self,
@@ -282,16 +359,18 @@ class DeviceHandler:
 		enc_password: Password | None,
 		lock_after_create: bool = True,
 		iter_time: int = DEFAULT_ITER_TIME,
+		pbkdf: PbkdfParams | None = None,
 	) -> Luks2:
 		luks_handler = Luks2(
 			dev_path,
 			mapper_name=mapper_name,
 			password=enc_password,
+			pbkdf=pbkdf,
 		)
 
-		key_file = luks_handler.encrypt(iter_time=iter_time)
-
-		udev_sync()
+		with UdevWatcher() as watcher:
+			key_file = luks_handler.encrypt(iter_time=iter_time)
+			watcher.wait_for(dev_path, 'ID_FS_UUID')
 
 		luks_handler.unlock(key_file=key_file)
 
@@ -310,6 +389,7 @@ class DeviceHandler:
 		mapper_name: str | None,
 		fs_type: FilesystemType,
 		enc_conf: DiskEncryption,
+		pbkdf: PbkdfParams | None = None,
 	) -> None:
 		if not enc_conf.encryption_password:
 			raise ValueError('No encryption password provided')
@@ -318,11 +398,12 @@ class DeviceHandler:
 			dev_path,
 			mapper_name=mapper_name,
 			password=enc_conf.encryption_password,
+			pbkdf=pbkdf or enc_conf.pbkdf,
 		)
 
-		key_file = luks_handler.encrypt(iter_time=enc_conf.iter_time)
-
-		udev_sync()
+		with UdevWatcher() as watcher:
+			key_file = luks_handler.encrypt(iter_time=enc_conf.iter_time)
+			watcher.wait_for(dev_path, 'ID_FS_UUID')
 
 		luks_handler.unlock(key_file=key_file)
 
@@ -347,7 +428,9 @@ class DeviceHandler:
 		# already exists then we have to delete it first
 		if requires_delete and part_mod.status in [ModificationStatus.MODIFY, ModificationStatus.DELETE]:
 			info(f'Delete existing partition: {part_mod.safe_dev_path}')
-			part_info = self.find_partition(part_mod.safe_dev_path)
+			# the partition has to belong to the disk that is modified,
+			# even if the devices were reloaded in the meantime
+			part_info = next((p for p in block_device.partition_infos if p.path == part_mod.safe_dev_path), None)
 
 			if not part_info:
 				raise DiskError(f'No partition for dev path found: {part_mod.safe_dev_path}')
@@ -405,8 +488,24 @@ class DeviceHandler:
 		part_mod.dev_path = Path(partition.path)
 
 	def fetch_part_info(self, path: Path) -> LsblkInfo:
-		lsblk_info = get_lsblk_info(path)
+		return self._validate_part_info(path, get_lsblk_info(path))
+
+	def fetch_part_infos(self, paths: list[Path]) -> dict[Path, LsblkInfo]:
+		"""
+		Same as fetch_part_info() for a batch of partitions, answered from a single lsblk call.
+		"""
+		snapshot = get_lsblk_snapshot()
+		part_infos = {}
+
+		for path in paths:
+			if (lsblk_info := snapshot.get(path)) is None:
+				raise DiskError(f'lsblk failed to retrieve information for "{path}"')
+
+			part_infos[path] = self._validate_part_info(path, lsblk_info)
 
+		return part_infos
+
+	def _validate_part_info(self, path: Path, lsblk_info: LsblkInfo) -> LsblkInfo:
 		if not lsblk_info.partn:
 			debug(f'Unable to determine new partition number: {path}\n{lsblk_info}')
 			raise DiskError(f'Unable to determine new partition number: {path}')
@@ -431,28 +530,37 @@ class DeviceHandler:
 	) -> None:
 		info(f'Creating subvolumes: {path}')
 
-		mount(path, self._TMP_BTRFS_MOUNT, create_target_mountpoint=True)
+		tmp_mount = self._tmp_btrfs_mount(path)
+		mount(path, tmp_mount, create_target_mountpoint=True)
 
-		for sub_vol in sorted(btrfs_subvols, key=lambda x: x.name):
-			debug(f'Creating subvolume: {sub_vol.name}')
+		subvol_paths = self._create_subvolumes(tmp_mount, btrfs_subvols)
 
-			subvol_path = self._TMP_BTRFS_MOUNT / sub_vol.name
+		if subvol_paths and BtrfsMountOption.nodatacow.value in mount_options:
+			try:
+				SysCommand(['chattr', '+C', *subvol_paths])
+			except SysCallError as err:
+				raise DiskError(f'Could not set nodatacow attribute at {tmp_mount}: {err}')
 
-			SysCommand(f'btrfs subvolume create -p {subvol_path}')
+		if subvol_paths and BtrfsMountOption.compression_enabled(mount_options):
+			try:
+				SysCommand(['chattr', '+c', *subvol_paths])
+			except SysCallError as err:
+				raise DiskError(f'Could not set compress attribute at {tmp_mount}: {err}')
 
-			if BtrfsMountOption.nodatacow.value in mount_options:
-				try:
-					SysCommand(f'chattr +C {subvol_path}')
-				except SysCallError as err:
-					raise DiskError(f'Could not set nodatacow attribute at {subvol_path}: {err}')
+		umount(path)
 
-			if BtrfsMountOption.compress.value in mount_options:
-				try:
-					SysCommand(f'chattr +c {subvol_path}')
-				except SysCallError as err:
-					raise DiskError(f'Could not set compress attribute at {subvol_path}: {err}')
+	def _create_subvolumes(self, tmp_mount: Path, btrfs_subvols: list[SubvolumeModification]) -> list[str]:
+		"""
+		Creates all subvolumes with a single btrfs invocation,
+		missing parent directories are created along the way.
+		"""
+		subvol_paths = [str(tmp_mount / sub_vol.name) for sub_vol in sorted(btrfs_subvols, key=lambda x: x.name)]
 
-		umount(path)
+		if subvol_paths:
+			debug(f'Creating subvolumes: {", ".join(subvol_paths)}')
+			SysCommand(['btrfs', 'subvolume', 'create', '-p', *subvol_paths])
+
+		return subvol_paths
 
 	def create_btrfs_volumes(
 		self,
@@ -480,19 +588,16 @@ class DeviceHandler:
 			luks_handler = None
 			dev_path = part_mod.safe_dev_path
 
+		tmp_mount = self._tmp_btrfs_mount(dev_path)
+
 		mount(
 			dev_path,
-			self._TMP_BTRFS_MOUNT,
+			tmp_mount,
 			create_target_mountpoint=True,
 			options=part_mod.mount_options,
 		)
 
-		for sub_vol in sorted(part_mod.btrfs_subvols, key=lambda x: x.name):
-			debug(f'Creating subvolume: {sub_vol.name}')
-
-			subvol_path = self._TMP_BTRFS_MOUNT / sub_vol.name
-
-			SysCommand(f'btrfs subvolume create -p {subvol_path}')
+		self._create_subvolumes(tmp_mount, part_mod.btrfs_subvols)
 
 		umount(dev_path)
 
@@ -517,6 +622,7 @@ class DeviceHandler:
 		self,
 		modification: DeviceModification,
 		partition_table: PartitionTable | None = None,
+		wipe_mode: WipeMode = WipeMode.Signatures,
 	) -> None:
 		"""
 		Create a partition table on the block device and create all partitions.
@@ -528,11 +634,7 @@ class DeviceHandler:
 			if partition_table.is_mbr() and len(modification.partitions) > 3:
 				raise DiskError('Too many partitions on disk, MBR disks can only have 3 primary partitions')
 
-			self.wipe_dev(modification.device)
-			disk = freshDisk(modification.device.disk.device, partition_table.value)
-		else:
-			info(f'Use existing device: {modification.device_path}')
-			disk = modification.device.disk
+			self.wipe_dev(modification.device, wipe_mode)
 
 		info(f'Creating partitions: {modification.device_path}')
 
@@ -541,30 +643,50 @@ class DeviceHandler:
 
 		arch = platform.machine()
 
-		for part_mod in filtered_part:
-			# if the entire disk got nuked then we don't have to delete
-			# any existing partitions anymore because they're all gone already
-			requires_delete = modification.wipe is False
-			self._setup_partition(
-				part_mod,
-				modification.device,
-				disk,
-				requires_delete=requires_delete,
-				arch=arch,
-			)
+		with UdevWatcher() as watcher:
+			with self._parted_lock:
+				if modification.wipe:
+					disk = freshDisk(modification.device.disk.device, partition_table.value)
+				else:
+					info(f'Use existing device: {modification.device_path}')
+					disk = modification.device.disk
+
+				for part_mod in filtered_part:
+					# if the entire disk got nuked then we don't have to delete
+					# any existing partitions anymore because they're all gone already
+					requires_delete = modification.wipe is False
+					self._setup_partition(
+						part_mod,
+						modification.device,
+						disk,
+						requires_delete=requires_delete,
+						arch=arch,
+					)
 
-		disk.commit()
+				disk.commit()
+				lsblk_store.invalidate()
+
+			new_parts = [part_mod.dev_path for part_mod in filtered_part if part_mod.dev_path]
+
+			# wait for the partition device nodes to be set up
+			watcher.wait_for_all(new_parts)
 
 		# Wipe filesystem/LVM signatures from newly created partitions
 		# to prevent "signature detected" errors
-		for part_mod in filtered_part:
-			if part_mod.dev_path:
-				debug(f'Wiping signatures from: {part_mod.dev_path}')
-				SysCommand(f'wipefs --all {part_mod.dev_path}')
+		with UdevWatcher() as watcher:
+			wiped = []
+
+			for dev_path in new_parts:
+				debug(f'Wiping signatures from: {dev_path}')
+
+				# wipefs only reports (and writes) when there were signatures to erase
+				if SysCommand(f'wipefs --all {dev_path}').decode().strip():
+					wiped.append(dev_path)
 
-		# Sync with udev after wiping signatures
-		if filtered_part:
-			udev_sync()
+			# Sync with udev after wiping signatures
+			watcher.wait_for_all(wiped)
+
+		lsblk_store.invalidate()
 
 	def detect_pre_mounted_mods(self, base_mountpoint: Path) -> list[DeviceModification]:
 		part_mods: dict[Path, list[PartitionModification]] = {}
@@ -616,11 +738,16 @@ class DeviceHandler:
 		with open(dev_path, 'wb') as p:
 			p.write(bytearray(1024))
 
-	def wipe_dev(self, block_device: BDevice) -> None:
+		lsblk_store.invalidate()
+
+	def wipe_dev(self, block_device: BDevice, mode: WipeMode = WipeMode.Signatures) -> None:
 		"""
 		Wipe the block device of meta-data, be it file system, LVM, etc.
 		This is not intended to be secure, but rather to ensure that
 		auto-discovery tools don't recognize anything here.
+
+		With any other mode than WipeMode.Signatures the entire device is
+		cleared afterwards, e.g. discarded to restore the write performance of SSDs.
 		"""
 		info(f'Wiping partitions and metadata: {block_device.device_info.path}')
 
@@ -633,5 +760,7 @@ class DeviceHandler:
 
 		self._wipe(block_device.device_info.path)
 
+		wipe_device(block_device.device_info.path, mode)
+
 
 device_handler = DeviceHandler()
@@ -4,6 +4,7 @@ from typing import override
 
 from archinstall.lib.disk.device_handler import device_handler
 from archinstall.lib.disk.encryption_menu import DiskEncryptionMenu
+from archinstall.lib.disk.fs_tuning import DeviceTopology, advise_mount_options, mkfs_tuning
 from archinstall.lib.disk.partitioning_menu import manual_partitioning
 from archinstall.lib.log import debug
 from archinstall.lib.menu.abstract_menu import AbstractSubMenu
@@ -34,6 +35,7 @@ from archinstall.lib.models.device import (
 	SnapshotType,
 	SubvolumeModification,
 	Unit,
+	WipeMode,
 	_DeviceInfo,
 )
 from archinstall.lib.translationhandler import tr
@@ -48,6 +50,7 @@ class DiskMenuConfig:
 	lvm_config: LvmConfiguration | None
 	btrfs_snapshot_config: SnapshotConfig | None
 	disk_encryption: DiskEncryption | None
+	wipe_mode: WipeMode = WipeMode.Signatures
 
 
 class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
@@ -67,6 +70,7 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 				lvm_config=disk_layout_config.lvm_config,
 				disk_encryption=disk_layout_config.disk_encryption,
 				btrfs_snapshot_config=snapshot_config,
+				wipe_mode=disk_layout_config.wipe_mode,
 			)
 
 		menu_options = self._define_menu_options()
@@ -110,6 +114,14 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 				dependencies=[self._check_dep_btrfs],
 				key='btrfs_snapshot_config',
 			),
+			MenuItem(
+				text=tr('Wipe mode'),
+				action=select_wipe_mode,
+				value=self._disk_menu_config.wipe_mode,
+				preview_action=self._prev_wipe_mode,
+				dependencies=[self._check_dep_wipe],
+				key='wipe_mode',
+			),
 		]
 
 	@override
@@ -122,6 +134,7 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 			config.disk_config.lvm_config = self._disk_menu_config.lvm_config
 			config.disk_config.btrfs_options = BtrfsOptions(snapshot_config=self._disk_menu_config.btrfs_snapshot_config)
 			config.disk_config.disk_encryption = self._disk_menu_config.disk_encryption
+			config.disk_config.wipe_mode = self._disk_menu_config.wipe_mode
 			return config.disk_config
 
 		return None
@@ -142,6 +155,14 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 
 		return False
 
+	def _check_dep_wipe(self) -> bool:
+		disk_layout_conf: DiskLayoutConfiguration | None = self._menu_item_group.find_by_key('disk_config').value
+
+		if disk_layout_conf:
+			return any(mod.wipe for mod in disk_layout_conf.device_modifications)
+
+		return False
+
 	async def _select_disk_encryption(self, preset: DiskEncryption | None) -> DiskEncryption | None:
 		disk_config: DiskLayoutConfiguration | None = self._item_group.find_by_key('disk_config').value
 		lvm_config: LvmConfiguration | None = self._item_group.find_by_key('lvm_config').value
@@ -227,6 +248,7 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 				output_partition += f'{mod.device_path}: {mod.device.device_info.model}\n'
 				output_partition += '{}: {}\n'.format(tr('Wipe'), mod.wipe)
 				output_partition += partition_table + '\n'
+				output_partition += self._prev_mkfs_tuning(mod)
 
 				# create btrfs table
 				btrfs_partitions = [p for p in mod.partitions if p.btrfs_subvols]
@@ -238,6 +260,23 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 
 		return None
 
+	def _prev_mkfs_tuning(self, mod: DeviceModification) -> str:
+		topology = DeviceTopology.from_device(mod.device_path)
+		output = ''
+
+		for part_mod in mod.partitions:
+			if not part_mod.is_create_or_modify() or part_mod.fs_type is None:
+				continue
+
+			if options := mkfs_tuning(part_mod.fs_type, topology, part_mod.length.convert(Unit.B).value):
+				name = part_mod.mountpoint or part_mod.fs_type.value
+				output += f'{name}: mkfs.{part_mod.fs_type.value} {" ".join(options)}\n'
+
+		if output:
+			output = tr('File system tuning') + '\n' + output + '\n'
+
+		return output
+
 	def _prev_lvm_config(self, item: MenuItem) -> str | None:
 		if not item.value:
 			return None
@@ -259,6 +298,25 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 
 		return None
 
+	def _prev_wipe_mode(self, item: MenuItem) -> str | None:
+		if not item.value:
+			return None
+
+		wipe_mode: WipeMode = item.value
+		output = tr('Wipe mode') + f': {wipe_mode.display_msg()}\n\n'
+
+		match wipe_mode:
+			case WipeMode.Signatures:
+				output += tr('Only file system, LVM and LUKS signatures are removed')
+			case WipeMode.Auto:
+				output += tr('SSD and NVMe drives are discarded, all other drives are zeroed out')
+			case WipeMode.Discard | WipeMode.SecureDiscard:
+				output += tr('All blocks are discarded which restores the write performance of SSD and NVMe drives')
+			case WipeMode.ZeroOut | WipeMode.Overwrite:
+				output += tr('The entire drive is overwritten with zeros, this can take hours on large drives')
+
+		return output
+
 	def _prev_btrfs_snapshots(self, item: MenuItem) -> str | None:
 		if not item.value:
 			return None
@@ -282,7 +340,10 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 				output += tr('Password') + f': {enc_config.encryption_password.hidden()}\n'
 
 			if enc_type != EncryptionType.NO_ENCRYPTION:
-				output += tr('Iteration time') + f': {enc_config.iter_time or DEFAULT_ITER_TIME}ms\n'
+				if pbkdf := enc_config.pbkdf:
+					output += tr('Key derivation') + f': argon2id, {pbkdf.iterations} iterations, {pbkdf.memory // 1024}MiB, {pbkdf.parallel} threads\n'
+				else:
+					output += tr('Iteration time') + f': {enc_config.iter_time or DEFAULT_ITER_TIME}ms\n'
 
 			if enc_config.partitions:
 				output += f'Partitions: {len(enc_config.partitions)} selected\n'
@@ -297,6 +358,26 @@ class DiskLayoutConfigurationMenu(AbstractSubMenu[DiskMenuConfig]):
 		return None
 
 
+async def select_wipe_mode(preset: WipeMode) -> WipeMode:
+	items = [MenuItem(mode.display_msg(), value=mode) for mode in WipeMode]
+	group = MenuItemGroup(items, sort_items=False)
+	group.set_selected_by_value(preset)
+
+	result = await Selection[WipeMode](
+		group,
+		header=tr('Select how the wiped disks are cleared'),
+		allow_skip=True,
+	).show()
+
+	match result.type_:
+		case ResultType.Skip:
+			return preset
+		case ResultType.Selection:
+			return result.get_value()
+		case _:
+			raise ValueError('Unhandled return type')
+
+
 async def select_devices(preset: list[BDevice] | None = []) -> list[BDevice] | None:
 	def _preview_device_selection(item: MenuItem) -> str | None:
 		device: _DeviceInfo = item.value  # type: ignore[assignment]
@@ -309,6 +390,8 @@ async def select_devices(preset: list[BDevice] | None = []) -> list[BDevice] | N
 	if preset is None:
 		preset = []
 
+	# pick up disks that were plugged in since the last visit
+	device_handler.refresh_devices()
 	devices = device_handler.devices
 
 	if len(devices) < 1:
@@ -620,6 +703,7 @@ async def suggest_single_disk_layout(
 		using_subvolumes = False
 		mount_options = []
 
+	mount_options = advise_mount_options(filesystem_type, DeviceTopology.from_device(device.device_info.path), mount_options)
 	device_modification = DeviceModification(device, wipe=True)
 
 	using_gpt = device_handler.partition_table.is_gpt()
@@ -747,6 +831,9 @@ async def suggest_multi_disk_layout(
 	debug(f'/root: {root_device.device_info.path}')
 	debug(f'/home: {home_device.device_info.path}')
 
+	root_mount_options = advise_mount_options(filesystem_type, DeviceTopology.from_device(root_device.device_info.path), mount_options)
+	home_mount_options = advise_mount_options(filesystem_type, DeviceTopology.from_device(home_device.device_info.path), mount_options)
+
 	root_device_modification = DeviceModification(root_device, wipe=True)
 	home_device_modification = DeviceModification(home_device, wipe=True)
 
@@ -774,7 +861,7 @@ async def suggest_multi_disk_layout(
 		start=root_start,
 		length=root_length,
 		mountpoint=Path('/'),
-		mount_options=mount_options,
+		mount_options=root_mount_options,
 		fs_type=filesystem_type,
 	)
 	root_device_modification.add_partition(root_partition)
@@ -796,7 +883,7 @@ async def suggest_multi_disk_layout(
 		start=home_start,
 		length=home_length,
 		mountpoint=Path('/home'),
-		mount_options=mount_options,
+		mount_options=home_mount_options,
 		fs_type=filesystem_type,
 		flags=flags,
 	)
@@ -834,6 +921,8 @@ async def suggest_lvm_layout(
 
 	boot_part: PartitionModification | None = None
 	other_part: list[PartitionModification] = []
+	# bytes of PV space on every disk
+	disk_space: dict[Path, int] = {}
 
 	for mod in disk_config.device_modifications:
 		for part in mod.partitions:
@@ -841,14 +930,30 @@ async def suggest_lvm_layout(
 				boot_part = part
 			else:
 				other_part.append(part)
+				disk_space[mod.device_path] = disk_space.get(mod.device_path, 0) + part.length.convert(Unit.B).value
 
 	if not boot_part:
 		raise ValueError('Unable to find boot partition in partition modifications')
 
-	total_vol_available = sum(
-		[p.length for p in other_part],
-		Size(0, Unit.B, SectorSize.default()),
-	)
+	stripes = 1
+
+	if len(disk_space) > 1:
+		prompt = tr('Would you like to stripe the volumes across {} disks?').format(len(disk_space)) + '\n'
+		prompt += tr('This multiplies the throughput, but all data is lost if any of the disks fails') + '\n'
+		result = await Confirmation(header=prompt, allow_skip=False, preset=False).show()
+
+		if MenuItem.yes() == result.item():
+			stripes = len(disk_space)
+
+	if stripes > 1:
+		# a striped volume takes the same space from every disk
+		total_vol_available = Size(min(disk_space.values()) * stripes, Unit.B, SectorSize.default())
+	else:
+		total_vol_available = sum(
+			[p.length for p in other_part],
+			Size(0, Unit.B, SectorSize.default()),
+		)
+
 	root_vol_size = process_root_partition_size(total_vol_available, SectorSize.default())
 	home_vol_size = total_vol_available - root_vol_size
 
@@ -862,6 +967,7 @@ async def suggest_lvm_layout(
 		mountpoint=Path('/'),
 		btrfs_subvols=btrfs_subvols,
 		mount_options=mount_options,
+		stripes=stripes,
 	)
 
 	lvm_vol_group.volumes.append(root_vol)
@@ -873,6 +979,7 @@ async def suggest_lvm_layout(
 			fs_type=filesystem_type,
 			length=home_vol_size,
 			mountpoint=Path('/home'),
+			stripes=stripes,
 		)
 
 		lvm_vol_group.volumes.append(home_vol)
@@ -1,39 +1,47 @@
 import math
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Final
 
 from archinstall.lib.disk.device_handler import device_handler
-from archinstall.lib.disk.luks import Luks2
+from archinstall.lib.disk.luks import Luks2, benchmark_pbkdf, kdf_budget
 from archinstall.lib.disk.lvm import (
 	lvm_group_info,
 	lvm_pv_create,
 	lvm_vg_create,
-	lvm_vol_create,
-	lvm_vol_info,
 	lvm_vol_reduce,
+	lvm_vols_create,
 )
-from archinstall.lib.disk.utils import udev_sync
+from archinstall.lib.disk.udev import UdevWatcher
 from archinstall.lib.log import debug, info
 from archinstall.lib.models.device import (
+	DeviceModification,
 	DiskEncryption,
 	DiskLayoutConfiguration,
 	DiskLayoutType,
 	EncryptionType,
 	FilesystemType,
+	LsblkInfo,
 	LvmConfiguration,
 	LvmVolume,
 	LvmVolumeGroup,
 	PartitionModification,
+	PbkdfParams,
 	SectorSize,
 	Size,
 	Unit,
 )
 
+# Maximum number of devices that are partitioned and formatted at the same time
+DEVICE_PARALLELISM: Final = 4
+
 
 class FilesystemHandler:
-	def __init__(self, disk_config: DiskLayoutConfiguration):
+	def __init__(self, disk_config: DiskLayoutConfiguration, parallelism: int = DEVICE_PARALLELISM):
 		self._disk_config = disk_config
 		self._enc_config = disk_config.disk_encryption
+		self._parallelism = max(1, parallelism)
+		self._pbkdf: PbkdfParams | None = None
 
 	def perform_filesystem_operations(self) -> None:
 		if self._disk_config.config_type == DiskLayoutType.Pre_mount:
@@ -49,34 +57,81 @@ class FilesystemHandler:
 		# Setup the blockdevice, filesystem (and optionally encryption).
 		# Once that's done, we'll hand over to perform_installation()
 
+		self._pbkdf = self._resolve_pbkdf()
+
 		# make sure all devices are unmounted
 		for mod in device_mods:
 			device_handler.umount_all_existing(mod.device_path)
 
-		for mod in device_mods:
-			device_handler.partition(mod)
+		# the devices are independent of each other so the wiping,
+		# partitioning, encryption and formatting run per device
+		part_infos = self._run_device_pipelines(device_mods)
 
-		udev_sync()
+		# the results are merged back once all devices are done
+		for part_mod, lsblk_info in part_infos.items():
+			part_mod.partn = lsblk_info.partn
+			part_mod.partuuid = lsblk_info.partuuid
+			part_mod.uuid = lsblk_info.uuid
 
 		if self._disk_config.lvm_config:
-			for mod in device_mods:
-				if boot_part := mod.get_boot_partition():
-					debug(f'Formatting boot partition: {boot_part.dev_path}')
-					self._format_partitions([boot_part])
-
 			self.perform_lvm_operations()
-		else:
+
+	def _resolve_pbkdf(self) -> PbkdfParams | None:
+		if self._enc_config is None or self._enc_config.encryption_type == EncryptionType.NO_ENCRYPTION:
+			return None
+
+		if self._enc_config.pbkdf is not None:
+			return self._enc_config.pbkdf
+
+		# a single volume is benchmarked by luksFormat itself, multiple volumes
+		# are benchmarked once up front as they are formatted concurrently
+		if len(self._enc_config.partitions) + len(self._enc_config.lvm_volumes) < 2:
+			return None
+
+		return benchmark_pbkdf(self._enc_config.iter_time)
+
+	def _run_device_pipelines(self, device_mods: list[DeviceModification]) -> dict[PartitionModification, LsblkInfo]:
+		workers = min(self._parallelism, len(device_mods))
+		debug(f'Setting up {len(device_mods)} devices with {workers} workers')
+
+		part_infos: dict[PartitionModification, LsblkInfo] = {}
+
+		if workers == 1:
 			for mod in device_mods:
-				self._format_partitions(mod.partitions)
+				part_infos.update(self._device_pipeline(mod))
+			return part_infos
+
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			futures = [executor.submit(self._device_pipeline, mod) for mod in device_mods]
 
-				for part_mod in mod.partitions:
-					if part_mod.fs_type == FilesystemType.BTRFS and part_mod.is_create_or_modify():
-						device_handler.create_btrfs_volumes(part_mod, enc_conf=self._enc_config)
+			# the pool waits for the remaining devices before an error is raised
+			for future in futures:
+				part_infos.update(future.result())
+
+		return part_infos
+
+	def _device_pipeline(self, mod: DeviceModification) -> dict[PartitionModification, LsblkInfo]:
+		device_handler.partition(mod, wipe_mode=self._disk_config.wipe_mode)
+
+		if self._disk_config.lvm_config:
+			# the remaining partitions are set up as LVM physical volumes
+			if boot_part := mod.get_boot_partition():
+				debug(f'Formatting boot partition: {boot_part.dev_path}')
+				return self._format_partitions([boot_part])
+			return {}
+
+		part_infos = self._format_partitions(mod.partitions)
+
+		for part_mod in mod.partitions:
+			if part_mod.fs_type == FilesystemType.BTRFS and part_mod.is_create_or_modify():
+				device_handler.create_btrfs_volumes(part_mod, enc_conf=self._enc_config)
+
+		return part_infos
 
 	def _format_partitions(
 		self,
 		partitions: list[PartitionModification],
-	) -> None:
+	) -> dict[PartitionModification, LsblkInfo]:
 		"""
 		Format can be given an overriding path, for instance /dev/null to test
 		the formatting functionality and in essence the support for the given filesystem.
@@ -87,26 +142,26 @@ class FilesystemHandler:
 
 		self._validate_partitions(create_or_modify_parts)
 
-		for part_mod in create_or_modify_parts:
-			# partition will be encrypted
-			if self._enc_config is not None and part_mod in self._enc_config.partitions:
-				device_handler.format_encrypted(
-					part_mod.safe_dev_path,
-					part_mod.mapper_name,
-					part_mod.safe_fs_type,
-					self._enc_config,
-				)
-			else:
-				device_handler.format(part_mod.safe_fs_type, part_mod.safe_dev_path)
+		with UdevWatcher() as watcher:
+			for part_mod in create_or_modify_parts:
+				# partition will be encrypted
+				if self._enc_config is not None and part_mod in self._enc_config.partitions:
+					device_handler.format_encrypted(
+						part_mod.safe_dev_path,
+						part_mod.mapper_name,
+						part_mod.safe_fs_type,
+						self._enc_config,
+						pbkdf=self._pbkdf,
+					)
+				else:
+					device_handler.format(part_mod.safe_fs_type, part_mod.safe_dev_path)
 
 			# synchronize with udev before using lsblk
-			udev_sync()
+			watcher.wait_for_all([p.safe_dev_path for p in create_or_modify_parts], 'ID_FS_UUID')
 
-			lsblk_info = device_handler.fetch_part_info(part_mod.safe_dev_path)
+		lsblk_infos = device_handler.fetch_part_infos([p.safe_dev_path for p in create_or_modify_parts])
 
-			part_mod.partn = lsblk_info.partn
-			part_mod.partuuid = lsblk_info.partuuid
-			part_mod.uuid = lsblk_info.uuid
+		return {part_mod: lsblk_infos[part_mod.safe_dev_path] for part_mod in create_or_modify_parts}
 
 	def _validate_partitions(self, partitions: list[PartitionModification]) -> None:
 		checks = {
@@ -184,32 +239,24 @@ class FilesystemHandler:
 			avail_size = vg_info.vg_size
 			desired_size = sum([vol.length for vol in vg.volumes], Size(0, Unit.B, SectorSize.default()))
 
-			delta = desired_size - avail_size
-			delta_bytes = delta.convert(Unit.B)
-
-			# Round the offset up to the next physical extent (PE, 4 MiB by default)
-			# to ensure lvcreate`s internal rounding doesn`t consume space reserved
-			# for subsequent logical volumes.
-			pe_bytes = Size(4, Unit.MiB, SectorSize.default()).convert(Unit.B)
-			pe_count = math.ceil(delta_bytes.value / pe_bytes.value)
-			rounded_offset = pe_count * pe_bytes.value
-			max_vol_offset = Size(rounded_offset, Unit.B, SectorSize.default())
+			offsets: dict[LvmVolume, Size | None] = dict.fromkeys(vg.volumes)
 
-			max_vol = max(vg.volumes, key=lambda x: x.length)
+			# a layout that asks for less than the group holds, like volumes striped
+			# over disks of different sizes, is created as it is
+			if desired_size > avail_size:
+				delta_bytes = (desired_size - avail_size).convert(Unit.B)
+				max_vol = max(vg.volumes, key=lambda x: x.length)
 
-			for lv in vg.volumes:
-				offset = max_vol_offset if lv == max_vol else None
+				# Round the offset up to the next physical extent (PE, 4 MiB by default)
+				# to ensure lvcreate`s internal rounding doesn`t consume space reserved
+				# for subsequent logical volumes. Striped volumes are rounded to a
+				# multiple of their stripes, one extent per PV.
+				pe_bytes = Size(4, Unit.MiB, SectorSize.default()).convert(Unit.B).value * max_vol.stripes
+				pe_count = math.ceil(delta_bytes.value / pe_bytes)
+				offsets[max_vol] = Size(pe_count * pe_bytes, Unit.B, SectorSize.default())
 
-				debug(f'vg: {vg.name}, vol: {lv.name}, offset: {offset}')
-				lvm_vol_create(vg.name, lv, offset)
-
-				while True:
-					debug('Fetching LVM volume info')
-					lv_info = lvm_vol_info(lv.name)
-					if lv_info is not None:
-						break
-
-					time.sleep(1)
+			debug(f'vg: {vg.name}, volume offsets: {[(lv.name, offset) for lv, offset in offsets.items()]}')
+			lvm_vols_create(vg.name, offsets)
 
 			self._lvm_vol_handle_e2scrub(vg)
 
@@ -261,58 +308,57 @@ class FilesystemHandler:
 
 		return pv_paths
 
+	def _encrypt_volumes[VolumeType: (PartitionModification, LvmVolume)](
+		self,
+		volumes: list[VolumeType],
+		enc_config: DiskEncryption,
+		lock_after_create: bool,
+	) -> dict[VolumeType, Luks2]:
+		if not volumes:
+			return {}
+
+		def _encrypt(vol: VolumeType) -> Luks2:
+			return device_handler.encrypt(
+				vol.safe_dev_path,
+				vol.mapper_name,
+				enc_config.encryption_password,
+				lock_after_create=lock_after_create,
+				iter_time=enc_config.iter_time,
+				pbkdf=self._pbkdf,
+			)
+
+		# argon2id is memory hard, only as many volumes as fit into memory are formatted at once
+		workers = min(kdf_budget.slots(self._pbkdf), len(volumes))
+		debug(f'Encrypting {len(volumes)} volumes with {workers} workers')
+
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			return dict(zip(volumes, executor.map(_encrypt, volumes)))
+
 	def _encrypt_lvm_vols(
 		self,
 		lvm_config: LvmConfiguration,
 		enc_config: DiskEncryption,
 		lock_after_create: bool = True,
 	) -> dict[LvmVolume, Luks2]:
-		enc_vols: dict[LvmVolume, Luks2] = {}
-
-		for vol in lvm_config.get_all_volumes():
-			if vol in enc_config.lvm_volumes:
-				luks_handler = device_handler.encrypt(
-					vol.safe_dev_path,
-					vol.mapper_name,
-					enc_config.encryption_password,
-					lock_after_create,
-					iter_time=enc_config.iter_time,
-				)
-
-				enc_vols[vol] = luks_handler
-
-		return enc_vols
+		volumes = [vol for vol in lvm_config.get_all_volumes() if vol in enc_config.lvm_volumes]
+		return self._encrypt_volumes(volumes, enc_config, lock_after_create)
 
 	def _encrypt_partitions(
 		self,
 		enc_config: DiskEncryption,
 		lock_after_create: bool = True,
 	) -> dict[PartitionModification, Luks2]:
-		enc_mods: dict[PartitionModification, Luks2] = {}
+		partitions: list[PartitionModification] = []
 
 		for mod in self._disk_config.device_modifications:
-			partitions = mod.partitions
-
 			# don't touch existing partitions
-			filtered_part = [p for p in partitions if not p.exists()]
+			filtered_part = [p for p in mod.partitions if not p.exists()]
 
 			self._validate_partitions(filtered_part)
 
-			enc_mods = {}
-
-			for part_mod in filtered_part:
-				if part_mod in enc_config.partitions:
-					luks_handler = device_handler.encrypt(
-						part_mod.safe_dev_path,
-						part_mod.mapper_name,
-						enc_config.encryption_password,
-						lock_after_create=lock_after_create,
-						iter_time=enc_config.iter_time,
-					)
-
-					enc_mods[part_mod] = luks_handler
+			partitions += [p for p in filtered_part if p in enc_config.partitions]
 
-		return enc_mods
+		return self._encrypt_volumes(partitions, enc_config, lock_after_create)
 
 	def _lvm_vol_handle_e2scrub(self, vol_gp: LvmVolumeGroup) -> None:
 		# from arch wiki:
@@ -0,0 +1,260 @@
+import os
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Final, Self
+
+from archinstall.lib.benchmark import compression_sample, timed
+from archinstall.lib.disk.utils import block_queue_attr
+from archinstall.lib.log import debug
+from archinstall.lib.models.device import BtrfsMountOption, FilesystemType
+
+_EXT_BLOCK_SIZE: Final = 4096
+_BTRFS_SECTOR_SIZE: Final = 4096
+_BTRFS_NODE_SIZE: Final = 16 * 1024
+# mkfs.xfs creates 4 allocation groups on single disks, which serializes
+# metadata updates on SSDs that could handle far more parallel writes
+_XFS_MAX_AGCOUNT: Final = 32
+_XFS_MIN_AG_SIZE: Final = 1024**3
+# FAT32 needs at least this many clusters
+_FAT32_MIN_CLUSTERS: Final = 65525
+# The layout mkfs.fat creates FAT32 file systems with
+_FAT32_RESERVED_SECTORS: Final = 32
+_FAT32_FAT_COUNT: Final = 2
+_FAT32_ENTRY_SIZE: Final = 4
+
+# Sequential write rates assumed per device class, in bytes/s
+_HDD_WRITE_RATE: Final = 150 * 1024**2
+_SSD_WRITE_RATE: Final = 500 * 1024**2
+_NVME_WRITE_RATE: Final = 2000 * 1024**2
+# Highest zstd level picked automatically, higher levels gain little on installed systems
+ZSTD_MAX_LEVEL: Final = 9
+
+
+@dataclass(frozen=True)
+class DeviceTopology:
+	"""
+	The I/O limits of a block device as reported in its sysfs queue.
+
+	md and device mapper (LVM, LUKS) devices report the stripe
+	geometry of the underlying disks, e.g. for a RAID0 with 512KiB
+	chunks over two disks the minimum I/O size is 512KiB and the
+	optimal I/O size 1MiB.
+	"""
+
+	logical_block_size: int = 512
+	physical_block_size: int = 512
+	minimum_io_size: int = 512
+	optimal_io_size: int = 0
+	rotational: bool = True
+	discard: bool = False
+	nvme: bool = False
+
+	@classmethod
+	def from_device(cls, dev_path: Path) -> Self:
+		def _int(attr: str, default: int) -> int:
+			value = block_queue_attr(dev_path, attr)
+			return int(value) if value and value.isdigit() else default
+
+		return cls(
+			logical_block_size=_int('logical_block_size', 512),
+			physical_block_size=_int('physical_block_size', 512),
+			minimum_io_size=_int('minimum_io_size', 512),
+			optimal_io_size=_int('optimal_io_size', 0),
+			rotational=_int('rotational', 1) == 1,
+			discard=_int('discard_max_bytes', 0) > 0,
+			nvme=dev_path.resolve().name.startswith('nvme'),
+		)
+
+	@property
+	def striped(self) -> bool:
+		return (
+			self.minimum_io_size > self.physical_block_size and self.optimal_io_size > self.minimum_io_size and self.optimal_io_size % self.minimum_io_size == 0
+		)
+
+	@property
+	def stripe_unit(self) -> int:
+		return self.minimum_io_size
+
+	@property
+	def stripe_width(self) -> int:
+		"""
+		Number of data disks the stripe is spread over.
+		"""
+		return self.optimal_io_size // self.minimum_io_size
+
+	@property
+	def write_rate(self) -> int:
+		if self.rotational:
+			return _HDD_WRITE_RATE
+		if self.nvme:
+			return _NVME_WRITE_RATE
+		return _SSD_WRITE_RATE
+
+
+def device_size(dev_path: Path) -> int:
+	"""
+	Size of a block device in bytes, sysfs always counts 512 byte sectors.
+	"""
+	try:
+		return int((Path('/sys/class/block') / dev_path.resolve().name / 'size').read_text()) * 512
+	except OSError, ValueError:
+		return 0
+
+
+def _ext_options(fs_type: FilesystemType, topology: DeviceTopology) -> list[str]:
+	# inode tables and the journal are initialized in the background after mounting
+	extended = ['lazy_itable_init=1']
+
+	if fs_type != FilesystemType.EXT2:
+		extended.append('lazy_journal_init=1')
+
+	if topology.striped and topology.stripe_unit % _EXT_BLOCK_SIZE == 0:
+		stride = topology.stripe_unit // _EXT_BLOCK_SIZE
+		extended += [f'stride={stride}', f'stripe_width={stride * topology.stripe_width}']
+
+	return ['-b', str(_EXT_BLOCK_SIZE), '-E', ','.join(extended)]
+
+
+def _xfs_options(topology: DeviceTopology, size: int) -> list[str]:
+	options = []
+
+	if topology.striped:
+		options.append(f'su={topology.stripe_unit},sw={topology.stripe_width}')
+
+	if not topology.rotational and size:
+		agcount = min(_XFS_MAX_AGCOUNT, os.cpu_count() or 1, size // _XFS_MIN_AG_SIZE)
+		if agcount > 4:
+			options.append(f'agcount={agcount}')
+
+	if not options:
+		return []
+
+	return ['-d', ','.join(options)]
+
+
+def _btrfs_options(topology: DeviceTopology) -> list[str]:
+	sector_size = max(_BTRFS_SECTOR_SIZE, topology.logical_block_size)
+	node_size = max(_BTRFS_NODE_SIZE, topology.physical_block_size)
+	return ['--sectorsize', str(sector_size), '--nodesize', str(node_size)]
+
+
+def _fat32_clusters(size: int, sector_size: int, sectors_per_cluster: int) -> int:
+	"""
+	The clusters in the data area of a FAT32 file system, which is what
+	remains after the reserved sectors and the FATs.
+	"""
+	# mkfs.fat pads the reserved sectors to align the data area to the cluster size
+	sectors = size // sector_size - _FAT32_RESERVED_SECTORS - sectors_per_cluster
+	# every cluster takes up its sectors in the data area and an entry in every FAT
+	cluster_bytes = sectors_per_cluster * sector_size + _FAT32_FAT_COUNT * _FAT32_ENTRY_SIZE
+	clusters = sectors * sector_size // cluster_bytes
+	# the first two FAT entries are reserved
+	fat_sectors = -(-(clusters + 2) * _FAT32_ENTRY_SIZE // sector_size)
+
+	return max(0, (sectors - _FAT32_FAT_COUNT * fat_sectors) // sectors_per_cluster)
+
+
+def _fat_options(fs_type: FilesystemType, topology: DeviceTopology, size: int) -> list[str]:
+	options = ['-S', str(topology.logical_block_size)]
+
+	# clusters covering a whole physical block avoid read-modify-write cycles on 512e disks
+	sectors_per_cluster = topology.physical_block_size // topology.logical_block_size
+
+	# mkfs.fat picks the cluster size itself if that would leave too few clusters for FAT32
+	if (
+		fs_type == FilesystemType.FAT32
+		and sectors_per_cluster > 1
+		and _fat32_clusters(size, topology.logical_block_size, sectors_per_cluster) >= _FAT32_MIN_CLUSTERS
+	):
+		options += ['-s', str(sectors_per_cluster)]
+
+	return options
+
+
+def mkfs_tuning(fs_type: FilesystemType, topology: DeviceTopology, size: int = 0) -> list[str]:
+	"""
+	mkfs options that align the file system to the topology of the device
+	it's created on and skip initialization work that can be done lazily.
+	"""
+	match fs_type:
+		case FilesystemType.EXT2 | FilesystemType.EXT3 | FilesystemType.EXT4:
+			return _ext_options(fs_type, topology)
+		case FilesystemType.XFS:
+			return _xfs_options(topology, size)
+		case FilesystemType.BTRFS:
+			return _btrfs_options(topology)
+		case _ if fs_type.is_fat():
+			return _fat_options(fs_type, topology, size)
+		case _:
+			return []
+
+
+@cache
+def _zstd_sample() -> bytes:
+	return compression_sample(Path('/'))
+
+
+@cache
+def zstd_throughput(level: int) -> float | None:
+	"""
+	Single core zstd compression throughput in bytes/s at the given level,
+	measured on the libraries and binaries of the running system.
+	"""
+	try:
+		from compression import zstd
+	except ImportError:
+		return None
+
+	if not (sample := _zstd_sample()):
+		return None
+
+	elapsed = timed(lambda: zstd.compress(sample, level=level))
+	return len(sample) / elapsed if elapsed > 0 else None
+
+
+def zstd_level(write_rate: int, cores: int | None = None) -> int | None:
+	"""
+	The highest zstd level at which all cores together still
+	compress faster than the device can write.
+	"""
+	cores = cores or os.cpu_count() or 1
+	level = None
+
+	for candidate in range(1, ZSTD_MAX_LEVEL + 1):
+		if (throughput := zstd_throughput(candidate)) is None:
+			return None
+
+		if throughput * cores < write_rate and level is not None:
+			break
+
+		level = candidate
+
+	debug(f'zstd level {level} matches a write rate of {write_rate // 1024**2}MiB/s on {cores} cores')
+	return level
+
+
+def advise_mount_options(fs_type: FilesystemType, topology: DeviceTopology, mount_options: list[str]) -> list[str]:
+	"""
+	Extends the requested mount options with options suited to the device.
+	Options that are already requested are left as they are.
+	"""
+	if fs_type not in (FilesystemType.BTRFS, FilesystemType.EXT4, FilesystemType.XFS, FilesystemType.F2FS):
+		return mount_options
+
+	options = list(mount_options)
+
+	if not any(option.endswith('atime') for option in options):
+		options.append('noatime')
+
+	if fs_type == FilesystemType.BTRFS:
+		options.append('nossd' if topology.rotational else 'ssd')
+
+		# ext4 and xfs are trimmed periodically by fstrim.timer instead
+		if not topology.rotational and topology.discard and not any(option.startswith('discard') for option in options):
+			options.append('discard=async')
+
+		if BtrfsMountOption.compression_enabled(options) and (level := zstd_level(topology.write_rate)) is not None:
+			options = [f'{BtrfsMountOption.compress.value}:{level}' if option == BtrfsMountOption.compress.value else option for option in options]
+
+	return options
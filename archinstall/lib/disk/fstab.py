@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.disk.utils import lsblk_store
+from archinstall.lib.log import debug
+from archinstall.lib.models.device import (
+	DiskLayoutConfiguration,
+	DiskLayoutType,
+	EncryptionType,
+	FilesystemType,
+	LvmVolume,
+	PartitionModification,
+	SubvolumeModification,
+)
+
+# The ESP is readable by root only, the random seed of systemd-boot is stored on it
+EFI_MOUNT_OPTIONS: Final = ['fmask=0077', 'dmask=0077']
+# File systems that are never checked at boot, their fsck is a no-op
+_NO_FSCK: Final = (FilesystemType.BTRFS, FilesystemType.XFS, FilesystemType.NTFS, FilesystemType.LINUX_SWAP)
+
+
+@dataclass(frozen=True)
+class FstabEntry:
+	dev_path: Path
+	uuid: str
+	mountpoint: Path | None
+	fs_type: FilesystemType
+	options: list[str]
+
+	@property
+	def fsck_pass(self) -> int:
+		if self.fs_type in _NO_FSCK:
+			return 0
+		return 1 if self.mountpoint == Path('/') else 2
+
+	def line(self) -> str:
+		match self.fs_type:
+			case FilesystemType.LINUX_SWAP:
+				fs_type = 'swap'
+			case _ if self.fs_type.is_fat():
+				fs_type = 'vfat'
+			case _:
+				fs_type = self.fs_type.value
+
+		mountpoint = str(self.mountpoint) if self.mountpoint else 'none'
+		options = ','.join(self.options) or 'defaults'
+
+		return f'# {self.dev_path}\nUUID={self.uuid}\t{mountpoint}\t{fs_type}\t{options}\t0 {self.fsck_pass}\n'
+
+
+def partition_mount_options(part_mod: PartitionModification) -> list[str]:
+	if part_mod.is_efi():
+		return list(dict.fromkeys(part_mod.mount_options + EFI_MOUNT_OPTIONS))
+	return part_mod.mount_options
+
+
+class _FstabBuilder:
+	def __init__(self, disk_config: DiskLayoutConfiguration) -> None:
+		self._disk_config = disk_config
+		self._entries: list[FstabEntry] = []
+		self._complete = True
+
+		encryption = disk_config.disk_encryption
+		encryption_type = encryption.encryption_type if encryption else EncryptionType.NO_ENCRYPTION
+
+		self._luks_partitions = encryption.partitions if encryption and encryption_type == EncryptionType.LUKS else []
+		self._luks_volumes = encryption.lvm_volumes if encryption and encryption_type == EncryptionType.LUKS_ON_LVM else []
+
+	def _add(
+		self,
+		dev_path: Path,
+		uuid: str | None,
+		fs_type: FilesystemType | None,
+		mountpoint: Path | None,
+		options: list[str],
+		subvols: list[SubvolumeModification],
+	) -> None:
+		if fs_type is None:
+			return
+
+		targets: list[tuple[Path | None, list[str]]]
+
+		if subvols:
+			targets = [(subvol.mountpoint, options + [f'subvol={subvol.name}']) for subvol in subvols if subvol.mountpoint is not None]
+		elif mountpoint is not None or fs_type == FilesystemType.LINUX_SWAP:
+			targets = [(mountpoint, options)]
+		else:
+			return
+
+		# the UUID of devices created by the installation is only known to lsblk
+		if uuid is None and (lsblk_info := lsblk_store.find(dev_path)) is not None:
+			uuid = lsblk_info.uuid
+
+		if uuid is None:
+			debug(f'No file system UUID known for {dev_path}')
+			self._complete = False
+			return
+
+		for target, target_options in targets:
+			self._entries.append(FstabEntry(dev_path, uuid, target, fs_type, target_options))
+
+	def _add_partition(self, part_mod: PartitionModification) -> None:
+		if part_mod.dev_path is None:
+			return
+
+		if part_mod in self._luks_partitions:
+			# encrypted swap isn't activated by the installer
+			if part_mod.is_swap() or not part_mod.mapper_name:
+				return
+
+			dev_path = Path(f'/dev/mapper/{part_mod.mapper_name}')
+			uuid = None
+		elif part_mod.is_swap() or part_mod.fs_type == FilesystemType.BTRFS or part_mod.mountpoint:
+			dev_path = part_mod.dev_path
+			uuid = part_mod.uuid
+		else:
+			return
+
+		subvols = part_mod.btrfs_subvols if part_mod.fs_type == FilesystemType.BTRFS else []
+		self._add(dev_path, uuid, part_mod.fs_type, part_mod.mountpoint, partition_mount_options(part_mod), subvols)
+
+	def _add_volume(self, volume: LvmVolume) -> None:
+		# swap volumes aren't activated by the installer
+		if volume.dev_path is None or volume.fs_type == FilesystemType.LINUX_SWAP:
+			return
+
+		dev_path = volume.mapper_path if volume in self._luks_volumes else volume.dev_path
+		subvols = volume.btrfs_subvols if volume.fs_type == FilesystemType.BTRFS else []
+		self._add(dev_path, None, volume.fs_type, volume.mountpoint, volume.mount_options, subvols)
+
+	def build(self) -> list[FstabEntry] | None:
+		pvs = []
+
+		if lvm_config := self._disk_config.lvm_config:
+			pvs = lvm_config.get_all_pvs()
+
+			for vg in lvm_config.vol_groups:
+				for volume in vg.volumes:
+					self._add_volume(volume)
+
+		for mod in self._disk_config.device_modifications:
+			for part_mod in mod.partitions:
+				if part_mod not in pvs:
+					self._add_partition(part_mod)
+
+		if not self._complete:
+			return None
+
+		# parents have to be mounted before their children
+		return sorted(self._entries, key=lambda entry: (entry.mountpoint is None, entry.mountpoint or Path('/')))
+
+
+def fstab_entries(disk_config: DiskLayoutConfiguration) -> list[FstabEntry] | None:
+	"""
+	The fstab entries of the mounts and swap partitions the installer sets up for
+	the disk layout, or None if the layout doesn't describe all of them.
+	"""
+	if disk_config.config_type == DiskLayoutType.Pre_mount:
+		return None
+
+	return _FstabBuilder(disk_config).build()
+
+
+def _unescape_mountinfo(value: str) -> str:
+	# spaces, tabs, newlines and backslashes are escaped as octal sequences
+	for escaped, char in (('\\040', ' '), ('\\011', '\t'), ('\\012', '\n'), ('\\134', '\\')):
+		value = value.replace(escaped, char)
+	return value
+
+
+@dataclass(frozen=True)
+class TargetMount:
+	# as the installed system sees it
+	mountpoint: Path
+	fs_type: str
+	source: str
+
+
+def target_mounts(target: Path) -> list[TargetMount]:
+	"""
+	The file systems mounted below the target, in mount order.
+	"""
+	mounts = []
+
+	with open('/proc/self/mountinfo') as fp:
+		for line in fp:
+			# the optional fields before the separator vary in number
+			fields, _, fs_fields = line.partition(' - ')
+			mountpoint = Path(_unescape_mountinfo(fields.split()[4]))
+			fs_type, source = fs_fields.split()[:2]
+
+			if mountpoint.is_relative_to(target):
+				mounts.append(TargetMount(Path('/') / mountpoint.relative_to(target), fs_type, _unescape_mountinfo(source)))
+
+	return mounts
+
+
+def target_mountpoints(target: Path) -> set[Path]:
+	"""
+	The mountpoints below the target relative to it, as the installed system sees them.
+	"""
+	return {mount.mountpoint for mount in target_mounts(target)}
@@ -1,17 +1,108 @@
+import json
+import re
 import shlex
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from subprocess import CalledProcessError
 from types import TracebackType
+from typing import Final
 
 from archinstall.lib.command import SysCommand, SysCommandWorker, run
-from archinstall.lib.disk.utils import get_lsblk_info, umount
+from archinstall.lib.disk.utils import get_lsblk_info, lsblk_store, umount
 from archinstall.lib.exceptions import DiskError, SysCallError
+from archinstall.lib.hardware import read_meminfo
 from archinstall.lib.log import debug, info
-from archinstall.lib.models.device import DEFAULT_ITER_TIME
+from archinstall.lib.models.device import DEFAULT_ITER_TIME, PbkdfParams
 from archinstall.lib.models.users import Password
 from archinstall.lib.utils.util import generate_password
 
+# Upper limit of the argon2id memory cost that cryptsetup picks by itself (KiB)
+ARGON2_MAX_MEMORY: Final = 1024 * 1024
+# Share of the available memory that concurrent key derivations may use
+KDF_MEMORY_SHARE: Final = 0.75
+
+_BENCHMARK_RESULT = re.compile(r'argon2id\s+(?P<iterations>\d+) iterations, (?P<memory>\d+) memory, (?P<parallel>\d+) parallel')
+
+
+class KdfMemoryBudget:
+	"""
+	Limits the memory that concurrently running argon2id key derivations
+	(luksFormat, open, luksAddKey) use, so that the live ISO can't run out of memory.
+	"""
+
+	def __init__(self) -> None:
+		self._condition = threading.Condition()
+		self._used = 0
+		self._limit: int | None = None
+
+	@property
+	def limit(self) -> int:
+		if self._limit is None:
+			self._limit = int(read_meminfo().mem_available * KDF_MEMORY_SHARE)
+		return self._limit
+
+	@staticmethod
+	def memory_cost(pbkdf: PbkdfParams | None) -> int:
+		if pbkdf is not None:
+			return pbkdf.memory
+
+		# cryptsetup uses at most half of the physical memory
+		return min(ARGON2_MAX_MEMORY, read_meminfo().mem_total // 2)
+
+	def slots(self, pbkdf: PbkdfParams | None) -> int:
+		"""
+		Number of key derivations that fit into memory at the same time.
+		"""
+		return max(1, self.limit // self.memory_cost(pbkdf))
+
+	@contextmanager
+	def reserve(self, pbkdf: PbkdfParams | None) -> Iterator[None]:
+		memory = self.memory_cost(pbkdf)
+
+		with self._condition:
+			# a single derivation is always allowed to run
+			self._condition.wait_for(lambda: self._used == 0 or self._used + memory <= self.limit)
+			self._used += memory
+
+		try:
+			yield
+		finally:
+			with self._condition:
+				self._used -= memory
+				self._condition.notify_all()
+
+
+kdf_budget = KdfMemoryBudget()
+
+
+def benchmark_pbkdf(iter_time: int = DEFAULT_ITER_TIME) -> PbkdfParams | None:
+	"""
+	Determines the argon2id parameters for the given unlock time once,
+	so that they can be pinned for all volumes instead of every luksFormat
+	benchmarking on its own (and under contention when run concurrently).
+	"""
+	try:
+		output = SysCommand(['cryptsetup', 'benchmark', '--pbkdf', 'argon2id', '--iter-time', str(iter_time)]).decode()
+	except SysCallError as err:
+		debug(f'Unable to benchmark argon2id: {err}')
+		return None
+
+	if (match := _BENCHMARK_RESULT.search(output)) is None:
+		debug(f'Unexpected cryptsetup benchmark output: {output}')
+		return None
+
+	pbkdf = PbkdfParams(
+		iterations=int(match.group('iterations')),
+		memory=int(match.group('memory')),
+		parallel=int(match.group('parallel')),
+	)
+
+	debug(f'argon2id parameters for {iter_time}ms: {pbkdf}')
+	return pbkdf
+
 
 @dataclass
 class Luks2:
@@ -20,6 +111,8 @@ class Luks2:
 	password: Password | None = None
 	key_file: Path | None = None
 	auto_unmount: bool = False
+	# pinned key derivation parameters, cryptsetup benchmarks when not set
+	pbkdf: PbkdfParams | None = None
 
 	@property
 	def mapper_dev(self) -> Path | None:
@@ -40,6 +133,10 @@ class Luks2:
 		worker.poll()
 		worker.write(b'YES\n', line_ending=False)
 
+		# the device must not be in use anymore when it gets wiped afterwards
+		while worker.is_alive():
+			pass
+
 	def __enter__(self) -> None:
 		self.unlock(self.key_file)
 
@@ -90,8 +187,7 @@ class Luks2:
 			hash_type,
 			'--key-size',
 			str(key_size),
-			'--iter-time',
-			str(iter_time),
+			*self._pbkdf_args(iter_time),
 			*key_file_arg,
 			'--use-urandom',
 			'luksFormat',
@@ -101,10 +197,13 @@ class Luks2:
 		debug(f'cryptsetup format: {shlex.join(cmd)}')
 
 		try:
-			result = run(cmd, input_data=passphrase)
+			with kdf_budget.reserve(self.pbkdf):
+				result = run(cmd, input_data=passphrase)
 		except CalledProcessError as err:
 			output = err.stdout.decode().rstrip()
 			raise DiskError(f'Could not encrypt volume "{self.luks_dev_path}": {output}')
+		finally:
+			lsblk_store.invalidate()
 
 		debug(f'cryptsetup luksFormat output: {result.stdout.decode().rstrip()}')
 
@@ -112,6 +211,30 @@ class Luks2:
 
 		return key_file
 
+	def _pbkdf_args(self, iter_time: int = DEFAULT_ITER_TIME) -> list[str]:
+		if self.pbkdf is not None:
+			return self.pbkdf.cryptsetup_args()
+
+		return ['--iter-time', str(iter_time)]
+
+	def pbkdf_params(self) -> PbkdfParams | None:
+		"""
+		Reads the argon2id parameters of the first key slot of the device.
+		"""
+		try:
+			metadata = json.loads(SysCommand(['cryptsetup', 'luksDump', '--dump-json-metadata', str(self.luks_dev_path)]).decode())
+		except (SysCallError, ValueError) as err:
+			debug(f'Unable to read luks2 metadata of {self.luks_dev_path}: {err}')
+			return None
+
+		for _, keyslot in sorted(metadata.get('keyslots', {}).items(), key=lambda item: int(item[0])):
+			kdf = keyslot.get('kdf', {})
+
+			if kdf.get('type') == 'argon2id':
+				return PbkdfParams(iterations=kdf['time'], memory=kdf['memory'], parallel=kdf['cpus'])
+
+		return None
+
 	def _get_luks_uuid(self) -> str:
 		command = f'cryptsetup luksUUID {self.luks_dev_path}'
 
@@ -150,10 +273,13 @@ class Luks2:
 		]
 
 		try:
-			result = run(cmd, input_data=passphrase)
+			with kdf_budget.reserve(self.pbkdf):
+				result = run(cmd, input_data=passphrase)
 		except CalledProcessError as err:
 			output = err.stdout.decode().rstrip()
 			raise DiskError(f'Could not unlock luks2 device "{self.luks_dev_path}": {output}')
+		finally:
+			lsblk_store.invalidate()
 
 		debug(f'cryptsetup open output: {result.stdout.decode().rstrip()}')
 
@@ -177,11 +303,20 @@ class Luks2:
 			# And close it if possible.
 			debug(f'Closing crypt device {child.name}')
 			SysCommand(f'cryptsetup close {child.name}')
+			lsblk_store.invalidate()
 
 	def create_keyfile(self, target_path: Path, override: bool = False) -> None:
 		"""
 		Routine to create keyfiles, so it can be moved elsewhere
 		"""
+		if (kf_path := self.enroll_keyfile(target_path, override)) is not None:
+			self.create_crypttab_entry(target_path, kf_path)
+
+	def enroll_keyfile(self, target_path: Path, override: bool = False) -> Path | None:
+		"""
+		Generates a key file in the target and adds it to the device.
+		Returns the path of the key file on the target or None if an existing key file was kept.
+		"""
 		if self.mapper_name is None:
 			raise ValueError('Mapper name must be provided')
 
@@ -189,12 +324,11 @@ class Luks2:
 		# automatically load this key if we name the device to "xyzloop"
 		kf_path = Path(f'/etc/cryptsetup-keys.d/{self.mapper_name}.key')
 		key_file = target_path / kf_path.relative_to(kf_path.root)
-		crypttab_path = target_path / 'etc/crypttab'
 
 		if key_file.exists():
 			if not override:
 				info(f'Key file {key_file} already exists, keeping existing')
-				return
+				return None
 			else:
 				info(f'Key file {key_file} already exists, overriding')
 
@@ -206,31 +340,43 @@ class Luks2:
 		key_file.chmod(0o400)
 
 		self._add_key(key_file)
-		self._crypttab(crypttab_path, kf_path, options=['luks', 'key-slot=1'])
+		return kf_path
 
-	def create_crypttab_entry(self, target_path: Path) -> None:
+	def create_crypttab_entry(self, target_path: Path, key_file: Path | None = None) -> None:
 		"""
-		Add a crypttab entry without a keyfile so systemd prompts
-		for the passphrase at boot.
+		Add a crypttab entry for the given key file, without a
+		key file systemd prompts for the passphrase at boot.
 		"""
 		if self.mapper_name is None:
 			raise ValueError('Mapper name must be provided')
 
 		crypttab_path = target_path / 'etc/crypttab'
 		crypttab_path.parent.mkdir(parents=True, exist_ok=True)
-		self._crypttab(crypttab_path, Path('none'), options=['luks'])
+
+		if key_file is not None:
+			self._crypttab(crypttab_path, key_file, options=['luks', 'key-slot=1'])
+		else:
+			self._crypttab(crypttab_path, Path('none'), options=['luks'])
 
 	def _add_key(self, key_file: Path) -> None:
 		debug(f'Adding additional key-file {key_file}')
 
-		command = f'cryptsetup -q -v luksAddKey {self.luks_dev_path} {key_file}'
-		worker = SysCommandWorker(command)
-		pw_injected = False
+		# the new key slot gets the parameters of the existing one instead of another benchmark
+		pbkdf = self.pbkdf or self.pbkdf_params()
+		pbkdf_args = shlex.join(pbkdf.cryptsetup_args()) if pbkdf else ''
 
-		while worker.is_alive():
-			if b'Enter any existing passphrase' in worker and pw_injected is False:
-				worker.write(self._password_bytes())
-				pw_injected = True
+		command = f'cryptsetup -q -v luksAddKey {pbkdf_args} {self.luks_dev_path} {key_file}'
+
+		# unlocking the existing key slot and deriving the new one run one after another,
+		# so only one of them holds the memory cost at a time
+		with kdf_budget.reserve(pbkdf):
+			worker = SysCommandWorker(command)
+			pw_injected = False
+
+			while worker.is_alive():
+				if b'Enter any existing passphrase' in worker and pw_injected is False:
+					worker.write(self._password_bytes())
+					pw_injected = True
 
 		if worker.exit_code != 0:
 			raise DiskError(f'Could not add encryption key {key_file} to {self.luks_dev_path}: {worker.decode()}')
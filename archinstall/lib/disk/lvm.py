@@ -4,8 +4,9 @@ from collections.abc import Iterable
 from pathlib import Path
 from typing import Literal, overload
 
-from archinstall.lib.command import SysCommand, SysCommandWorker
-from archinstall.lib.disk.utils import udev_sync
+from archinstall.lib.command import SysCommand
+from archinstall.lib.disk.udev import UdevWatcher
+from archinstall.lib.disk.utils import lsblk_store
 from archinstall.lib.exceptions import SysCallError
 from archinstall.lib.log import debug
 from archinstall.lib.models.device import (
@@ -13,7 +14,6 @@ from archinstall.lib.models.device import (
 	LvmPVInfo,
 	LvmVolume,
 	LvmVolumeGroup,
-	LvmVolumeInfo,
 	SectorSize,
 	Size,
 	Unit,
@@ -22,8 +22,8 @@ from archinstall.lib.models.device import (
 
 def _lvm_info(
 	cmd: str,
-	info_type: Literal['lv', 'vg', 'pvseg'],
-) -> LvmVolumeInfo | LvmGroupInfo | LvmPVInfo | None:
+	info_type: Literal['vg', 'pvseg'],
+) -> LvmGroupInfo | LvmPVInfo | None:
 	raw_info = SysCommand(cmd).decode().split('\n')
 
 	# for whatever reason the output sometimes contains
@@ -47,12 +47,6 @@ def _lvm_info(
 					lv_name=entry['lv_name'],
 					vg_name=entry['vg_name'],
 				)
-			case 'lv':
-				return LvmVolumeInfo(
-					lv_name=entry['lv_name'],
-					vg_name=entry['vg_name'],
-					lv_size=Size(int(entry['lv_size'][:-1]), Unit.B, SectorSize.default()),
-				)
 			case 'vg':
 				return LvmGroupInfo(
 					vg_uuid=entry['vg_uuid'],
@@ -62,10 +56,6 @@ def _lvm_info(
 	return None
 
 
-@overload
-def _lvm_info_with_retry(cmd: str, info_type: Literal['lv']) -> LvmVolumeInfo | None: ...
-
-
 @overload
 def _lvm_info_with_retry(cmd: str, info_type: Literal['vg']) -> LvmGroupInfo | None: ...
 
@@ -76,26 +66,27 @@ def _lvm_info_with_retry(cmd: str, info_type: Literal['pvseg']) -> LvmPVInfo | N
 
 def _lvm_info_with_retry(
 	cmd: str,
-	info_type: Literal['lv', 'vg', 'pvseg'],
-) -> LvmVolumeInfo | LvmGroupInfo | LvmPVInfo | None:
-	# Retry for up to 5 mins
-	max_retries = 100
-	for attempt in range(max_retries):
+	info_type: Literal['vg', 'pvseg'],
+) -> LvmGroupInfo | LvmPVInfo | None:
+	# Retry for up to 5 mins, most queries succeed on the first or second attempt
+	deadline = time.monotonic() + 300
+	delay = 0.1
+	attempt = 1
+
+	while True:
 		try:
 			return _lvm_info(cmd, info_type)
 		except ValueError:
-			if attempt < max_retries - 1:
-				debug(f'LVM info query failed (attempt {attempt + 1}/{max_retries}), retrying in 3 seconds...')
-				time.sleep(3)
-
-	debug(f'LVM info query failed after {max_retries} attempts')
-	return None
+			if time.monotonic() + delay > deadline:
+				break
 
+			debug(f'LVM info query failed (attempt {attempt}), retrying in {delay:.1f} seconds...')
+			time.sleep(delay)
+			delay = min(delay * 2, 3.0)
+			attempt += 1
 
-def lvm_vol_info(lv_name: str) -> LvmVolumeInfo | None:
-	cmd = f'lvs --reportformat json --unit B -S lv_name={lv_name}'
-
-	return _lvm_info_with_retry(cmd, 'lv')
+	debug(f'LVM info query failed after {attempt} attempts')
+	return None
 
 
 def lvm_group_info(vg_name: str) -> LvmGroupInfo | None:
@@ -116,6 +107,7 @@ def lvm_vol_change(vol: LvmVolume, activate: bool) -> None:
 
 	debug(f'lvchange volume: {cmd}')
 	SysCommand(cmd)
+	lsblk_store.invalidate()
 
 
 def lvm_export_vg(vg: LvmVolumeGroup) -> None:
@@ -123,6 +115,7 @@ def lvm_export_vg(vg: LvmVolumeGroup) -> None:
 
 	debug(f'vgexport: {cmd}')
 	SysCommand(cmd)
+	lsblk_store.invalidate()
 
 
 def lvm_import_vg(vg: LvmVolumeGroup) -> None:
@@ -144,6 +137,7 @@ def lvm_import_vg(vg: LvmVolumeGroup) -> None:
 	cmd = f'vgimport {vg.name}'
 	debug(f'vgimport: {cmd}')
 	SysCommand(cmd)
+	lsblk_store.invalidate()
 
 
 def lvm_vol_reduce(vol_path: Path, amount: Size) -> None:
@@ -152,18 +146,22 @@ def lvm_vol_reduce(vol_path: Path, amount: Size) -> None:
 
 	debug(f'Reducing LVM volume size: {cmd}')
 	SysCommand(cmd)
+	lsblk_store.invalidate()
 
 
 def lvm_pv_create(pvs: Iterable[Path]) -> None:
-	pvs_str = ' '.join(str(pv) for pv in pvs)
+	pv_paths = list(pvs)
+	pvs_str = ' '.join(str(pv) for pv in pv_paths)
 	# Signatures are already wiped by wipefs, -f is just for safety
 	cmd = f'pvcreate -f --yes {pvs_str}'
 	# note flags used in scripting
 	debug(f'Creating LVM PVS: {cmd}')
-	SysCommand(cmd)
 
-	# Sync with udev to ensure the PVs are visible
-	udev_sync()
+	with UdevWatcher() as watcher:
+		SysCommand(cmd)
+
+		# wait until udev identified the PVs so that lvm finds them
+		watcher.wait_for_all(pv_paths, 'ID_FS_TYPE')
 
 
 def lvm_vg_create(pvs: Iterable[Path], vg_name: str) -> None:
@@ -173,24 +171,41 @@ def lvm_vg_create(pvs: Iterable[Path], vg_name: str) -> None:
 	debug(f'Creating LVM group: {cmd}')
 	SysCommand(cmd)
 
-	# Sync with udev to ensure the VG is visible
-	udev_sync()
 
-
-def lvm_vol_create(vg_name: str, volume: LvmVolume, offset: Size | None = None) -> None:
+def _lvcreate_cmd(vg_name: str, volume: LvmVolume, offset: Size | None, *options: str) -> str:
 	if offset is not None:
 		length = volume.length - offset
 	else:
 		length = volume.length
 
+	if volume.is_striped():
+		options += (f'--stripes {volume.stripes}',)
+
+		if volume.stripe_size:
+			options += (f'--stripesize {volume.stripe_size.format_size(Unit.KiB, include_unit=False)}k',)
+
 	length_str = length.format_size(Unit.B, include_unit=False)
-	cmd = f'lvcreate --yes -L {length_str}B {vg_name} -n {volume.name}'
+	return ' '.join(['lvcreate --yes', *options, f'-L {length_str}B {vg_name} -n {volume.name}'])
+
+
+def lvm_vols_create(vg_name: str, volumes: dict[LvmVolume, Size | None]) -> None:
+	"""
+	Creates all volumes of a group with their offsets, without waiting for udev
+	after every single lvcreate, and waits for all device nodes at once.
+	"""
+	with UdevWatcher() as watcher:
+		for volume, offset in volumes.items():
+			# zeroing and wiping need the device node, they are done for all volumes below
+			cmd = _lvcreate_cmd(vg_name, volume, offset, '--noudevsync', '--zero n', '--wipesignatures n')
+
+			debug(f'Creating volume: {cmd}')
+			SysCommand(cmd)
 
-	debug(f'Creating volume: {cmd}')
+			volume.vg_name = vg_name
+			volume.dev_path = Path(f'/dev/{vg_name}/{volume.name}')
 
-	worker = SysCommandWorker(cmd)
-	worker.poll()
-	worker.write(b'y\n', line_ending=False)
+		dev_paths = [volume.safe_dev_path for volume in volumes]
+		watcher.wait_for_all(dev_paths)
 
-	volume.vg_name = vg_name
-	volume.dev_path = Path(f'/dev/{vg_name}/{volume.name}')
+	SysCommand(['wipefs', '--all', *[str(path) for path in dev_paths]])
+	lsblk_store.invalidate()
@@ -369,13 +369,20 @@ class PartitioningList(ListManager[DiskSegment]):
 		partition: PartitionModification,
 		option: BtrfsMountOption,
 	) -> None:
-		if option.value not in partition.mount_options:
+		if option == BtrfsMountOption.compress:
+			enabled = BtrfsMountOption.compression_enabled(partition.mount_options)
+		else:
+			enabled = option.value in partition.mount_options
+
+		if not enabled:
 			if option == BtrfsMountOption.compress:
 				partition.mount_options = [o for o in partition.mount_options if o != BtrfsMountOption.nodatacow.value]
 
 			partition.mount_options = [o for o in partition.mount_options if not o.startswith(BtrfsMountOption.compress.name)]
 
 			partition.mount_options.append(option.value)
+		elif option == BtrfsMountOption.compress:
+			partition.mount_options = [o for o in partition.mount_options if not o.startswith(BtrfsMountOption.compress.name)]
 		else:
 			partition.mount_options = [o for o in partition.mount_options if o != option.value]
 
@@ -0,0 +1,196 @@
+import select
+import socket
+import struct
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Final, Self
+
+from archinstall.lib.disk.utils import lsblk_store, udev_sync
+from archinstall.lib.log import debug
+
+UDEV_TIMEOUT: Final = 10.0
+
+_NETLINK_KOBJECT_UEVENT: Final = 15
+# Multicast group of the events that udev has finished processing,
+# group 1 carries the raw kernel events that udev has not seen yet
+_UDEV_MONITOR_GROUP: Final = 2
+_UDEV_PREFIX: Final = b'libudev\0'
+_UDEV_MAGIC: Final = 0xFEEDCAFE
+_RECV_BUFFER: Final = 4 * 1024 * 1024
+_MAX_MESSAGE: Final = 64 * 1024
+
+
+def parse_uevent(data: bytes) -> dict[str, str] | None:
+	"""
+	Parses a uevent message as sent by udev on the netlink socket
+	(or by the kernel) into its properties.
+	"""
+	if data.startswith(_UDEV_PREFIX):
+		if len(data) < 24 or struct.unpack_from('>I', data, 8)[0] != _UDEV_MAGIC:
+			return None
+
+		# the magic is in network byte order, the offsets in host byte order
+		_, offset, length = struct.unpack_from('=III', data, 12)
+		payload = data[offset : offset + length]
+	else:
+		# kernel messages start with a "ACTION@DEVPATH" summary
+		header, _, payload = data.partition(b'\0')
+		if b'@' not in header:
+			return None
+
+	properties = {}
+
+	for entry in payload.split(b'\0'):
+		key, sep, value = entry.decode(errors='replace').partition('=')
+		if sep:
+			properties[key] = value
+
+	return properties
+
+
+class UdevWatcher:
+	"""
+	Waits for udev to finish processing the events of specific block devices
+	instead of settling the whole udev queue.
+
+	The watcher subscribes to the events before the device is changed,
+	so that events can't be missed between the change and the wait:
+
+		with UdevWatcher() as watcher:
+			device_handler.format(fs_type, path)
+			watcher.wait_for(path, 'ID_FS_UUID')
+
+	Whenever the events can't be received the watcher falls back to udevadm settle.
+	"""
+
+	def __init__(self) -> None:
+		self._sock: socket.socket | None = None
+		self._events: list[dict[str, str]] = []
+
+	def open(self) -> None:
+		try:
+			sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, _NETLINK_KOBJECT_UEVENT)
+		except OSError as err:
+			debug(f'Unable to listen for udev events: {err}')
+			return
+
+		try:
+			sock.bind((0, _UDEV_MONITOR_GROUP))
+		except OSError as err:
+			debug(f'Unable to listen for udev events: {err}')
+			sock.close()
+			return
+
+		try:
+			sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _RECV_BUFFER)
+		except OSError:
+			pass
+
+		self._sock = sock
+
+	def close(self) -> None:
+		if self._sock is not None:
+			self._sock.close()
+			self._sock = None
+
+	def __enter__(self) -> Self:
+		self.open()
+		return self
+
+	def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+		self.close()
+
+	@property
+	def listening(self) -> bool:
+		return self._sock is not None
+
+	def drain(self) -> list[dict[str, str]]:
+		"""
+		Returns all events received so far without blocking.
+		Raises OSError if events were dropped because they were not drained in time.
+		"""
+		if self._sock is not None:
+			while True:
+				readable, _, _ = select.select([self._sock], [], [], 0)
+				if not readable:
+					break
+
+				if (event := parse_uevent(self._sock.recv(_MAX_MESSAGE))) is not None:
+					self._events.append(event)
+
+		events, self._events = self._events, []
+		return events
+
+	def _matches(self, event: dict[str, str], dev_path: Path, properties: tuple[str, ...]) -> bool:
+		if event.get('SUBSYSTEM') != 'block' or event.get('ACTION') not in ('add', 'change'):
+			return False
+
+		# symlinks such as /dev/mapper/* only resolve once the device exists
+		names = {str(dev_path), str(dev_path.resolve())}
+		dev_names = {event.get('DEVNAME', ''), *event.get('DEVLINKS', '').split()}
+
+		if names.isdisjoint(dev_names):
+			return False
+
+		return all(event.get(prop) for prop in properties)
+
+	def _take(self, dev_path: Path, properties: tuple[str, ...]) -> bool:
+		for index, event in enumerate(self._events):
+			if self._matches(event, dev_path, properties):
+				del self._events[index]
+				return True
+
+		return False
+
+	def _receive(self, timeout: float) -> None:
+		assert self._sock is not None
+
+		readable, _, _ = select.select([self._sock], [], [], timeout)
+		if not readable:
+			return
+
+		data = self._sock.recv(_MAX_MESSAGE)
+
+		if (event := parse_uevent(data)) is not None:
+			self._events.append(event)
+
+	def _fallback(self, reason: str) -> bool:
+		debug(f'{reason}, synchronizing with udev')
+		udev_sync()
+		return False
+
+	def wait_for(self, dev_path: Path, *properties: str, timeout: float = UDEV_TIMEOUT) -> bool:
+		"""
+		Blocks until udev has processed an event of the device
+		that carries all given properties, e.g. ID_FS_UUID.
+		Returns False if it had to fall back to udevadm settle.
+		"""
+		if self._sock is None:
+			return self._fallback('No udev event socket')
+
+		deadline = time.monotonic() + timeout
+
+		while not self._take(dev_path, properties):
+			remaining = deadline - time.monotonic()
+
+			if remaining <= 0:
+				return self._fallback(f'No udev event received for {dev_path} within {timeout}s')
+
+			try:
+				self._receive(remaining)
+			except OSError as err:
+				# ENOBUFS means events were dropped, one of them may be the one we wait for
+				return self._fallback(f'Failed to receive udev events: {err}')
+
+		debug(f'udev processed {dev_path}')
+		lsblk_store.invalidate()
+		return True
+
+	def wait_for_all(self, dev_paths: list[Path], *properties: str, timeout: float = UDEV_TIMEOUT) -> None:
+		deadline = time.monotonic() + timeout
+
+		for dev_path in dev_paths:
+			if not self.wait_for(dev_path, *properties, timeout=max(0.0, deadline - time.monotonic())):
+				# udev settled, every remaining device is processed as well
+				return
@@ -1,3 +1,4 @@
+import threading
 from pathlib import Path
 from subprocess import CalledProcessError
 
@@ -44,11 +45,120 @@ def _fetch_lsblk_info(
 	return LsblkOutput.model_validate_json(result.stdout)
 
 
+class _LsblkSnapshot:
+	"""
+	One parsed lsblk tree, indexed for the lookups done during an installation.
+	"""
+
+	def __init__(self, blockdevices: list[LsblkInfo]) -> None:
+		self.blockdevices = blockdevices
+		self.by_path: dict[Path, LsblkInfo] = {}
+		self.by_mountpoint: dict[Path, list[LsblkInfo]] = {}
+		self.by_uuid: dict[str, LsblkInfo] = {}
+		self.by_partuuid: dict[str, LsblkInfo] = {}
+		self.parents: dict[Path, LsblkInfo] = {}
+
+		pending: list[tuple[LsblkInfo, LsblkInfo | None]] = [(info, None) for info in blockdevices]
+
+		while pending:
+			lsblk_info, parent = pending.pop(0)
+
+			# devices spanning multiple parents (e.g. LVM volumes) show up once per parent
+			if lsblk_info.path in self.by_path:
+				continue
+
+			self.by_path[lsblk_info.path] = lsblk_info
+
+			# /dev/mapper/* and friends are symlinks, index the device nodes as well
+			if (resolved := lsblk_info.path.resolve()) != lsblk_info.path:
+				self.by_path.setdefault(resolved, lsblk_info)
+
+			for mountpoint in lsblk_info.mountpoints:
+				self.by_mountpoint.setdefault(mountpoint, []).append(lsblk_info)
+
+			if lsblk_info.uuid:
+				self.by_uuid.setdefault(lsblk_info.uuid, lsblk_info)
+
+			if lsblk_info.partuuid:
+				self.by_partuuid.setdefault(lsblk_info.partuuid, lsblk_info)
+
+			if parent is not None:
+				self.parents[lsblk_info.path] = parent
+
+			pending.extend((child, lsblk_info) for child in lsblk_info.children)
+
+	def find(self, dev_path: Path) -> LsblkInfo | None:
+		return self.by_path.get(dev_path) or self.by_path.get(dev_path.resolve())
+
+
+class LsblkStore:
+	"""
+	Caches the block device state so that the lsblk lookups don't each fork lsblk.
+
+	The state is read lazily with a single lsblk call and is invalidated by
+	everything that changes the block devices (partitioning, formatting,
+	mounting, cryptsetup and LVM) as well as by udev synchronization.
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._snapshot: _LsblkSnapshot | None = None
+		self._generation = 0
+
+	@property
+	def generation(self) -> int:
+		"""
+		Changes whenever the block devices were modified.
+		"""
+		return self._generation
+
+	def invalidate(self) -> None:
+		with self._lock:
+			self._snapshot = None
+			self._generation += 1
+
+	def snapshot(self, refresh: bool = False) -> _LsblkSnapshot:
+		with self._lock:
+			if self._snapshot is not None and not refresh:
+				return self._snapshot
+
+			generation = self._generation
+
+		snapshot = _LsblkSnapshot(_fetch_lsblk_info().blockdevices)
+
+		with self._lock:
+			# a mutation that happened while lsblk was running makes the result stale
+			if generation == self._generation:
+				self._snapshot = snapshot
+
+		return snapshot
+
+	def find(self, dev_path: Path) -> LsblkInfo | None:
+		if (lsblk_info := self.snapshot().find(dev_path)) is not None:
+			return lsblk_info
+
+		# the device may have been created after the state was read
+		return self.snapshot(refresh=True).find(dev_path)
+
+
+lsblk_store = LsblkStore()
+
+
 def get_lsblk_info(
 	dev_path: Path | str,
 	reverse: bool = False,
 	full_dev_path: bool = False,
 ) -> LsblkInfo:
+	if isinstance(dev_path, str):
+		dev_path = Path(dev_path)
+
+	if not reverse and not full_dev_path:
+		if (lsblk_info := lsblk_store.find(dev_path)) is not None:
+			return lsblk_info
+
+		raise DiskError(f'lsblk failed to retrieve information for "{dev_path}"')
+
+	# the inverse tree (device -> parents) is not cached
 	infos = _fetch_lsblk_info(dev_path, reverse=reverse, full_dev_path=full_dev_path)
 
 	if infos.blockdevices:
@@ -58,11 +168,27 @@ def get_lsblk_info(
 
 
 def get_all_lsblk_info() -> list[LsblkInfo]:
-	return _fetch_lsblk_info().blockdevices
+	return list(lsblk_store.snapshot().blockdevices)
 
 
 def get_lsblk_output() -> LsblkOutput:
-	return _fetch_lsblk_info()
+	return LsblkOutput(blockdevices=get_all_lsblk_info())
+
+
+def get_lsblk_snapshot() -> dict[Path, LsblkInfo]:
+	"""
+	All block devices including partitions and other children, indexed by device path,
+	so that a whole batch of devices can be looked up from a single lsblk call.
+	"""
+	return dict(lsblk_store.snapshot().by_path)
+
+
+def get_lsblk_by_uuid(uuid: str) -> LsblkInfo | None:
+	return lsblk_store.snapshot().by_uuid.get(uuid)
+
+
+def get_lsblk_by_partuuid(partuuid: str) -> LsblkInfo | None:
+	return lsblk_store.snapshot().by_partuuid.get(partuuid)
 
 
 def find_lsblk_info(
@@ -80,24 +206,18 @@ def find_lsblk_info(
 
 
 def get_lsblk_by_mountpoint(mountpoint: Path, as_prefix: bool = False) -> list[LsblkInfo]:
-	def _check(infos: list[LsblkInfo]) -> list[LsblkInfo]:
-		devices = []
-		for entry in infos:
-			if as_prefix:
-				matches = [m for m in entry.mountpoints if str(m).startswith(str(mountpoint))]
-				if matches:
-					devices += [entry]
-			elif mountpoint in entry.mountpoints:
-				devices += [entry]
+	by_mountpoint = lsblk_store.snapshot().by_mountpoint
+
+	if not as_prefix:
+		return list(by_mountpoint.get(mountpoint, []))
 
-			if len(entry.children) > 0:
-				if len(match := _check(entry.children)) > 0:
-					devices += match
+	devices: list[LsblkInfo] = []
 
-		return devices
+	for path, infos in by_mountpoint.items():
+		if str(path).startswith(str(mountpoint)):
+			devices += [info for info in infos if info not in devices]
 
-	all_info = get_all_lsblk_info()
-	return _check(all_info)
+	return devices
 
 
 def disk_layouts() -> str:
@@ -111,10 +231,47 @@ def disk_layouts() -> str:
 
 
 def get_parent_device_path(dev_path: Path) -> Path:
+	snapshot = lsblk_store.snapshot()
+
+	if (parent := snapshot.parents.get(dev_path)) is not None:
+		return parent.path
+
 	lsblk = get_lsblk_info(dev_path)
 	return Path(f'/dev/{lsblk.pkname}')
 
 
+def block_queue_attr(dev_path: Path, attr: str) -> str | None:
+	"""
+	Reads a queue attribute of a block device from sysfs,
+	partitions report the queue of the disk they are on.
+	"""
+	sys_path = Path('/sys/class/block') / dev_path.resolve().name
+
+	if (sys_path / 'partition').exists():
+		sys_path = sys_path.resolve().parent
+
+	try:
+		return (sys_path / 'queue' / attr).read_text().strip()
+	except OSError:
+		return None
+
+
+def underlying_disks(dev_path: Path) -> set[Path]:
+	"""
+	The disks a block device is on, partitions are resolved to their disk
+	and device mapper devices like LUKS or LVM volumes to the devices they map.
+	"""
+	sys_path = Path('/sys/class/block') / dev_path.resolve().name
+
+	if (sys_path / 'partition').exists():
+		return {Path('/dev') / sys_path.resolve().parent.name}
+
+	if slaves := sorted((sys_path / 'slaves').glob('*')):
+		return set().union(*(underlying_disks(Path('/dev') / slave.name) for slave in slaves))
+
+	return {Path('/dev') / sys_path.name}
+
+
 def get_unique_path_for_device(dev_path: Path) -> Path | None:
 	paths = Path('/dev/disk/by-id').glob('*')
 	linked_targets = {p.resolve(): p for p in paths}
@@ -135,6 +292,9 @@ def udev_sync() -> None:
 	except SysCallError as err:
 		debug(f'Failed to synchronize with udev: {err}')
 
+	# whatever udev processed may have changed the block devices
+	lsblk_store.invalidate()
+
 
 def mount(
 	dev_path: Path,
@@ -171,6 +331,8 @@ def mount(
 		SysCommand(command)
 	except SysCallError as err:
 		raise DiskError(f'Could not mount {dev_path}: {command}\n{err.message}')
+	finally:
+		lsblk_store.invalidate()
 
 
 def umount(mountpoint: Path, recursive: bool = False) -> None:
@@ -186,9 +348,12 @@ def umount(mountpoint: Path, recursive: bool = False) -> None:
 	if recursive:
 		cmd.append('-R')
 
-	for path in lsblk_info.mountpoints:
-		debug(f'Unmounting mountpoint: {path}')
-		SysCommand(cmd + [str(path)])
+	try:
+		for path in lsblk_info.mountpoints:
+			debug(f'Unmounting mountpoint: {path}')
+			SysCommand(cmd + [str(path)])
+	finally:
+		lsblk_store.invalidate()
 
 
 def swapon(path: Path) -> None:
@@ -196,6 +361,8 @@ def swapon(path: Path) -> None:
 		SysCommand(['swapon', str(path)])
 	except SysCallError as err:
 		raise DiskError(f'Could not enable swap {path}:\n{err.message}')
+	finally:
+		lsblk_store.invalidate()
 
 
 def linux_root_guid(arch: str | None) -> PartitionGUID:
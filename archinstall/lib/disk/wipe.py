@@ -0,0 +1,177 @@
+import errno
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.disk.utils import block_queue_attr, lsblk_store
+from archinstall.lib.exceptions import DiskError
+from archinstall.lib.log import debug, info, warn
+from archinstall.lib.models.device import WipeMode
+
+# ioctl requests from linux/fs.h
+BLKGETSIZE64: Final = 0x80081272
+BLKDISCARD: Final = 0x1277
+BLKSECDISCARD: Final = 0x127D
+BLKZEROOUT: Final = 0x127F
+
+# Size of the ranges passed to a single ioctl, progress is reported in between
+IOCTL_CHUNK: Final = 1024**3
+# Buffer size and number of threads when zeros are written out
+OVERWRITE_BUFFER: Final = 4 * 1024**2
+OVERWRITE_THREADS: Final = 4
+_PROGRESS_INTERVAL: Final = 5.0
+
+
+class WipeProgress:
+	"""
+	Thread safe progress of a device wipe, logged at most every few seconds.
+	"""
+
+	def __init__(self, dev_path: Path, total: int) -> None:
+		self._dev_path = dev_path
+		self._total = max(1, total)
+		self._done = 0
+		self._lock = threading.Lock()
+		self._last_report = time.monotonic()
+
+	@property
+	def percentage(self) -> int:
+		return int(self._done * 100 / self._total)
+
+	def update(self, amount: int) -> None:
+		with self._lock:
+			self._done += amount
+			now = time.monotonic()
+
+			if now - self._last_report >= _PROGRESS_INTERVAL or self._done >= self._total:
+				self._last_report = now
+				info(f'Wiping {self._dev_path}: {self.percentage}%')
+
+
+def _device_size(fd: int) -> int:
+	return struct.unpack('Q', fcntl.ioctl(fd, BLKGETSIZE64, bytes(8)))[0]
+
+
+def _supports_discard(dev_path: Path) -> bool:
+	return (block_queue_attr(dev_path, 'discard_max_bytes') or '0') != '0'
+
+
+def _supports_zeroout(dev_path: Path) -> bool:
+	return (block_queue_attr(dev_path, 'write_zeroes_max_bytes') or '0') != '0'
+
+
+def resolve_wipe_mode(dev_path: Path, mode: WipeMode) -> WipeMode:
+	"""
+	Picks the fastest way to clear the device for the automatic mode.
+	"""
+	if mode != WipeMode.Auto:
+		return mode
+
+	rotational = block_queue_attr(dev_path, 'rotational') == '1'
+
+	if not rotational and _supports_discard(dev_path):
+		return WipeMode.Discard
+
+	if _supports_zeroout(dev_path):
+		return WipeMode.ZeroOut
+
+	return WipeMode.Overwrite
+
+
+def _ioctl_ranges(fd: int, request: int, size: int, progress: WipeProgress) -> None:
+	for start in range(0, size, IOCTL_CHUNK):
+		length = min(IOCTL_CHUNK, size - start)
+		fcntl.ioctl(fd, request, struct.pack('=QQ', start, length))
+		progress.update(length)
+
+
+def _overwrite_range(dev_path: Path, start: int, end: int, progress: WipeProgress) -> None:
+	# anonymous mappings are page aligned and zero filled, as O_DIRECT requires
+	with mmap.mmap(-1, OVERWRITE_BUFFER) as buffer:
+		view = memoryview(buffer)
+		fd = os.open(dev_path, os.O_WRONLY | os.O_DIRECT)
+
+		try:
+			position = start
+
+			while position < end:
+				written = os.pwrite(fd, view[: min(OVERWRITE_BUFFER, end - position)], position)
+				position += written
+				progress.update(written)
+
+			os.fsync(fd)
+		finally:
+			view.release()
+			os.close(fd)
+
+
+def _overwrite(dev_path: Path, size: int, progress: WipeProgress) -> None:
+	# every thread writes its own contiguous part of the device
+	part_size = -(-size // OVERWRITE_THREADS)
+	part_size += -part_size % OVERWRITE_BUFFER
+	ranges = [(start, min(start + part_size, size)) for start in range(0, size, part_size)]
+
+	with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+		futures = [executor.submit(_overwrite_range, dev_path, start, end, progress) for start, end in ranges]
+
+		for future in futures:
+			future.result()
+
+
+def wipe_device(dev_path: Path, mode: WipeMode) -> None:
+	"""
+	Clears the entire device with the given mode, falling back
+	to the next slower mode if the device doesn't support it.
+	"""
+	if mode == WipeMode.Signatures:
+		return
+
+	mode = resolve_wipe_mode(dev_path, mode)
+
+	# O_EXCL fails if the device or any of its partitions is still in use
+	try:
+		fd = os.open(dev_path, os.O_WRONLY | os.O_EXCL)
+	except OSError as err:
+		raise DiskError(f'Unable to open {dev_path} for wiping: {err}')
+
+	try:
+		size = _device_size(fd)
+		progress = WipeProgress(dev_path, size)
+
+		info(f'Wiping {dev_path} ({size // 1024**2} MiB) with {mode.display_msg()}')
+
+		if mode in (WipeMode.Discard, WipeMode.SecureDiscard):
+			request = BLKSECDISCARD if mode == WipeMode.SecureDiscard else BLKDISCARD
+
+			try:
+				_ioctl_ranges(fd, request, size, progress)
+				return
+			except OSError as err:
+				if err.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+					raise DiskError(f'Failed to discard {dev_path}: {err}')
+
+				warn(f'{dev_path} does not support {mode.display_msg()}, zeroing it out instead')
+				progress = WipeProgress(dev_path, size)
+				mode = WipeMode.ZeroOut
+
+		if mode == WipeMode.ZeroOut:
+			try:
+				# the device zeroes the blocks itself (e.g. WRITE ZEROES/WRITE SAME) where supported
+				_ioctl_ranges(fd, BLKZEROOUT, size, progress)
+				return
+			except OSError as err:
+				debug(f'BLKZEROOUT failed on {dev_path}: {err}')
+				progress = WipeProgress(dev_path, size)
+
+		_overwrite(dev_path, size, progress)
+	except OSError as err:
+		raise DiskError(f'Failed to wipe {dev_path}: {err}')
+	finally:
+		os.close(fd)
+		lsblk_store.invalidate()
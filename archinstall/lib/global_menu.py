@@ -20,7 +20,7 @@ from archinstall.lib.models.authentication import AuthenticationConfiguration
 from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration
 from archinstall.lib.models.device import DiskLayoutConfiguration, DiskLayoutType, PartitionModification
 from archinstall.lib.models.locale import LocaleConfiguration
-from archinstall.lib.models.mirrors import MirrorConfiguration
+from archinstall.lib.models.mirrors import MirrorConfiguration, MirrorSelectionMode
 from archinstall.lib.models.network import NetworkConfiguration, NicType
 from archinstall.lib.models.package_types import DEFAULT_KERNEL
 from archinstall.lib.models.packages import Repository
@@ -264,7 +264,8 @@ class GlobalMenu(AbstractMenu[None]):
 		return f'{tr("Language")}: {lang.display_name}'
 
 	async def _select_applications(self, preset: ApplicationConfiguration | None) -> ApplicationConfiguration | None:
-		app_config = await ApplicationMenu(preset).show()
+		disk_config = self._item_group.find_by_key('disk_config').value
+		app_config = await ApplicationMenu(preset, disk_config).show()
 		return app_config
 
 	async def _select_authentication(self, preset: AuthenticationConfiguration | None) -> AuthenticationConfiguration | None:
@@ -618,7 +619,11 @@ class GlobalMenu(AbstractMenu[None]):
 		mirror_config: MirrorConfiguration = item.value
 
 		output = ''
-		if mirror_config.mirror_regions:
+		if mirror_config.selection_mode == MirrorSelectionMode.Auto:
+			title = tr('Mirror selection')
+			divider = '-' * len(title)
+			output += f'{title}\n{divider}\n{mirror_config.selection_mode.display_msg()}\n\n'
+		elif mirror_config.mirror_regions:
 			title = tr('Selected mirror regions')
 			divider = '-' * len(title)
 			regions = mirror_config.region_names
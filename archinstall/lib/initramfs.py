@@ -0,0 +1,349 @@
+import filecmp
+import hashlib
+import lzma
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.benchmark import timed
+from archinstall.lib.command import SysCommand
+from archinstall.lib.disk.fs_tuning import DeviceTopology
+from archinstall.lib.exceptions import SysCallError
+from archinstall.lib.hardware import read_meminfo
+from archinstall.lib.log import debug, error, info, log, logger
+from archinstall.lib.models.bootloader import InitramfsCompression
+
+# The pacman hook of mkinitcpio that rebuilds all presets when kernels or modules change
+MKINITCPIO_PACMAN_HOOK: Final = '90-mkinitcpio-install.hook'
+# The preset the hook creates for every kernel package
+_PRESET_TEMPLATE: Final = 'usr/share/mkinitcpio/hook.preset'
+
+# Configuration files that end up in, or shape, the initramfs and UKIs
+_CONFIG_FILES: Final = (
+	'etc/mkinitcpio.conf',
+	'etc/vconsole.conf',
+	'etc/kernel/cmdline',
+	'etc/plymouth/plymouthd.conf',
+)
+_CONFIG_GLOBS: Final = (
+	'etc/mkinitcpio.conf.d/*.conf',
+	'etc/mkinitcpio.d/*.preset',
+)
+# Files and directories whose modification time changes with the kernel and its modules
+_CONTENT_GLOBS: Final = (
+	'usr/lib/modules/*/vmlinuz',
+	'usr/lib/modules/*/modules.dep',
+	'usr/lib/initcpio/install',
+	'usr/lib/initcpio/hooks',
+	'boot/*-ucode.img',
+)
+# Memory a single preset build takes at most, the image is assembled in the
+# tmpfs of the chroot and compressed there, UKIs also hold the kernel
+_BUILD_MEMORY: Final = 768 * 1024**2
+
+# Rates at which the firmware reads the images from the boot device, in bytes/s,
+# its block I/O is considerably slower than the kernel drivers
+_HDD_FIRMWARE_READ_RATE: Final = 80 * 1024**2
+_SSD_FIRMWARE_READ_RATE: Final = 250 * 1024**2
+_NVME_FIRMWARE_READ_RATE: Final = 800 * 1024**2
+_LZ4_BENCHMARK_RE: Final = re.compile(r'\(\s*([\d.]+)\s*\)\s*,\s*[\d.]+\s*MB/s\s*,\s*([\d.]+)\s*MB/s')
+
+
+class InitramfsBuilder:
+	"""
+	Coordinates the mkinitcpio builds of an installation.
+
+	Installation steps request a build whenever they change the
+	initramfs configuration, and the images are only built once they are
+	needed. A build is skipped if none of its inputs changed since the
+	last one. While packages are installed the mkinitcpio pacman hook is
+	masked, so that installing kernels, drivers or plymouth doesn't
+	rebuild every preset in between.
+	"""
+
+	def __init__(self, target: Path, run: Callable[[str, bool], SysCommand], log_dir: Path | None = None) -> None:
+		self._target = target
+		self._run = run
+		self._log_dir = log_dir or logger.directory
+		self._pending = False
+		self._built: str | None = None
+		self._masked_hook: Path | None = None
+
+	@property
+	def pending(self) -> bool:
+		return self._pending
+
+	def fingerprint(self) -> str:
+		"""
+		A digest of everything that goes into the images, config files by
+		their content and the kernels and modules by their modification time.
+		"""
+		digest = hashlib.sha256()
+
+		config_files = [self._target / path for path in _CONFIG_FILES]
+		config_files += [path for pattern in _CONFIG_GLOBS for path in sorted(self._target.glob(pattern))]
+
+		for path in config_files:
+			digest.update(str(path).encode())
+			if path.is_file():
+				digest.update(path.read_bytes())
+
+		for pattern in _CONTENT_GLOBS:
+			for path in sorted(self._target.glob(pattern)):
+				stat = path.stat()
+				digest.update(f'{path}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+
+		return digest.hexdigest()
+
+	def mask_pacman_hook(self) -> Path:
+		"""
+		Masks the mkinitcpio pacman hook in the target and returns the hook
+		directory that pacstrap has to use, as it reads the host's by default.
+		"""
+		hook_dir = self._target / 'etc/pacman.d/hooks'
+		hook = hook_dir / MKINITCPIO_PACMAN_HOOK
+
+		if self._masked_hook is None and not hook.exists() and not hook.is_symlink():
+			hook_dir.mkdir(parents=True, exist_ok=True)
+			hook.symlink_to(os.devnull)
+			self._masked_hook = hook
+			debug(f'Masked {MKINITCPIO_PACMAN_HOOK} for the installation')
+
+		return hook_dir
+
+	def unmask_pacman_hook(self) -> None:
+		if self._masked_hook is not None:
+			self._masked_hook.unlink(missing_ok=True)
+			self._masked_hook = None
+			debug(f'Unmasked {MKINITCPIO_PACMAN_HOOK}')
+
+	def request(self) -> None:
+		self._pending = True
+
+	def install_kernels(self) -> None:
+		"""
+		The part of the masked pacman hook that doesn't build any image: kernel
+		packages only ship usr/lib/modules/<version>/vmlinuz, the hook copies it
+		to /boot and creates the mkinitcpio preset of the package.
+		"""
+		template = self._target / _PRESET_TEMPLATE
+
+		for pkgbase_file in sorted(self._target.glob('usr/lib/modules/*/pkgbase')):
+			vmlinuz = pkgbase_file.with_name('vmlinuz')
+
+			if not vmlinuz.is_file():
+				continue
+
+			pkgbase = pkgbase_file.read_text().strip()
+			image = self._target / 'boot' / f'vmlinuz-{pkgbase}'
+
+			if not image.is_file() or not filecmp.cmp(vmlinuz, image, shallow=False):
+				debug(f'Installing {vmlinuz.relative_to(self._target)} as /boot/{image.name}')
+				image.parent.mkdir(parents=True, exist_ok=True)
+				shutil.copyfile(vmlinuz, image)
+				image.chmod(0o644)
+
+			preset = self._target / 'etc/mkinitcpio.d' / f'{pkgbase}.preset'
+
+			if preset.exists():
+				continue
+
+			# the preset of a reinstalled kernel package is restored
+			if (pacsave := preset.with_name(f'{preset.name}.pacsave')).exists():
+				pacsave.rename(preset)
+			elif template.is_file():
+				debug(f'Creating the mkinitcpio preset {preset.name}')
+				preset.parent.mkdir(parents=True, exist_ok=True)
+				preset.write_text(template.read_text().replace('%PKGBASE%', pkgbase))
+
+	def presets(self) -> list[str]:
+		return sorted(path.stem for path in self._target.glob('etc/mkinitcpio.d/*.preset'))
+
+	def build(self, flags: list[str]) -> bool:
+		self.install_kernels()
+
+		try:
+			self._run(f'mkinitcpio {" ".join(flags)}', True)
+			return True
+		except SysCallError as err:
+			if err.worker_log:
+				log(err.worker_log.decode())
+			return False
+
+	def build_slots(self, presets: int) -> int:
+		"""
+		Number of presets that are built at the same time, compressing an
+		image mostly runs on a single core and every build needs its own memory.
+		"""
+		cores = os.cpu_count() or 1
+		memory = read_meminfo().mem_available * 1024 // _BUILD_MEMORY
+		return max(1, min(presets, cores, memory))
+
+	def _build_preset(self, preset: str, peek_output: bool) -> bool:
+		log_file = self._log_dir / f'mkinitcpio-{preset}.log'
+
+		try:
+			output = self._run(f'mkinitcpio -p {preset}', peek_output).output()
+			success = True
+		except SysCallError as err:
+			output = err.worker_log
+			success = False
+
+		try:
+			log_file.write_bytes(output)
+		except OSError as err:
+			debug(f'Unable to write {log_file}: {err}')
+
+		if not success:
+			error(f'Failed to build the {preset} preset, see {log_file}')
+
+		return success
+
+	def build_presets(self, presets: list[str]) -> bool:
+		"""
+		Builds the initramfs images and UKIs of every preset, which are
+		independent of each other, concurrently. The output of each build
+		is written to its own log file.
+		"""
+		workers = self.build_slots(len(presets))
+		debug(f'Building presets {", ".join(presets)} with {workers} workers')
+
+		if workers == 1:
+			return all([self._build_preset(preset, True) for preset in presets])
+
+		# the output of concurrent builds would interleave on the terminal
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(lambda preset: self._build_preset(preset, False), presets))
+
+		return all(results)
+
+	def flush(self) -> bool:
+		"""
+		Builds all presets if a build was requested and any input changed
+		since the last build, returns False if the build failed.
+		"""
+		# the bootloader needs the kernels in /boot even if no image is built
+		self.install_kernels()
+
+		if not self._pending:
+			return True
+
+		self._pending = False
+		fingerprint = self.fingerprint()
+
+		if fingerprint == self._built:
+			debug('Initramfs is up to date, skipping the build')
+			return True
+
+		info('Building initramfs images')
+
+		if presets := self.presets():
+			built = self.build_presets(presets)
+		else:
+			built = self.build(['-P'])
+
+		if not built:
+			return False
+
+		# the build itself doesn't change any input
+		self._built = fingerprint
+		return True
+
+	def finalize(self) -> bool:
+		"""
+		Restores the pacman hook and builds the images a last time if
+		packages installed since the last build changed the kernels or
+		modules, or if the masked hook would have built them.
+		"""
+		if self._masked_hook is not None or self._built is not None:
+			self._pending = True
+
+		self.unmask_pacman_hook()
+		return self.flush()
+
+
+def firmware_read_rate(dev_path: Path) -> int:
+	topology = DeviceTopology.from_device(dev_path)
+
+	if topology.rotational:
+		return _HDD_FIRMWARE_READ_RATE
+	if topology.nvme:
+		return _NVME_FIRMWARE_READ_RATE
+	return _SSD_FIRMWARE_READ_RATE
+
+
+def _lz4_benchmark(sample: bytes) -> tuple[int, float] | None:
+	# there's no lz4 module in the standard library, the lz4 tool has a benchmark mode
+	with tempfile.NamedTemporaryFile() as fp:
+		fp.write(sample)
+		fp.flush()
+
+		try:
+			output = subprocess.run(['lz4', '-b1', '-i1', fp.name], capture_output=True, text=True, check=True)
+		except (OSError, subprocess.CalledProcessError) as err:
+			debug(f'Unable to benchmark lz4: {err}')
+			return None
+
+	# lz4 reports on stderr
+	if not (match := _LZ4_BENCHMARK_RE.search(output.stdout + output.stderr)):
+		return None
+
+	ratio, decompress_rate = float(match.group(1)), float(match.group(2)) * 1000**2
+	return int(len(sample) / ratio), len(sample) / decompress_rate
+
+
+def _benchmark(compression: InitramfsCompression, sample: bytes) -> tuple[int, float] | None:
+	"""
+	Compressed size of the sample and the time it takes to decompress it.
+	"""
+	match compression:
+		case InitramfsCompression.NONE:
+			return len(sample), 0.0
+		case InitramfsCompression.LZ4:
+			return _lz4_benchmark(sample)
+		case InitramfsCompression.XZ:
+			compressed = lzma.compress(sample, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC32)
+			return len(compressed), timed(lambda: lzma.decompress(compressed))
+		case InitramfsCompression.AUTO:
+			return None
+		case _:
+			try:
+				from compression import zstd
+			except ImportError:
+				return None
+
+			level = int(compression.value.partition(':')[2])
+			compressed = zstd.compress(sample, level=level)
+			return len(compressed), timed(lambda: zstd.decompress(compressed))
+
+
+def select_compression(sample: bytes, read_rate: int) -> InitramfsCompression:
+	"""
+	Picks the compression that loads and unpacks the images fastest, the
+	time to read the compressed sample from the boot device plus the time
+	to decompress it on this CPU.
+	"""
+	best = InitramfsCompression.ZSTD_3
+	best_time: float | None = None
+
+	if not sample:
+		return best
+
+	for compression in InitramfsCompression:
+		if (result := _benchmark(compression, sample)) is None:
+			continue
+
+		size, decompress_time = result
+		boot_time = size / read_rate + decompress_time
+		debug(f'Initramfs compression {compression.value}: {size} bytes, {boot_time * 1000:.1f}ms to load')
+
+		if best_time is None or boot_time < best_time:
+			best, best_time = compression, boot_time
+
+	return best
@@ -6,16 +6,20 @@ import subprocess
 import textwrap
 import time
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from subprocess import CalledProcessError
 from types import TracebackType
 from typing import Any, Self
 
+from archinstall.lib.benchmark import compression_sample
 from archinstall.lib.boot import Boot
 from archinstall.lib.bootloader.utils import validate_bootloader_layout
 from archinstall.lib.command import SysCommand, run
 from archinstall.lib.disk.fido import Fido2
-from archinstall.lib.disk.luks import Luks2, unlock_luks2_dev
+from archinstall.lib.disk.fs_tuning import DeviceTopology
+from archinstall.lib.disk.fstab import fstab_entries, partition_mount_options, target_mountpoints
+from archinstall.lib.disk.luks import Luks2, kdf_budget, unlock_luks2_dev
 from archinstall.lib.disk.lvm import lvm_import_vg, lvm_pvseg_info, lvm_vol_change
 from archinstall.lib.disk.utils import (
 	get_lsblk_by_mountpoint,
@@ -26,13 +30,14 @@ from archinstall.lib.disk.utils import (
 	swapon,
 )
 from archinstall.lib.exceptions import DiskError, HardwareIncompatibilityError, RequirementError, ServiceException, SysCallError
-from archinstall.lib.hardware import SysInfo
+from archinstall.lib.hardware import SysInfo, read_meminfo
+from archinstall.lib.initramfs import InitramfsBuilder, firmware_read_rate, select_compression
 from archinstall.lib.linux_path import LPath
 from archinstall.lib.locale.utils import verify_keyboard_layout, verify_x11_keyboard_layout
 from archinstall.lib.log import debug, error, info, log, logger, warn
 from archinstall.lib.mirror.mirror_handler import MirrorListHandler
-from archinstall.lib.models.application import ZramAlgorithm
-from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration, PlymouthTheme
+from archinstall.lib.models.application import ZramAlgorithm, ZramConfiguration
+from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration, InitramfsCompression, PlymouthTheme
 from archinstall.lib.models.device import (
 	DiskEncryption,
 	DiskLayoutConfiguration,
@@ -59,6 +64,7 @@ from archinstall.lib.pacman.pacman import Pacman
 from archinstall.lib.pathnames import MIRRORLIST, PACMAN_CONF
 from archinstall.lib.plugins import plugins
 from archinstall.lib.translationhandler import tr
+from archinstall.lib.zram import tune_zram, zram_sysctls
 
 # Any package that the Installer() is responsible for (optional and the default ones)
 # https://github.com/archlinux/archinstall/issues/4368
@@ -71,6 +77,21 @@ __packages__ = ['base', 'sudo', 'linux-firmware', 'mkinitcpio'] + [k.value for k
 # Additional packages that are installed if the user is running the Live ISO with accessibility tools enabled
 __accessibility_packages__ = ['brltty', 'espeakup', 'alsa-utils']
 
+# File systems on which fallocate reserves the blocks of a swap file without leaving holes
+_FALLOCATE_SWAP_FS = ('ext4', 'xfs')
+
+# GRUB modules reading the file systems a native grub.cfg can boot from
+_GRUB_FS_MODULES = {
+	FilesystemType.EXT2: 'ext2',
+	FilesystemType.EXT3: 'ext2',
+	FilesystemType.EXT4: 'ext2',
+	FilesystemType.FAT12: 'fat',
+	FilesystemType.FAT16: 'fat',
+	FilesystemType.FAT32: 'fat',
+	FilesystemType.XFS: 'xfs',
+	FilesystemType.F2FS: 'f2fs',
+}
+
 
 class Installer:
 	def __init__(
@@ -131,14 +152,19 @@ class Installer:
 
 		self._zram_enabled = False
 		self._disable_fstrim = False
+		self._fast_boot = False
 
 		self.pacman = Pacman(self.target, silent)
+		self._initramfs = InitramfsBuilder(self.target, self.run_command)
+		self._initramfs_compression: InitramfsCompression | None = None
 
 	def __enter__(self) -> Self:
 		return self
 
 	def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> bool | None:
 		if exc_type is not None:
+			# the installed system must rebuild its initramfs on kernel updates
+			self._initramfs.unmask_pacman_hook()
 			error(str(exc_value))
 
 			self.sync_log_to_install_medium()
@@ -151,6 +177,9 @@ class Installer:
 			# Return None to propagate the exception
 			return None
 
+		if not self.build_initramfs():
+			error('Error generating initramfs (continuing anyway)')
+
 		info(tr('Syncing the system...'))
 		os.sync()
 
@@ -378,12 +407,7 @@ class Installer:
 		# it would be none if it's btrfs as the subvolumes will have the mountpoints defined
 		if part_mod.mountpoint:
 			target = self.target / part_mod.relative_mountpoint
-			options = part_mod.mount_options
-
-			if part_mod.is_efi():
-				options = list(dict.fromkeys(options + ['fmask=0077', 'dmask=0077']))
-
-			mount(part_mod.dev_path, target, options=options)
+			mount(part_mod.dev_path, target, options=partition_mount_options(part_mod))
 		elif part_mod.fs_type == FilesystemType.BTRFS:
 			# Only mount BTRFS subvolumes that have mountpoints specified
 			subvols_with_mountpoints = [sv for sv in part_mod.btrfs_subvols if sv.mountpoint is not None]
@@ -458,8 +482,33 @@ class Installer:
 				# so we won't need any keyfile generation atm
 				pass
 
+	def _add_crypttab_entries(self, entries: list[tuple[Luks2, bool]]) -> None:
+		"""
+		Adds the crypttab entries of the volumes in the given order, the
+		volumes unlocked by a key file get theirs enrolled first.
+		"""
+		key_file_handlers = [luks_handler for luks_handler, key_file in entries if key_file]
+		key_files: list[Path | None] = []
+
+		if key_file_handlers:
+			# adding a key slot runs one argon2id derivation after another, the
+			# volumes are enrolled concurrently as far as the memory allows
+			workers = min(kdf_budget.slots(self._disk_encryption.pbkdf), len(key_file_handlers))
+
+			with ThreadPoolExecutor(max_workers=workers) as executor:
+				key_files = list(executor.map(lambda luks: luks.enroll_keyfile(self.target), key_file_handlers))
+
+		enrolled = iter(key_files)
+
+		for luks_handler, key_file in entries:
+			if not key_file:
+				luks_handler.create_crypttab_entry(self.target)
+			elif (path := next(enrolled)) is not None:
+				luks_handler.create_crypttab_entry(self.target, path)
+
 	def _generate_key_files_partitions(self) -> None:
 		root_is_encrypted = any(p.is_root() for p in self._disk_encryption.partitions)
+		crypttab_entries: list[tuple[Luks2, bool]] = []
 
 		for part_mod in self._disk_encryption.partitions:
 			gen_enc_file = self._disk_encryption.should_generate_encryption_file(part_mod)
@@ -468,15 +517,16 @@ class Installer:
 				part_mod.safe_dev_path,
 				mapper_name=part_mod.mapper_name,
 				password=self._disk_encryption.encryption_password,
+				pbkdf=self._disk_encryption.pbkdf,
 			)
 
 			if gen_enc_file and not part_mod.is_root():
 				if root_is_encrypted:
 					debug(f'Creating key-file: {part_mod.dev_path}')
-					luks_handler.create_keyfile(self.target)
+					crypttab_entries.append((luks_handler, True))
 				else:
 					debug(f'Adding passphrase-based crypttab entry for {part_mod.dev_path}')
-					luks_handler.create_crypttab_entry(self.target)
+					crypttab_entries.append((luks_handler, False))
 
 			if part_mod.is_root() and not gen_enc_file:
 				if self._disk_encryption.hsm_device:
@@ -487,8 +537,11 @@ class Installer:
 							self._disk_encryption.encryption_password,
 						)
 
+		self._add_crypttab_entries(crypttab_entries)
+
 	def _generate_key_file_lvm_volumes(self) -> None:
 		root_is_encrypted = any(v.is_root() for v in self._disk_encryption.lvm_volumes)
+		crypttab_entries: list[tuple[Luks2, bool]] = []
 
 		for vol in self._disk_encryption.lvm_volumes:
 			gen_enc_file = self._disk_encryption.should_generate_encryption_file(vol)
@@ -497,15 +550,16 @@ class Installer:
 				vol.safe_dev_path,
 				mapper_name=vol.mapper_name,
 				password=self._disk_encryption.encryption_password,
+				pbkdf=self._disk_encryption.pbkdf,
 			)
 
 			if gen_enc_file and not vol.is_root():
 				if root_is_encrypted:
 					info(f'Creating key-file: {vol.dev_path}')
-					luks_handler.create_keyfile(self.target)
+					crypttab_entries.append((luks_handler, True))
 				else:
 					info(f'Adding passphrase-based crypttab entry for {vol.dev_path}')
-					luks_handler.create_crypttab_entry(self.target)
+					crypttab_entries.append((luks_handler, False))
 
 			if vol.is_root() and not gen_enc_file:
 				if self._disk_encryption.hsm_device:
@@ -516,6 +570,8 @@ class Installer:
 							self._disk_encryption.encryption_password,
 						)
 
+		self._add_crypttab_entries(crypttab_entries)
+
 	def sync_log_to_install_medium(self) -> bool:
 		# Copy over the install log (if there is one) to the install medium if
 		# at least the base has been strapped in, otherwise we won't have a filesystem/structure to copy to.
@@ -526,30 +582,56 @@ class Installer:
 
 		return True
 
-	def add_swapfile(self, size: str = '4G', enable_resume: bool = True, file: str = '/swapfile') -> None:
+	def add_swapfile(self, size: str | None = None, enable_resume: bool = True, file: str = '/swapfile') -> None:
+		"""
+		Creates a swap file in the target, by default as large as the RAM so that the system can hibernate.
+		The blocks are allocated without writing them out, btrfs swap files are created NOCOW.
+		"""
 		if file[:1] != '/':
 			file = f'/{file}'
 		if len(file.strip()) <= 0 or file == '/':
 			raise ValueError(f'The filename for the swap file has to be a valid path, not: {self.target}{file}')
 
-		SysCommand(f'dd if=/dev/zero of={self.target}{file} bs={size} count=1')
-		SysCommand(f'chmod 0600 {self.target}{file}')
-		SysCommand(f'mkswap {self.target}{file}')
+		if size is None:
+			# The hibernation image has to fit, rounded up to full MiB
+			size = f'{-(-read_meminfo().mem_total // 1024)}M'
+
+		swap_file = f'{self.target}{file}'
+		fs_type = SysCommand(f'findmnt -no FSTYPE -T {Path(swap_file).parent}').decode()
+
+		info(f'Creating {size} swap file {file} on {fs_type}')
+
+		if fs_type == 'btrfs':
+			# Creates the file NOCOW and preallocated, and runs mkswap on it
+			SysCommand(f'btrfs filesystem mkswapfile --size {size} {swap_file}')
+		else:
+			if fs_type in _FALLOCATE_SWAP_FS:
+				SysCommand(f'fallocate -l {size} {swap_file}')
+			else:
+				SysCommand(f'dd if=/dev/zero of={swap_file} bs=1M count={size} iflag=count_bytes')
+
+			SysCommand(f'chmod 0600 {swap_file}')
+			SysCommand(f'mkswap {swap_file}')
 
 		self._fstab_entries.append(f'{file} none swap defaults 0 0')
 
 		if enable_resume:
-			resume_uuid = SysCommand(f'findmnt -no UUID -T {self.target}{file}').decode()
-			resume_offset = (
-				SysCommand(
-					f'filefrag -v {self.target}{file}',
+			resume_uuid = SysCommand(f'findmnt -no UUID -T {swap_file}').decode()
+
+			if fs_type == 'btrfs':
+				# filefrag reports logical btrfs addresses, not the physical offset
+				resume_offset = SysCommand(f'btrfs inspect-internal map-swapfile -r {swap_file}').decode()
+			else:
+				resume_offset = (
+					SysCommand(
+						f'filefrag -v {swap_file}',
+					)
+					.decode()
+					.split('0:', 1)[1]
+					.split(':', 1)[1]
+					.split('..', 1)[0]
+					.strip()
 				)
-				.decode()
-				.split('0:', 1)[1]
-				.split(':', 1)[1]
-				.split('..', 1)[0]
-				.strip()
-			)
 
 			self._hooks.append('resume')
 			self._kernel_params.append(f'resume=UUID={resume_uuid}')
@@ -606,14 +688,37 @@ class Installer:
 			content = mirrorlist_config.read_text()
 			mirrorlist_config.write_text(f'{custom_servers}\n\n{content}')
 
+	def _native_fstab(self) -> bytes | None:
+		"""
+		The fstab entries of the disk layout, None if they don't cover
+		everything that is mounted on the target.
+		"""
+		if (entries := fstab_entries(self._disk_config)) is None:
+			return None
+
+		expected = {entry.mountpoint for entry in entries if entry.mountpoint is not None}
+
+		if (mounted := target_mountpoints(self.target)) != expected:
+			warn(f'Mounts on the target differ from the disk layout (mounted {sorted(mounted)}, expected {sorted(expected)}), falling back to genfstab')
+			return None
+
+		return ''.join(f'{entry.line()}\n' for entry in entries).encode()
+
 	def genfstab(self, flags: str = '-pU') -> None:
+		"""
+		Writes the fstab entries of the disk layout, genfstab
+		is used if the layout doesn't describe all mounts.
+		The flags are only passed to genfstab, the entries of
+		the layout always identify file systems by UUID.
+		"""
 		fstab_path = self.target / 'etc' / 'fstab'
 		info(f'Updating {fstab_path}')
 
-		try:
-			gen_fstab = SysCommand(f'genfstab {flags} -f {self.target} {self.target}').output()
-		except SysCallError as err:
-			raise RequirementError(f'Could not generate fstab, strapping in packages most likely failed (disk out of space?)\n Error: {err}')
+		if (gen_fstab := self._native_fstab()) is None:
+			try:
+				gen_fstab = SysCommand(f'genfstab {flags} -f {self.target} {self.target}').output()
+			except SysCallError as err:
+				raise RequirementError(f'Could not generate fstab, strapping in packages most likely failed (disk out of space?)\n Error: {err}')
 
 		with open(fstab_path, 'ab') as fp:
 			fp.write(gen_fstab)
@@ -740,6 +845,48 @@ class Installer:
 			except SysCallError as err:
 				raise ServiceException(f'Unable to disable service {service}: {err}')
 
+	def mask_service(self, services: str | list[str]) -> None:
+		if isinstance(services, str):
+			services = [services]
+
+		for service in services:
+			info(f'Masking service {service}')
+
+			try:
+				SysCommand(f'systemctl --root={self.target} mask {service}')
+			except SysCallError as err:
+				raise ServiceException(f'Unable to mask service {service}: {err}')
+
+	def add_boot_report(self) -> None:
+		"""
+		Saves the systemd-analyze report of the first boot next to the installation log,
+		so that later changes to the boot can be compared against it.
+		"""
+		report = logger.directory / 'first-boot-analyze.txt'
+		(self.target / LPath(logger.directory).relative_to_root()).mkdir(parents=True, exist_ok=True)
+
+		# systemd-analyze only reports once the boot finished, which a oneshot service would delay
+		service = self.target / 'etc/systemd/system/archinstall-boot-report.service'
+		service.write_text(
+			textwrap.dedent(
+				f"""\
+				[Unit]
+				Description=Save the systemd-analyze report of the first boot
+				ConditionPathExists=!{report}
+
+				[Service]
+				Type=simple
+				ExecStart=/usr/bin/sh -c 'until systemd-analyze time > {report}.tmp 2>/dev/null; do sleep 1; done; \\
+					systemd-analyze critical-chain >> {report}.tmp; systemd-analyze blame >> {report}.tmp; mv {report}.tmp {report}'
+
+				[Install]
+				WantedBy=multi-user.target
+				"""
+			)
+		)
+
+		self.enable_service(service.name)
+
 	def run_command(self, cmd: str, peek_output: bool = False) -> SysCommand:
 		return SysCommand(f'arch-chroot -S {self.target} {cmd}', peek_output=peek_output)
 
@@ -837,6 +984,10 @@ class Installer:
 		return True
 
 	def mkinitcpio(self, flags: list[str]) -> bool:
+		"""
+		Writes the initramfs configuration, a full build (-P) is deferred
+		until the images are needed, see build_initramfs().
+		"""
 		for plugin in plugins.values():
 			if hasattr(plugin, 'on_mkinitcpio'):
 				# Allow plugins to override the usage of mkinitcpio altogether.
@@ -849,7 +1000,7 @@ class Installer:
 			content = re.sub('\nBINARIES=(.*)', f'\nBINARIES=({" ".join(self._binaries)})', content)
 			content = re.sub('\nFILES=(.*)', f'\nFILES=({" ".join(self._files)})', content)
 
-			if not self._disk_encryption.hsm_device:
+			if not self._disk_encryption.hsm_device and not (self._fast_boot and 'encrypt' not in self._hooks):
 				# For now, if we don't use HSM we revert to the old
 				# way of setting up encryption hooks for mkinitcpio.
 				# This is purely for stability reasons, we're going away from this.
@@ -857,18 +1008,67 @@ class Installer:
 				# * sd-vconsole -> keymap
 				self._hooks = [hook.replace('systemd', 'udev').replace('sd-vconsole', 'keymap consolefont') for hook in self._hooks]
 
-			content = re.sub('\nHOOKS=(.*)', f'\nHOOKS=({" ".join(self._hooks)})', content)
+			hooks = self._fast_boot_hooks() if self._fast_boot else self._hooks
+			content = re.sub('\nHOOKS=(.*)', f'\nHOOKS=({" ".join(hooks)})', content)
+
+			if compression := self._get_initramfs_compression():
+				algorithm, options = compression.mkinitcpio_options()
+				content = re.sub('\n#?COMPRESSION=(.*)', f'\nCOMPRESSION="{algorithm}"', content, count=1)
+				content = re.sub('\n#?COMPRESSION_OPTIONS=(.*)', f'\nCOMPRESSION_OPTIONS=({" ".join(options)})', content, count=1)
+
 			mkinit.seek(0)
 			mkinit.truncate()
 			mkinit.write(content)
 
-		try:
-			self.arch_chroot(f'mkinitcpio {" ".join(flags)}', peek_output=True)
+		if flags == ['-P']:
+			self._initramfs.request()
 			return True
-		except SysCallError as e:
-			if e.worker_log:
-				log(e.worker_log.decode())
-			return False
+
+		return self._initramfs.build(flags)
+
+	def _fast_boot_hooks(self) -> list[str]:
+		"""
+		The hooks without the ones that only matter before the root file system
+		is mounted if nothing has to be typed in, autodetect keeps the modules
+		of the image to the ones this machine needs.
+		"""
+		skipped = set()
+
+		if self._disk_encryption.encryption_type == EncryptionType.NO_ENCRYPTION:
+			skipped |= {'keyboard', 'sd-vconsole', 'keymap consolefont'}
+
+		# the GPU driver is loaded from the root file system unless plymouth needs it early
+		if 'plymouth' not in self._hooks:
+			skipped.add('kms')
+
+		return [hook for hook in self._hooks if hook not in skipped]
+
+	def _get_initramfs_compression(self) -> InitramfsCompression | None:
+		if self._initramfs_compression != InitramfsCompression.AUTO:
+			return self._initramfs_compression
+
+		# e.g. /dev/sda2[/@] for btrfs subvolumes
+		boot_device = SysCommand(f'findmnt -no SOURCE -T {self.target / "boot"}').decode().partition('[')[0]
+		read_rate = firmware_read_rate(Path(boot_device))
+
+		self._initramfs_compression = select_compression(compression_sample(self.target), read_rate)
+		info(f'Selected initramfs compression {self._initramfs_compression.value} for {boot_device}')
+
+		return self._initramfs_compression
+
+	def build_initramfs(self) -> bool:
+		"""
+		Builds the initramfs images for the last time in the installation and
+		restores the mkinitcpio pacman hook, which is masked while installing.
+		Nothing is built if no input changed since the images were last built.
+		"""
+		for plugin in plugins.values():
+			if hasattr(plugin, 'on_mkinitcpio'):
+				# Plugins that replace mkinitcpio build their images themselves
+				self._initramfs.unmask_pacman_hook()
+				return True
+
+		return self._initramfs.finalize()
 
 	def _get_microcode(self) -> Path | None:
 		if not SysInfo.is_vm():
@@ -902,7 +1102,16 @@ class Installer:
 		hostname: str | None = None,
 		locale_config: LocaleConfiguration | None = LocaleConfiguration.default(),
 		pacman_config: PacmanConfiguration | None = None,
+		initramfs_compression: InitramfsCompression | None = None,
+		fast_boot: bool = False,
 	) -> None:
+		self._initramfs_compression = initramfs_compression
+		# a systemd based initramfs with fewer hooks, see mkinitcpio()
+		self._fast_boot = fast_boot
+
+		if fast_boot and 'quiet' not in self._kernel_params:
+			self._kernel_params.append('quiet')
+
 		if self._disk_config.lvm_config:
 			lvm = 'lvm2'
 			self.add_additional_packages(lvm)
@@ -938,11 +1147,16 @@ class Installer:
 		# This action takes place on the host system as pacstrap copies over package repository lists.
 		pacman_conf = PacmanConfig(self.target)
 		pacman_conf.enable(optional_repositories)
+		if pacman_config and pacman_config.segmented_downloads:
+			pacman_conf.enable_segmented_downloads(self.target)
 		pacman_conf.apply()
 
 		if locale_config:
 			self.set_vconsole(locale_config)
 
+		# mkinitcpio builds the images once they are needed instead of after every pacstrap
+		self.pacman.hook_dir = self._initramfs.mask_pacman_hook()
+
 		self.pacman.strap(self._base_packages)
 		self._helper_flags['base-strapped'] = True
 
@@ -1025,19 +1239,44 @@ class Installer:
 			self._configure_grub_btrfsd(snapshot_type)
 			self.enable_service('grub-btrfsd.service')
 
-	def setup_swap(self, algo: ZramAlgorithm = ZramAlgorithm.ZSTD) -> None:
+	def setup_swap(
+		self,
+		algo: ZramAlgorithm = ZramAlgorithm.ZSTD,
+		size: str | None = None,
+		swappiness: int | None = None,
+	) -> ZramConfiguration:
+		"""
+		Sets up swap on zram and returns the effective configuration,
+		which holds the measured parameters if the algorithm is picked automatically.
+		"""
 		info('Setting up swap on zram')
 		self.pacman.strap('zram-generator')
 
-		info(f'Zram compression algorithm: {algo.value}')
+		config = ZramConfiguration(enabled=True, algorithm=algo, size=size, swappiness=swappiness)
+
+		if algo == ZramAlgorithm.AUTO:
+			# e.g. /dev/sda2[/@] for btrfs subvolumes
+			root_device = SysCommand(f'findmnt -no SOURCE -T {self.target}').decode().partition('[')[0]
+			config = tune_zram(self.target, DeviceTopology.from_device(Path(root_device)).write_rate)
+
+		info(f'Zram compression algorithm: {config.algorithm.value}')
 
 		with open(f'{self.target}/etc/systemd/zram-generator.conf', 'w') as zram_conf:
 			zram_conf.write('[zram0]\n')
-			zram_conf.write(f'compression-algorithm = {algo.value}\n')
+			zram_conf.write(f'compression-algorithm = {config.algorithm.value}\n')
+
+			if config.size is not None:
+				zram_conf.write(f'zram-size = {config.size}\n')
+
+		if config.swappiness is not None:
+			sysctl_conf = self.target / 'etc/sysctl.d/99-vm-zram-parameters.conf'
+			sysctl_conf.parent.mkdir(parents=True, exist_ok=True)
+			sysctl_conf.write_text(''.join(f'{key} = {value}\n' for key, value in zram_sysctls(config.swappiness).items()))
 
 		self.enable_service('systemd-zram-setup@zram0.service')
 
 		self._zram_enabled = True
+		return config
 
 	def _get_efi_partition(self) -> PartitionModification | None:
 		for layout in self._disk_config.device_modifications:
@@ -1320,6 +1559,10 @@ class Installer:
 					# We add in the default timeout to support dual-boot
 					loader_data[index] = line.removeprefix('#')
 
+		if self._fast_boot:
+			# the menu is still shown while a key is pressed
+			loader_data = [line for line in loader_data if not line.startswith('timeout')] + ['timeout 0']
+
 		loader_conf.write_text('\n'.join(loader_data) + '\n')
 
 		self._helper_flags['bootloader'] = 'systemd'
@@ -1331,6 +1574,7 @@ class Installer:
 		efi_partition: PartitionModification | None,
 		uki_enabled: bool = False,
 		bootloader_removable: bool = False,
+		mkconfig: bool = False,
 	) -> None:
 		debug('Installing grub bootloader')
 
@@ -1430,15 +1674,108 @@ class Installer:
 
 			grub_default.write_text(config)
 
-		try:
-			self.arch_chroot(
-				f'grub-mkconfig -o {boot_dir}/grub/grub.cfg',
-			)
-		except SysCallError as err:
-			raise DiskError(f'Could not configure GRUB: {err}')
+		if self._fast_boot:
+			# the menu is still shown while shift is held
+			grub_default = self.target / 'etc/default/grub'
+			grub_default.write_text(re.sub(r'^GRUB_TIMEOUT=.*$', 'GRUB_TIMEOUT=0', grub_default.read_text(), count=1, flags=re.MULTILINE))
+
+		if mkconfig or not self._write_grub_config(boot_partition, root, efi_partition, uki_enabled):
+			try:
+				self.arch_chroot(
+					f'grub-mkconfig -o {boot_dir}/grub/grub.cfg',
+				)
+			except SysCallError as err:
+				raise DiskError(f'Could not configure GRUB: {err}')
 
 		self._helper_flags['bootloader'] = 'grub'
 
+	def _grub_default(self, key: str, default: str) -> str:
+		grub_default = (self.target / 'etc/default/grub').read_text()
+
+		if match := re.search(rf'^{key}="?([^"\n]*)"?$', grub_default, flags=re.MULTILINE):
+			return match.group(1)
+		return default
+
+	def _write_grub_config(
+		self,
+		boot_partition: PartitionModification,
+		root: PartitionModification | LvmVolume,
+		efi_partition: PartitionModification | None,
+		uki_enabled: bool = False,
+	) -> bool:
+		"""
+		Writes grub.cfg with an entry per kernel, the same way the BLS entries are created,
+		instead of running every /etc/grub.d script and os-prober through grub-mkconfig.
+		Returns False if the boot partition isn't one GRUB can read without further setup.
+		"""
+		uki_enabled = uki_enabled and SysInfo.has_uefi()
+		search_partition = efi_partition if uki_enabled else boot_partition
+
+		if (
+			boot_partition.mountpoint != Path('/boot')
+			or boot_partition in self._disk_encryption.partitions
+			or search_partition is None
+			or search_partition.uuid is None
+			or search_partition.fs_type not in _GRUB_FS_MODULES
+		):
+			debug('Boot partition layout not supported by the native GRUB config, using grub-mkconfig')
+			return False
+
+		kernel_params = ' '.join(self._get_kernel_params(root) + self._grub_default('GRUB_CMDLINE_LINUX_DEFAULT', '').split())
+		boot = self.target / 'boot'
+
+		# the microcode hook embeds the microcode into the initramfs already
+		initrds = []
+		if 'microcode' not in self._hooks and (ucode := self._get_microcode()) and (boot / ucode).exists():
+			initrds.append(f'/{ucode}')
+
+		config = textwrap.dedent(
+			f"""\
+			# Created by: archinstall
+			# Created on: {self.init_time}
+			# Run grub-mkconfig -o /boot/grub/grub.cfg to generate it from /etc/grub.d instead
+
+			insmod part_gpt
+			insmod part_msdos
+			insmod {_GRUB_FS_MODULES[search_partition.fs_type]}
+
+			set default=0
+			set timeout={self._grub_default('GRUB_TIMEOUT', '5')}
+
+			search --no-floppy --fs-uuid --set=root {search_partition.uuid}
+			""",
+		)
+
+		entries: dict[str, list[str]] = {}
+
+		for kernel in self.kernels:
+			if uki_enabled:
+				entries[f'Arch Linux ({kernel})'] = [f'chainloader /EFI/Linux/arch-{kernel}.efi']
+				continue
+
+			for title, image in (
+				(f'Arch Linux ({kernel})', f'initramfs-{kernel}.img'),
+				(f'Arch Linux ({kernel}, fallback initramfs)', f'initramfs-{kernel}-fallback.img'),
+			):
+				if (boot / image).exists():
+					entries[title] = [f'linux /vmlinuz-{kernel} {kernel_params}', f'initrd {" ".join(initrds + [f"/{image}"])}']
+
+		if not entries:
+			debug('No initramfs images found for the native GRUB config, using grub-mkconfig')
+			return False
+
+		for title, commands in entries.items():
+			config += f"\nmenuentry '{title}' --class arch --class gnu-linux --class os {{\n"
+			config += ''.join(f'\t{command}\n' for command in commands)
+			config += '}\n'
+
+		grub_cfg = boot / 'grub/grub.cfg'
+		grub_cfg.parent.mkdir(parents=True, exist_ok=True)
+		grub_cfg.write_text(config)
+
+		info(f'Wrote {grub_cfg}')
+		return True
+
 	def _add_limine_bootloader(
 		self,
 		boot_partition: PartitionModification,
@@ -1576,7 +1913,7 @@ class Installer:
 		hook_path.write_text(hook_contents)
 
 		kernel_params = ' '.join(self._get_kernel_params(root))
-		config_contents = 'timeout: 5\n'
+		config_contents = f'timeout: {0 if self._fast_boot else 5}\n'
 
 		path_root = 'boot()'
 		if efi_partition and boot_partition != efi_partition:
@@ -1803,7 +2140,9 @@ class Installer:
 		image_re = re.compile('(.+_image="/([^"]+).+\n)')
 		uki_re = re.compile('#((.+_uki=")/[^/]+(.+\n))')
 
-		# Modify .preset files
+		# Modify .preset files, the masked pacman hook hasn't created them
+		self._initramfs.install_kernels()
+
 		for kernel in self.kernels:
 			preset = self.target / 'etc/mkinitcpio.d' / (kernel + '.preset')
 			config = preset.read_text().splitlines(True)
@@ -1833,7 +2172,12 @@ class Installer:
 			error('Error generating initramfs (continuing anyway)')
 
 	def add_bootloader(
-		self, bootloader: Bootloader, uki_enabled: bool = False, bootloader_removable: bool = False, plymouth: PlymouthTheme | None = None
+		self,
+		bootloader: Bootloader,
+		uki_enabled: bool = False,
+		bootloader_removable: bool = False,
+		plymouth: PlymouthTheme | None = None,
+		grub_mkconfig: bool = False,
 	) -> None:
 		"""
 		Adds a bootloader to the installation instance.
@@ -1848,6 +2192,7 @@ class Installer:
 		:param uki_enabled: Whether to use unified kernel images
 		:param bootloader_removable: Whether to install to removable media location (UEFI only, for GRUB and Limine)
 		:param plymouth: Optional Plymouth theme to install and configure
+		:param grub_mkconfig: Generate grub.cfg with grub-mkconfig instead of writing it directly
 		"""
 
 		for plugin in plugins.values():
@@ -1895,11 +2240,15 @@ class Installer:
 			)
 			self._config_uki(root, efi_partition, keep_initramfs)
 
+		# the bootloader configuration refers to the built images
+		if not self._initramfs.flush():
+			error('Error generating initramfs (continuing anyway)')
+
 		match bootloader:
 			case Bootloader.Systemd:
 				self._add_systemd_bootloader(boot_partition, root, efi_partition, uki_enabled)
 			case Bootloader.Grub:
-				self._add_grub_bootloader(boot_partition, root, efi_partition, uki_enabled, bootloader_removable)
+				self._add_grub_bootloader(boot_partition, root, efi_partition, uki_enabled, bootloader_removable, grub_mkconfig)
 			case Bootloader.Efistub:
 				self._add_efistub_bootloader(boot_partition, root, uki_enabled)
 			case Bootloader.Limine:
@@ -1907,6 +2256,15 @@ class Installer:
 			case Bootloader.Refind:
 				self._add_refind_bootloader(boot_partition, efi_partition, root, uki_enabled)
 
+	def add_kernel_params(self, params: list[str]) -> None:
+		"""
+		Adds parameters to the kernel command line, which is written
+		when the bootloader is added.
+		"""
+		for param in params:
+			if param not in self._kernel_params:
+				self._kernel_params.append(param)
+
 	def add_additional_packages(self, packages: str | list[str]) -> None:
 		return self.pacman.strap(packages)
 
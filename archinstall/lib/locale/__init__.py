@@ -4,6 +4,7 @@ from archinstall.lib.locale.utils import (
 	list_timezones,
 	list_x11_keyboard_languages,
 	set_kb_layout,
+	timezone_country_codes,
 	verify_keyboard_layout,
 	verify_x11_keyboard_layout,
 )
@@ -14,6 +15,7 @@ __all__ = [
 	'list_timezones',
 	'list_x11_keyboard_languages',
 	'set_kb_layout',
+	'timezone_country_codes',
 	'verify_keyboard_layout',
 	'verify_x11_keyboard_layout',
 ]
@@ -119,3 +119,28 @@ def list_timezones() -> list[str]:
 		.decode()
 		.splitlines()
 	)
+
+
+def timezone_country_codes(timezone: str) -> list[str]:
+	"""
+	Returns the ISO 3166 country codes that are associated
+	with the given timezone according to the tz database.
+	"""
+	zoneinfo = Path('/usr/share/zoneinfo')
+	codes: list[str] = []
+
+	for table in ('zone.tab', 'zone1970.tab'):
+		try:
+			lines = (zoneinfo / table).read_text().splitlines()
+		except OSError:
+			continue
+
+		for line in lines:
+			if line.startswith('#'):
+				continue
+
+			fields = line.split('\t')
+			if len(fields) >= 3 and fields[2] == timezone:
+				codes += [code for code in fields[0].split(',') if code not in codes]
+
+	return codes
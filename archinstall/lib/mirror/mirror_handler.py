@@ -1,13 +1,42 @@
+import json
 import time
 import urllib.parse
 from pathlib import Path
+from typing import Any
 
+from archinstall.lib.locale.utils import timezone_country_codes
 from archinstall.lib.log import debug, info
+from archinstall.lib.mirror.mirror_ranking import benchmark_mirrors, latency_cluster, measure_latencies
 from archinstall.lib.models import MirrorRegion
-from archinstall.lib.models.mirrors import MirrorStatusEntryV3, MirrorStatusListV3
+from archinstall.lib.models.mirrors import MirrorStatusEntryV3
 from archinstall.lib.networking import fetch_data_from_url
 from archinstall.lib.pathnames import MIRRORLIST
 
+AUTO_MIRROR_LIMIT = 10
+
+
+def _is_usable_mirror(entry: Any) -> bool:
+	"""
+	Checks a raw mirror status entry against the criteria
+	for mirrors that are considered for the mirrorlist.
+	"""
+	if not isinstance(entry, dict):
+		return False
+
+	score = entry.get('score')
+	url = entry.get('url')
+
+	return not any(
+		[
+			entry.get('active') is not True,  # Disabled by mirror-list admins
+			entry.get('last_sync') is None,  # Has not synced recently
+			# mirror.score (error rate) over time reported from backend:
+			# https://github.com/archlinux/archweb/blob/31333d3516c91db9a2f2d12260bd61656c011fd1/mirrors/utils.py#L111C22-L111C66
+			(not isinstance(score, int | float) or score >= 100),
+			not isinstance(url, str) or not url.startswith('http'),
+		]
+	)
+
 
 class MirrorListHandler:
 	def __init__(
@@ -15,12 +44,15 @@ class MirrorListHandler:
 		local_mirrorlist: Path = MIRRORLIST,
 		offline: bool = False,
 		verbose: bool = False,
+		timezone: str | None = None,
 	) -> None:
 		self._local_mirrorlist = local_mirrorlist
 		self._status_mappings: dict[str, list[MirrorStatusEntryV3]] | None = None
 		self._fetched_remote: bool = False
 		self.offline = offline
 		self.verbose = verbose
+		self.timezone = timezone
+		self._auto_mirrors: list[MirrorStatusEntryV3] | None = None
 
 	def _mappings(self) -> dict[str, list[MirrorStatusEntryV3]]:
 		if self._status_mappings is None:
@@ -41,6 +73,8 @@ class MirrorListHandler:
 		return available_mirrors
 
 	def load_mirrors(self) -> None:
+		self._auto_mirrors = None
+
 		if self.offline:
 			self._fetched_remote = False
 			self.load_local_mirrors()
@@ -85,25 +119,83 @@ class MirrorListHandler:
 		# just return as-is without sorting?
 		return region_list
 
+	def get_auto_mirrors(self, limit: int = AUTO_MIRROR_LIMIT) -> list[MirrorStatusEntryV3]:
+		"""
+		Selects mirrors without a manual region choice.
+
+		The candidate set is built from the countries associated with the
+		selected timezone, matched against the country_code of the mirror status
+		entries, and the countries in the lowest measured latency cluster.
+		The candidates are then ranked by a concurrent benchmark.
+		"""
+		if self._auto_mirrors is not None:
+			return self._auto_mirrors[:limit]
+
+		mappings = self._mappings()
+
+		if not self._fetched_remote:
+			# Local mirrors carry no location data to select from,
+			# so they are used as-is in their original order
+			return [mirror for mirrors in mappings.values() for mirror in mirrors]
+
+		by_country_code: dict[str, list[MirrorStatusEntryV3]] = {}
+		for mirrors in mappings.values():
+			for mirror in mirrors:
+				by_country_code.setdefault(mirror.country_code, []).append(mirror)
+
+		hints: list[str] = []
+
+		if self.timezone and self.timezone != 'UTC':
+			hints += [code for code in timezone_country_codes(self.timezone) if code in by_country_code]
+			debug(f'Auto mirrors: timezone {self.timezone} hints at {hints}')
+
+		for code in self._latency_cluster(by_country_code):
+			if code not in hints:
+				hints.append(code)
+
+		candidates = [mirror for code in hints for mirror in by_country_code[code]]
+
+		if not candidates:
+			debug('Auto mirrors: no location hints found, using worldwide mirrors')
+			candidates = mappings.get('Worldwide', [])
+
+		info(f'Ranking {len(candidates)} mirrors from {", ".join(hints) or "Worldwide"} (this might take a while)')
+		self._auto_mirrors = [result.mirror for result in benchmark_mirrors(candidates) if result.reachable]
+
+		return self._auto_mirrors[:limit]
+
+	def _latency_cluster(self, by_country_code: dict[str, list[MirrorStatusEntryV3]]) -> list[str]:
+		# Probe the first two mirrors of every country with a known location
+		probes = [(code, mirror) for code, mirrors in by_country_code.items() if code for mirror in mirrors[:2]]
+		latencies = measure_latencies([mirror for _, mirror in probes])
+
+		best: dict[str, float] = {}
+		for (code, _), latency in zip(probes, latencies):
+			if latency is not None:
+				best[code] = min(latency, best.get(code, latency))
+
+		cluster = latency_cluster(best)
+		debug(f'Auto mirrors: lowest latency cluster {[(code, best[code]) for code in cluster]}')
+		return cluster
+
 	def _parse_remote_mirror_list(self, data: bytes) -> dict[str, list[MirrorStatusEntryV3]]:
-		context = {'verbose': self.verbose}
-		mirror_status = MirrorStatusListV3.model_validate_json(data, context=context)
+		document = json.loads(data)
 
+		if not isinstance(document, dict) or document.get('version') != 3:
+			raise ValueError('MirrorStatusListV3 only accepts version 3 data from https://archlinux.org/mirrors/status/json/')
+
+		context = {'verbose': self.verbose}
 		sorting_placeholder: dict[str, list[MirrorStatusEntryV3]] = {}
 
-		for mirror in mirror_status.urls:
-			# We filter out mirrors that have bad criteria values
-			if any(
-				[
-					mirror.active is False,  # Disabled by mirror-list admins
-					mirror.last_sync is None,  # Has not synced recently
-					# mirror.score (error rate) over time reported from backend:
-					# https://github.com/archlinux/archweb/blob/31333d3516c91db9a2f2d12260bd61656c011fd1/mirrors/utils.py#L111C22-L111C66
-					(mirror.score is None or mirror.score >= 100),
-				]
-			):
+		# The status document lists every known mirror, most of which are
+		# filtered out below. Only the mirrors that survive the filter are
+		# validated into models, as the validation dominates the parse time.
+		for entry in document.get('urls', []):
+			if not _is_usable_mirror(entry):
 				continue
 
+			mirror = MirrorStatusEntryV3.model_validate(entry, context=context)
+
 			if mirror.country == '':
 				# TODO: This should be removed once RFC!29 is merged and completed
 				# Until then, there are mirrors which lacks data in the backend
@@ -111,8 +203,7 @@ class MirrorListHandler:
 				# So we have to assume world-wide
 				mirror.country = 'Worldwide'
 
-			if mirror.url.startswith('http'):
-				sorting_placeholder.setdefault(mirror.country, []).append(mirror)
+			sorting_placeholder.setdefault(mirror.country, []).append(mirror)
 
 		sorted_by_regions: dict[str, list[MirrorStatusEntryV3]] = dict(
 			{region: unsorted_mirrors for region, unsorted_mirrors in sorted(sorting_placeholder.items(), key=lambda item: item[0])}
@@ -0,0 +1,157 @@
+import re
+import time
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.log import debug, info
+
+# Transfer rate below which the primary mirror is considered stalled
+STALL_RATE: Final = 100 * 1024
+# How long the transfer rate has to stay below STALL_RATE
+STALL_SECONDS: Final = 20.0
+# Marks the section of the mirrorlist holding the demoted mirrors
+DEMOTED_HEADER: Final = '## Demoted after failing during installation'
+
+_FAILED_RETRIEVING = re.compile(rb"failed retrieving file '[^']*' from (?P<host>\S+) : (?P<reason>.*)")
+_TOO_MANY_ERRORS = re.compile(rb'too many errors from (?P<host>\S+),')
+_TRANSFER_RATE = re.compile(rb'\s(?P<value>\d+(?:\.\d+)?) (?P<unit>B|KiB|MiB|GiB)/s\s')
+_RATE_UNITS: Final = {b'B': 1, b'KiB': 1024, b'MiB': 1024**2, b'GiB': 1024**3}
+
+
+def _server_host(line: str) -> str | None:
+	if not line.startswith('Server'):
+		return None
+
+	_, _, url = line.partition('=')
+	return urllib.parse.urlparse(url.strip()).hostname
+
+
+@dataclass
+class MirrorHealth:
+	host: str
+	failures: int = 0
+	stalls: int = 0
+	last_error: str | None = None
+
+	@property
+	def healthy(self) -> bool:
+		return self.failures == 0 and self.stalls == 0
+
+
+class MirrorHealthMonitor:
+	"""
+	Tracks the health of the mirrors in the live mirrorlist from the
+	output of pacman/pacstrap, and demotes mirrors that failed or stalled
+	to the end of the mirrorlist so that retries run against healthy mirrors.
+	"""
+
+	def __init__(self, mirrorlist: Path) -> None:
+		self._mirrorlist = mirrorlist
+		self._health: dict[str, MirrorHealth] = {}
+		self._buffer = b''
+		self._slow_since: float | None = None
+
+	def _get(self, host: str) -> MirrorHealth:
+		host = host.split(':', 1)[0]
+		return self._health.setdefault(host, MirrorHealth(host))
+
+	def _servers(self) -> list[str]:
+		try:
+			lines = self._mirrorlist.read_text().splitlines()
+		except OSError:
+			return []
+
+		return [host for line in lines if (host := _server_host(line.strip()))]
+
+	@property
+	def primary(self) -> str | None:
+		"""
+		The mirror pacman currently downloads from,
+		the first server in the mirrorlist that has not failed.
+		"""
+		for host in self._servers():
+			if self._get(host).failures == 0:
+				return host
+		return None
+
+	@property
+	def unhealthy(self) -> list[MirrorHealth]:
+		return [health for health in self._health.values() if not health.healthy]
+
+	def feed(self, output: bytes, now: float | None = None) -> None:
+		"""
+		Parses a chunk of pacman output, progress bars are
+		redrawn with carriage returns so both line endings are handled.
+		"""
+		now = time.monotonic() if now is None else now
+		lines = (self._buffer + output).replace(b'\r', b'\n').split(b'\n')
+		self._buffer = lines.pop()
+
+		for line in lines:
+			self._parse_line(line, now)
+
+	def _parse_line(self, line: bytes, now: float) -> None:
+		if match := _FAILED_RETRIEVING.search(line):
+			health = self._get(match.group('host').decode(errors='replace'))
+			health.failures += 1
+			health.last_error = match.group('reason').decode(errors='replace').strip()
+			debug(f'Mirror {health.host} failed: {health.last_error}')
+		elif match := _TOO_MANY_ERRORS.search(line):
+			health = self._get(match.group('host').decode(errors='replace'))
+			health.failures += 1
+			health.last_error = 'too many errors'
+			debug(f'Mirror {health.host} was skipped by pacman after too many errors')
+		elif match := _TRANSFER_RATE.search(line + b' '):
+			rate = float(match.group('value')) * _RATE_UNITS[match.group('unit')]
+			self._track_rate(rate, now)
+
+	def _track_rate(self, rate: float, now: float) -> None:
+		if rate >= STALL_RATE:
+			self._slow_since = None
+			return
+
+		if self._slow_since is None:
+			self._slow_since = now
+		elif now - self._slow_since >= STALL_SECONDS:
+			if primary := self.primary:
+				health = self._get(primary)
+				health.stalls += 1
+				debug(f'Mirror {primary} stalled below {STALL_RATE // 1024}KiB/s for {STALL_SECONDS}s')
+
+			self._slow_since = None
+
+	def demote_unhealthy(self) -> bool:
+		"""
+		Moves the servers of all unhealthy mirrors to the end of the mirrorlist.
+		Returns True if the mirrorlist was changed.
+		"""
+		unhealthy = {health.host for health in self.unhealthy}
+		if not unhealthy:
+			return False
+
+		try:
+			lines = self._mirrorlist.read_text().splitlines()
+		except OSError as err:
+			debug(f'Unable to read mirrorlist for demotion: {err}')
+			return False
+
+		kept = [line for line in lines if _server_host(line.strip()) not in unhealthy and line != DEMOTED_HEADER]
+		demoted = [line for line in lines if _server_host(line.strip()) in unhealthy]
+
+		if not demoted or not any(_server_host(line.strip()) for line in kept):
+			# Never demote every mirror, there would be nothing left to retry against
+			return False
+
+		info(f'Demoting unhealthy mirrors: {", ".join(sorted(unhealthy))}')
+
+		content = '\n'.join(kept).rstrip() + f'\n\n{DEMOTED_HEADER}\n' + '\n'.join(demoted) + '\n'
+		self._mirrorlist.write_text(content)
+
+		# The demoted mirrors get a clean slate, they are
+		# only used again once every healthy mirror failed
+		for host in unhealthy:
+			del self._health[host]
+
+		return True
@@ -9,6 +9,7 @@ from archinstall.lib.models.mirrors import (
 	CustomServer,
 	MirrorConfiguration,
 	MirrorRegion,
+	MirrorSelectionMode,
 	SignCheck,
 	SignOption,
 )
@@ -225,6 +226,13 @@ class MirrorMenu(AbstractSubMenu[MirrorConfiguration]):
 
 	def _define_menu_options(self) -> list[MenuItem]:
 		return [
+			MenuItem(
+				text=tr('Selection mode'),
+				action=select_mirror_selection_mode,
+				value=self._mirror_config.selection_mode,
+				preview_action=self._prev_selection_mode,
+				key='selection_mode',
+			),
 			MenuItem(
 				text=tr('Select regions'),
 				action=lambda x: select_mirror_regions(self._mirror_list_handler, x),
@@ -255,6 +263,14 @@ class MirrorMenu(AbstractSubMenu[MirrorConfiguration]):
 			),
 		]
 
+	def _prev_selection_mode(self, item: MenuItem) -> str | None:
+		mode: MirrorSelectionMode = item.get_value()
+
+		if mode == MirrorSelectionMode.Auto:
+			return tr('Mirrors are chosen from the timezone and the measured latency, then ranked by speed')
+
+		return tr('Mirrors are taken from the selected regions')
+
 	def _prev_regions(self, item: MenuItem) -> str:
 		regions = item.get_value()
 
@@ -337,6 +353,26 @@ async def select_mirror_regions(
 			return selected_mirrors
 
 
+async def select_mirror_selection_mode(preset: MirrorSelectionMode) -> MirrorSelectionMode:
+	items = [MenuItem(mode.display_msg(), value=mode) for mode in MirrorSelectionMode]
+	group = MenuItemGroup(items, sort_items=False)
+	group.set_selected_by_value(preset)
+
+	result = await Selection[MirrorSelectionMode](
+		group,
+		header=tr('Select how mirrors should be chosen'),
+		allow_skip=True,
+	).show()
+
+	match result.type_:
+		case ResultType.Skip:
+			return preset
+		case ResultType.Selection:
+			return result.get_value()
+		case _:
+			raise ValueError('Unhandled return type')
+
+
 async def add_custom_mirror_servers(preset: list[CustomServer] = []) -> list[CustomServer]:
 	custom_mirrors = await CustomMirrorServersList(preset).show()
 
@@ -0,0 +1,195 @@
+import datetime as dt
+import socket
+import ssl
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Final, TypedDict
+
+from archinstall.lib.log import debug
+from archinstall.lib.models.mirrors import MirrorStatusEntryV3
+
+BENCHMARK_FILE: Final = 'core/os/x86_64/core.db'
+BENCHMARK_WORKERS: Final = 8
+BENCHMARK_TIMEOUT: Final = 5
+_READ_CHUNK: Final = 64 * 1024
+
+
+class MirrorBenchmarkSerialization(TypedDict):
+	url: str
+	country: str
+	country_code: str
+	latency_ms: float | None
+	ttfb_ms: float | None
+	throughput: float
+	sync_age: float | None
+	score: float | None
+	error: str | None
+
+
+@dataclass
+class MirrorBenchmark:
+	mirror: MirrorStatusEntryV3
+	latency: float | None = None
+	ttfb: float | None = None
+	throughput: float = 0.0
+	error: str | None = None
+
+	@property
+	def reachable(self) -> bool:
+		return self.error is None and self.throughput > 0
+
+	@property
+	def sync_age(self) -> float | None:
+		"""
+		Seconds since the mirror last synced, as reported by the mirror status.
+		"""
+		if self.mirror.last_sync is None:
+			return None
+
+		return (dt.datetime.now(dt.UTC) - self.mirror.last_sync).total_seconds()
+
+	def json(self) -> MirrorBenchmarkSerialization:
+		return {
+			'url': self.mirror.url,
+			'country': self.mirror.country,
+			'country_code': self.mirror.country_code,
+			'latency_ms': self.latency,
+			'ttfb_ms': round(self.ttfb * 1000, 1) if self.ttfb is not None else None,
+			'throughput': round(self.throughput),
+			'sync_age': round(self.sync_age) if self.sync_age is not None else None,
+			'score': self.mirror.score,
+			'error': self.error,
+		}
+
+
+def measure_latency(mirror: MirrorStatusEntryV3, timeout: float = 2) -> float | None:
+	"""
+	Measures the TCP handshake time to the mirror in milliseconds.
+
+	Unlike ping() this does not require a raw socket and is not
+	affected by hosts that drop ICMP, so it can be run from worker threads.
+	"""
+	hostname = mirror._hostname
+	if not hostname:
+		return None
+
+	port = mirror._port or (443 if mirror.url.startswith('https') else 80)
+	started = time.monotonic()
+
+	try:
+		with socket.create_connection((hostname, port), timeout=timeout):
+			return round((time.monotonic() - started) * 1000, 1)
+	except OSError as err:
+		debug(f'	latency: <undetermined> for {hostname} ({err})')
+		return None
+
+
+def benchmark_mirror(mirror: MirrorStatusEntryV3, timeout: float = BENCHMARK_TIMEOUT) -> MirrorBenchmark:
+	"""
+	Measures latency, time to first byte and throughput of a single mirror.
+
+	The download is bounded by a monotonic deadline rather than the SIGALRM
+	based DownloadTimer, as signals can only be handled in the main thread.
+	"""
+	result = MirrorBenchmark(mirror=mirror)
+	result.latency = measure_latency(mirror)
+
+	ssl_context = ssl.create_default_context()
+	req = urllib.request.Request(url=f'{mirror.url}{BENCHMARK_FILE}')
+	started = time.monotonic()
+	deadline = started + timeout
+	size = 0
+
+	try:
+		with urllib.request.urlopen(req, timeout=timeout, context=ssl_context) as handle:
+			chunk = handle.read(1)
+			result.ttfb = time.monotonic() - started
+			first_byte = time.monotonic()
+
+			while chunk:
+				size += len(chunk)
+
+				if time.monotonic() > deadline:
+					break
+
+				chunk = handle.read(_READ_CHUNK)
+
+		elapsed = time.monotonic() - first_byte
+		result.throughput = size / elapsed if elapsed > 0 else 0.0
+	except (urllib.error.URLError, OSError, ValueError) as err:
+		result.error = str(err)
+
+	debug(f'Benchmarked {mirror.url}: latency={result.latency}ms ttfb={result.ttfb} throughput={int(result.throughput / 1024)}KiB/s error={result.error}')
+	return result
+
+
+def benchmark_mirrors(
+	mirrors: list[MirrorStatusEntryV3],
+	workers: int = BENCHMARK_WORKERS,
+	timeout: float = BENCHMARK_TIMEOUT,
+) -> list[MirrorBenchmark]:
+	"""
+	Benchmarks all given mirrors concurrently and returns the results
+	ordered from the fastest to the slowest mirror, unreachable mirrors last.
+	"""
+	if not mirrors:
+		return []
+
+	with ThreadPoolExecutor(max_workers=min(workers, len(mirrors))) as executor:
+		results = list(executor.map(lambda m: benchmark_mirror(m, timeout), mirrors))
+
+	return sorted(results, key=lambda r: (not r.reachable, -r.throughput))
+
+
+def format_mirrorlist(results: list[MirrorBenchmark]) -> str:
+	"""
+	Formats the reachable mirrors of a ranking as a pacman mirrorlist.
+	"""
+	now = dt.datetime.now(dt.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')
+	config = f'# Arch Linux mirrorlist ranked by archinstall\n# When: {now}\n'
+
+	for result in results:
+		if result.reachable:
+			config += f'\n## {result.mirror.country}, {int(result.throughput / 1024)}KiB/s\n'
+			config += f'Server = {result.mirror.server_url}\n'
+
+	return config
+
+
+def measure_latencies(
+	mirrors: list[MirrorStatusEntryV3],
+	workers: int = BENCHMARK_WORKERS,
+) -> list[float | None]:
+	if not mirrors:
+		return []
+
+	with ThreadPoolExecutor(max_workers=min(workers, len(mirrors))) as executor:
+		return list(executor.map(measure_latency, mirrors))
+
+
+def latency_cluster(latencies: dict[str, float], max_size: int = 5) -> list[str]:
+	"""
+	Returns the keys of the lowest latency cluster.
+
+	Latencies are sorted ascending and the cluster is cut at the first gap
+	that is larger than half of the previous latency (with a 10ms floor),
+	which separates e.g. same-continent mirrors from intercontinental ones.
+	"""
+	ordered = sorted(latencies.items(), key=lambda item: item[1])
+	cluster: list[str] = []
+	previous: float | None = None
+
+	for key, latency in ordered:
+		if previous is not None and latency - previous > max(10.0, previous * 0.5):
+			break
+
+		cluster.append(key)
+		previous = latency
+
+		if len(cluster) >= max_size:
+			break
+
+	return cluster
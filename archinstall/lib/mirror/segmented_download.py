@@ -0,0 +1,326 @@
+"""
+Download helper that pacman runs through its XferCommand option.
+
+Large packages are fetched in parallel byte ranges from the top mirrors
+of the mirrorlist and verified against the checksum in the sync database,
+everything else is downloaded from the requested url as pacman would.
+
+pacman shows no progress bars for an XferCommand, so the helper prints
+progress and failures in pacman's format for the mirror health monitor.
+
+	XferCommand = python -m archinstall.lib.mirror.segmented_download --target /mnt %o %u
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.log import debug
+from archinstall.lib.mirror.mirror_health import DEMOTED_HEADER
+from archinstall.lib.pathnames import MIRRORLIST
+
+MODULE: Final = 'archinstall.lib.mirror.segmented_download'
+# Files below this size are not worth splitting up
+SEGMENT_THRESHOLD: Final = 32 * 1024 * 1024
+MAX_MIRRORS: Final = 4
+TIMEOUT: Final = 30
+_READ_CHUNK: Final = 1024 * 1024
+_PACKAGE_SUFFIXES: Final = ('.pkg.tar.zst', '.pkg.tar.xz', '.pkg.tar.gz')
+# Seconds between progress lines
+_PROGRESS_INTERVAL: Final = 1.0
+
+
+def xfer_command(target: Path) -> str:
+	"""
+	The XferCommand line for pacman.conf that downloads packages for the given target.
+	"""
+	package_root = Path(__file__).parents[3]
+	return f'/usr/bin/env PYTHONPATH={package_root} {sys.executable} -m {MODULE} --target {target} %o %u'
+
+
+def _format_size(size: float) -> str:
+	for unit in ('B', 'KiB', 'MiB'):
+		if size < 1024:
+			return f'{size:.1f} {unit}'
+		size /= 1024
+
+	return f'{size:.1f} GiB'
+
+
+def progress_line(filename: str, done: int, rate: float) -> str:
+	return f' {filename}  {_format_size(done)}  {_format_size(rate)}/s '
+
+
+def failure_line(url: str, reason: object) -> str:
+	filename = url.rsplit('/', 1)[-1]
+	return f"error: failed retrieving file '{filename}' from {urllib.parse.urlparse(url).netloc} : {reason}"
+
+
+class _Progress:
+	"""
+	Prints the transfer rate since the last progress line, segments
+	are downloaded concurrently and share the progress of the file.
+	"""
+
+	def __init__(self, filename: str) -> None:
+		self._filename = filename
+		self._lock = threading.Lock()
+		self._done = 0
+		self._reported = 0
+		self._reported_at = time.monotonic()
+
+	def add(self, size: int) -> None:
+		with self._lock:
+			self._done += size
+			now = time.monotonic()
+
+			if (elapsed := now - self._reported_at) < _PROGRESS_INTERVAL:
+				return
+
+			rate = (self._done - self._reported) / elapsed
+			self._reported, self._reported_at = self._done, now
+			print(progress_line(self._filename, self._done, rate), end='\r', flush=True)
+
+
+def _server_templates(mirrorlist: Path) -> list[str]:
+	templates = []
+
+	for line in mirrorlist.read_text().splitlines():
+		line = line.strip()
+
+		if line == DEMOTED_HEADER:
+			# Mirrors that failed during the installation are not used for segments
+			break
+
+		if line.startswith('Server'):
+			_, _, url = line.partition('=')
+			templates.append(url.strip().rstrip('/'))
+
+	return templates
+
+
+def mirror_urls(url: str, templates: list[str]) -> list[str]:
+	"""
+	Resolves the same file on all mirrors of the mirrorlist,
+	starting with the url that pacman requested.
+	"""
+	for template in templates:
+		pattern = re.escape(template).replace(re.escape('$repo'), '(?P<repo>[^/]+)').replace(re.escape('$arch'), '(?P<arch>[^/]+)')
+
+		if match := re.fullmatch(f'{pattern}/(?P<file>[^/]+)', url):
+			repo = match.groupdict().get('repo', '')
+			arch = match.groupdict().get('arch', '')
+			urls = [t.replace('$repo', repo).replace('$arch', arch) + '/' + match.group('file') for t in templates]
+			return [url] + [u for u in urls if u != url]
+
+	return [url]
+
+
+def split_ranges(size: int, segments: int) -> list[tuple[int, int]]:
+	"""
+	Splits a file of the given size in inclusive byte ranges.
+	"""
+	segment_size = -(-size // segments)
+	return [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+
+
+def _content_length(url: str) -> int | None:
+	req = urllib.request.Request(url, method='HEAD')
+
+	try:
+		with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
+			if response.headers.get('Accept-Ranges') != 'bytes':
+				return None
+
+			length = response.headers.get('Content-Length')
+			return int(length) if length else None
+	except (urllib.error.URLError, OSError, ValueError) as err:
+		debug(f'Unable to determine size of {url}: {err}')
+		return None
+
+
+def _download(url: str, output: Path, progress: _Progress) -> None:
+	with urllib.request.urlopen(url, timeout=TIMEOUT) as response, output.open('wb') as fp:
+		while chunk := response.read1(_READ_CHUNK):
+			fp.write(chunk)
+			progress.add(len(chunk))
+
+
+def _fetch_range(url: str, fd: int, start: int, end: int, progress: _Progress) -> None:
+	req = urllib.request.Request(url, headers={'Range': f'bytes={start}-{end}'})
+	position = start
+
+	with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
+		if response.status != 206:
+			raise ValueError(f'{url} does not support range requests')
+
+		while chunk := response.read1(_READ_CHUNK):
+			os.pwrite(fd, chunk, position)
+			position += len(chunk)
+			progress.add(len(chunk))
+
+	if position != end + 1:
+		raise ValueError(f'Incomplete segment {start}-{end} from {url}')
+
+
+def _fetch_segment(urls: list[str], fd: int, index: int, start: int, end: int, progress: _Progress) -> None:
+	# Every segment starts on its own mirror and moves on to the next on failure
+	for attempt in range(len(urls)):
+		url = urls[(index + attempt) % len(urls)]
+
+		try:
+			_fetch_range(url, fd, start, end, progress)
+			return
+		except (urllib.error.URLError, OSError, ValueError) as err:
+			debug(f'Segment {start}-{end} failed on {url}: {err}')
+			print(failure_line(url, err), file=sys.stderr, flush=True)
+
+	raise ValueError(f'Segment {start}-{end} failed on all mirrors')
+
+
+def download_segmented(urls: list[str], size: int, output: Path, progress: _Progress) -> None:
+	ranges = split_ranges(size, len(urls))
+	fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+	try:
+		os.ftruncate(fd, size)
+
+		with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+			futures = [executor.submit(_fetch_segment, urls, fd, index, start, end, progress) for index, (start, end) in enumerate(ranges)]
+
+			for future in futures:
+				future.result()
+	finally:
+		os.close(fd)
+
+
+def _read_sync_db(db: Path) -> dict[str, str]:
+	checksums = {}
+
+	with tarfile.open(db, 'r:*') as archive:
+		for member in archive:
+			if not member.name.endswith('/desc'):
+				continue
+
+			desc_file = archive.extractfile(member)
+			if desc_file is None:
+				continue
+
+			desc = desc_file.read().decode(errors='replace').split('\n\n')
+			fields = {entry.split('\n', 1)[0]: entry.split('\n', 1)[-1].strip() for entry in desc if entry.startswith('%')}
+
+			if (name := fields.get('%FILENAME%')) and (checksum := fields.get('%SHA256SUM%')):
+				checksums[name] = checksum
+
+	return checksums
+
+
+def sync_db_index(db: Path) -> dict[str, str]:
+	"""
+	The SHA256 checksums of the package files in a sync database. pacman runs
+	the helper once per file, so the index is kept in the temporary directory
+	until the database is refreshed.
+	"""
+	stat = db.stat()
+	key = hashlib.sha256(f'{db.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+	index = Path(tempfile.gettempdir()) / f'archinstall-{db.stem}-{key}.json'
+
+	try:
+		return json.loads(index.read_text())
+	except OSError, ValueError:
+		pass
+
+	checksums = _read_sync_db(db)
+
+	try:
+		partial = index.with_suffix(f'.{os.getpid()}')
+		partial.write_text(json.dumps(checksums))
+		partial.replace(index)
+	except OSError as err:
+		debug(f'Unable to store the index of {db}: {err}')
+
+	return checksums
+
+
+def sync_db_checksum(filename: str, repo: str, db_paths: list[Path]) -> str | None:
+	"""
+	Looks up the SHA256 checksum of a package file in the repository sync database.
+	"""
+	for db_path in db_paths:
+		db = db_path / 'sync' / f'{repo}.db'
+
+		if db.is_file() and (checksum := sync_db_index(db).get(filename)):
+			return checksum
+
+	return None
+
+
+def _sha256(path: Path) -> str:
+	digest = hashlib.sha256()
+
+	with path.open('rb') as fp:
+		while chunk := fp.read(_READ_CHUNK):
+			digest.update(chunk)
+
+	return digest.hexdigest()
+
+
+def fetch(url: str, output: Path, target: Path | None, mirrorlist: Path = MIRRORLIST) -> None:
+	filename = url.rsplit('/', 1)[-1]
+	templates = _server_templates(mirrorlist) if mirrorlist.is_file() else []
+	urls = mirror_urls(url, templates)[:MAX_MIRRORS]
+
+	size = _content_length(url) if filename.endswith(_PACKAGE_SUFFIXES) and len(urls) > 1 else None
+	progress = _Progress(filename)
+
+	if size is None or size < SEGMENT_THRESHOLD:
+		_download(url, output, progress)
+		return
+
+	debug(f'Downloading {filename} ({size} bytes) in {len(urls)} segments')
+	download_segmented(urls, size, output, progress)
+
+	db_paths = [target / 'var/lib/pacman'] if target else []
+	db_paths.append(Path('/var/lib/pacman'))
+
+	# The repository is the path component that the mirror template replaced with $repo
+	repo = next((part for part in url.split('/') if any(db_path.joinpath('sync', f'{part}.db').is_file() for db_path in db_paths)), None)
+	checksum = sync_db_checksum(filename, repo, db_paths) if repo else None
+
+	if checksum is None or _sha256(output) != checksum:
+		debug(f'Checksum of segmented {filename} could not be verified, downloading it from {url}')
+		_download(url, output, _Progress(filename))
+
+
+def main(argv: list[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(description='Segmented multi-mirror downloads for pacman XferCommand')
+	parser.add_argument('--target', type=Path, default=None)
+	parser.add_argument('output', type=Path)
+	parser.add_argument('url')
+	args = parser.parse_args(argv)
+
+	try:
+		fetch(args.url, args.output, args.target)
+	except Exception as err:
+		debug(f'XferCommand download of {args.url} failed: {err}')
+		print(failure_line(args.url, err), file=sys.stderr)
+		return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
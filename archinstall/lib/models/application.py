@@ -67,12 +67,51 @@ class FontsConfigSerialization(TypedDict):
 	fonts: list[str]
 
 
+class PerformanceTuning(StrEnum):
+	IO_SCHEDULER = 'io_scheduler'
+	DIRTY_WRITEBACK = 'dirty_writeback'
+	TRANSPARENT_HUGEPAGES = 'transparent_hugepages'
+	CPU_GOVERNOR = 'cpu_governor'
+
+	def description(self) -> str:
+		match self:
+			case PerformanceTuning.IO_SCHEDULER:
+				return tr('I/O scheduler per device class')
+			case PerformanceTuning.DIRTY_WRITEBACK:
+				return tr('writeback limits from memory and disk speed')
+			case PerformanceTuning.TRANSPARENT_HUGEPAGES:
+				return tr('transparent hugepages on request only, server profiles')
+			case PerformanceTuning.CPU_GOVERNOR:
+				return tr('performance CPU governor, server profiles without power management')
+
+
+class PerformanceConfigSerialization(TypedDict):
+	tunings: list[str]
+
+
 class ZramAlgorithm(StrEnum):
 	ZSTD = auto()
 	LZO_RLE = 'lzo-rle'
 	LZO = auto()
 	LZ4 = auto()
 	LZ4HC = auto()
+	# benchmarked on the installing machine
+	AUTO = auto()
+
+
+class ZramBenchmarkSerialization(TypedDict):
+	algorithm: str
+	ratio: float
+	compress_rate: int
+	decompress_rate: int
+
+
+class ZramConfigSerialization(TypedDict):
+	enabled: bool
+	algorithm: str
+	size: NotRequired[str]
+	swappiness: NotRequired[int]
+	benchmarks: NotRequired[list[ZramBenchmarkSerialization]]
 
 
 class ApplicationSerialization(TypedDict):
@@ -82,6 +121,7 @@ class ApplicationSerialization(TypedDict):
 	print_service_config: NotRequired[PrintServiceConfigSerialization]
 	firewall_config: NotRequired[FirewallConfigSerialization]
 	fonts_config: NotRequired[FontsConfigSerialization]
+	performance_config: NotRequired[PerformanceConfigSerialization]
 
 
 @dataclass
@@ -168,10 +208,53 @@ class FontsConfiguration:
 		return cls(fonts=[FontPackage(f) for f in arg['fonts']])
 
 
+@dataclass
+class PerformanceConfiguration:
+	tunings: list[PerformanceTuning]
+
+	def json(self) -> PerformanceConfigSerialization:
+		return {'tunings': [t.value for t in self.tunings]}
+
+	@classmethod
+	def parse_arg(cls, arg: PerformanceConfigSerialization) -> Self:
+		return cls(tunings=[PerformanceTuning(t) for t in arg['tunings']])
+
+
+@dataclass(frozen=True)
+class ZramBenchmark:
+	algorithm: ZramAlgorithm
+	ratio: float
+	# bytes/s on a single core
+	compress_rate: int
+	decompress_rate: int
+
+	def json(self) -> ZramBenchmarkSerialization:
+		return {
+			'algorithm': self.algorithm.value,
+			'ratio': self.ratio,
+			'compress_rate': self.compress_rate,
+			'decompress_rate': self.decompress_rate,
+		}
+
+	@classmethod
+	def parse_arg(cls, arg: ZramBenchmarkSerialization) -> Self:
+		return cls(
+			algorithm=ZramAlgorithm(arg['algorithm']),
+			ratio=arg['ratio'],
+			compress_rate=arg['compress_rate'],
+			decompress_rate=arg['decompress_rate'],
+		)
+
+
 @dataclass(frozen=True)
 class ZramConfiguration(SubConfig):
 	enabled: bool
 	algorithm: ZramAlgorithm = ZramAlgorithm.ZSTD
+	# zram-size of zram-generator, in MiB or as an expression such as "min(ram / 2, 4096)"
+	size: str | None = None
+	swappiness: int | None = None
+	# measurements the automatic algorithm was picked from
+	benchmarks: tuple[ZramBenchmark, ...] = ()
 
 	@classmethod
 	def parse_arg(cls, arg: bool | dict[str, Any]) -> Self:
@@ -180,15 +263,32 @@ class ZramConfiguration(SubConfig):
 
 		enabled = arg.get('enabled', True)
 		algo = arg.get('algorithm', arg.get('algo', ZramAlgorithm.ZSTD.value))
-		return cls(enabled=enabled, algorithm=ZramAlgorithm(algo))
+		benchmarks = tuple(ZramBenchmark.parse_arg(b) for b in arg.get('benchmarks', []))
+
+		return cls(
+			enabled=enabled,
+			algorithm=ZramAlgorithm(algo),
+			size=arg.get('size', None),
+			swappiness=arg.get('swappiness', None),
+			benchmarks=benchmarks,
+		)
 
 	@override
-	def json(self) -> dict[str, bool | str]:
-		return {
+	def json(self) -> ZramConfigSerialization:
+		config: ZramConfigSerialization = {
 			'enabled': self.enabled,
 			'algorithm': self.algorithm.value,
 		}
 
+		if self.size is not None:
+			config['size'] = self.size
+		if self.swappiness is not None:
+			config['swappiness'] = self.swappiness
+		if self.benchmarks:
+			config['benchmarks'] = [b.json() for b in self.benchmarks]
+
+		return config
+
 	@override
 	def summary(self) -> list[str] | None:
 		out: list[str] = []
@@ -197,6 +297,8 @@ class ZramConfiguration(SubConfig):
 			out.append(tr('Zram enabled'))
 
 			out.append(tr('Zram algorithm {}').format(self.algorithm))
+			if self.size is not None:
+				out.append(tr('Zram size {}').format(self.size))
 			return out
 
 		return None
@@ -210,6 +312,7 @@ class ApplicationConfiguration(SubConfig):
 	print_service_config: PrintServiceConfiguration | None = None
 	firewall_config: FirewallConfiguration | None = None
 	fonts_config: FontsConfiguration | None = None
+	performance_config: PerformanceConfiguration | None = None
 
 	@classmethod
 	def parse_arg(
@@ -241,6 +344,9 @@ class ApplicationConfiguration(SubConfig):
 		if args and (fonts_config := args.get('fonts_config')) is not None:
 			app_config.fonts_config = FontsConfiguration.parse_arg(fonts_config)
 
+		if args and (performance_config := args.get('performance_config')) is not None:
+			app_config.performance_config = PerformanceConfiguration.parse_arg(performance_config)
+
 		return app_config
 
 	@override
@@ -265,6 +371,9 @@ class ApplicationConfiguration(SubConfig):
 		if self.fonts_config:
 			config['fonts_config'] = self.fonts_config.json()
 
+		if self.performance_config:
+			config['performance_config'] = self.performance_config.json()
+
 		return config
 
 	@override
@@ -290,4 +399,8 @@ class ApplicationConfiguration(SubConfig):
 			fonts = ', '.join(f.value for f in self.fonts_config.fonts)
 			out.append(tr('Extra fonts "{}"').format(fonts))
 
+		if self.performance_config and self.performance_config.tunings:
+			tunings = ', '.join(t.value for t in self.performance_config.tunings)
+			out.append(tr('Performance tuning "{}"').format(tunings))
+
 		return out
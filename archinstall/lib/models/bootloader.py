@@ -88,12 +88,58 @@ class PlymouthTheme(Enum):
 		return cls(plymouth)
 
 
+class InitramfsCompression(Enum):
+	AUTO = 'auto'
+	ZSTD_1 = 'zstd:1'
+	ZSTD_3 = 'zstd:3'
+	ZSTD_9 = 'zstd:9'
+	ZSTD_19 = 'zstd:19'
+	LZ4 = 'lz4'
+	XZ = 'xz'
+	NONE = 'none'
+
+	def mkinitcpio_options(self) -> tuple[str, list[str]]:
+		"""
+		The COMPRESSION and COMPRESSION_OPTIONS of mkinitcpio.conf,
+		mkinitcpio adds the options the kernel needs (lz4 -l, xz --check=crc32) itself.
+		"""
+		match self:
+			case InitramfsCompression.AUTO:
+				raise ValueError('The automatic compression has to be resolved first')
+			case InitramfsCompression.LZ4 | InitramfsCompression.XZ:
+				return self.value, []
+			case InitramfsCompression.NONE:
+				return 'cat', []
+			case _:
+				algorithm, _, level = self.value.partition(':')
+				return algorithm, [f'-{level}', '-T0']
+
+	@classmethod
+	def from_arg(cls, compression: str | None) -> Self | None:
+		if compression is None:
+			return None
+
+		values = [e.value for e in cls]
+
+		if compression not in values:
+			warn(f'Invalid initramfs compression "{compression}". Allowed values: {", ".join(values)}')
+			sys.exit(1)
+
+		return cls(compression)
+
+
 @dataclass
 class BootloaderConfiguration(SubConfig):
 	bootloader: Bootloader
 	uki: bool = False
 	removable: bool = True
 	plymouth: PlymouthTheme | None = None
+	initramfs_compression: InitramfsCompression | None = None
+	fast_boot: bool = False
+
+	def uki_enabled(self, uefi: bool) -> bool:
+		# fast boot loads the kernel and initramfs as a single image
+		return self.uki or (self.fast_boot and uefi and self.bootloader.has_uki_support())
 
 	@override
 	def json(self) -> dict[str, Any]:
@@ -101,6 +147,10 @@ class BootloaderConfiguration(SubConfig):
 
 		if self.plymouth is not None:
 			data['plymouth'] = self.plymouth.value
+		if self.initramfs_compression is not None:
+			data['initramfs_compression'] = self.initramfs_compression.value
+		if self.fast_boot:
+			data['fast_boot'] = True
 		return data
 
 	@override
@@ -113,6 +163,10 @@ class BootloaderConfiguration(SubConfig):
 			out.append(tr('Removable'))
 		if self.plymouth is not None:
 			out.append(tr('Plymouth "{}"').format(self.plymouth.value))
+		if self.initramfs_compression is not None:
+			out.append(tr('Initramfs compression "{}"').format(self.initramfs_compression.value))
+		if self.fast_boot:
+			out.append(tr('Fast boot'))
 
 		return out
 
@@ -122,7 +176,16 @@ class BootloaderConfiguration(SubConfig):
 		uki = config.get('uki', False)
 		removable = config.get('removable', True)
 		plymouth = PlymouthTheme.from_arg(config.get('plymouth', None))
-		return cls(bootloader=bootloader, uki=uki, removable=removable, plymouth=plymouth)
+		initramfs_compression = InitramfsCompression.from_arg(config.get('initramfs_compression', None))
+		fast_boot = config.get('fast_boot', False)
+		return cls(
+			bootloader=bootloader,
+			uki=uki,
+			removable=removable,
+			plymouth=plymouth,
+			initramfs_compression=initramfs_compression,
+			fast_boot=fast_boot,
+		)
 
 	@classmethod
 	def get_default(cls, uefi: bool, skip_boot: bool = False) -> Self:
@@ -152,4 +215,10 @@ class BootloaderConfiguration(SubConfig):
 		if self.plymouth is not None:
 			text += f'{tr("Plymouth")}: {self.plymouth.value}'
 			text += '\n'
+		if self.initramfs_compression is not None:
+			text += f'{tr("Initramfs compression")}: {self.initramfs_compression.value}'
+			text += '\n'
+		if self.fast_boot:
+			text += f'{tr("Fast boot")}: {tr("Enabled")}'
+			text += '\n'
 		return text
@@ -44,6 +44,32 @@ class DiskLayoutType(Enum):
 				return tr('Pre-mount')
 
 
+class WipeMode(Enum):
+	# only the metadata is wiped so that no old signatures are detected
+	Signatures = 'signatures'
+	# discard on SSD/NVMe, zeroing everything else
+	Auto = 'auto'
+	Discard = 'discard'
+	SecureDiscard = 'secure_discard'
+	ZeroOut = 'zeroout'
+	Overwrite = 'overwrite'
+
+	def display_msg(self) -> str:
+		match self:
+			case WipeMode.Signatures:
+				return tr('Signatures only')
+			case WipeMode.Auto:
+				return tr('Automatic (discard or zero out)')
+			case WipeMode.Discard:
+				return tr('Discard (TRIM)')
+			case WipeMode.SecureDiscard:
+				return tr('Secure discard')
+			case WipeMode.ZeroOut:
+				return tr('Zero out')
+			case WipeMode.Overwrite:
+				return tr('Overwrite with zeros')
+
+
 class _DiskLayoutConfigurationSerialization(TypedDict):
 	config_type: str
 	device_modifications: NotRequired[list[_DeviceModificationSerialization]]
@@ -51,6 +77,7 @@ class _DiskLayoutConfigurationSerialization(TypedDict):
 	mountpoint: NotRequired[str]
 	btrfs_options: NotRequired[_BtrfsOptionsSerialization]
 	disk_encryption: NotRequired[_DiskEncryptionSerialization]
+	wipe_mode: NotRequired[str]
 
 
 @dataclass
@@ -60,6 +87,8 @@ class DiskLayoutConfiguration(SubConfig):
 	lvm_config: LvmConfiguration | None = None
 	disk_encryption: DiskEncryption | None = None
 	btrfs_options: BtrfsOptions | None = None
+	# how devices that are wiped are cleared
+	wipe_mode: WipeMode = WipeMode.Signatures
 
 	# used for pre-mounted config
 	mountpoint: Path | None = None
@@ -86,6 +115,9 @@ class DiskLayoutConfiguration(SubConfig):
 			if self.btrfs_options:
 				config['btrfs_options'] = self.btrfs_options.json()
 
+			if self.wipe_mode != WipeMode.Signatures:
+				config['wipe_mode'] = self.wipe_mode.value
+
 			return config
 
 	@override
@@ -101,6 +133,9 @@ class DiskLayoutConfiguration(SubConfig):
 			if self.lvm_config is not None:
 				out.append(tr('LVM set up'))
 
+			if self.wipe_mode != WipeMode.Signatures and any(mod.wipe for mod in self.device_modifications):
+				out.append(tr('Wipe: {}').format(self.wipe_mode.display_msg()))
+
 		if self.disk_encryption is not None:
 			out.append(tr('{} encryption').format(self.disk_encryption.encryption_type.type_to_text()))
 
@@ -127,6 +162,7 @@ class DiskLayoutConfiguration(SubConfig):
 		config = cls(
 			config_type=DiskLayoutType(config_type),
 			device_modifications=device_modifications,
+			wipe_mode=WipeMode(disk_config.get('wipe_mode', WipeMode.Signatures.value)),
 		)
 
 		if config_type == DiskLayoutType.Pre_mount.value:
@@ -508,6 +544,11 @@ class BtrfsMountOption(Enum):
 	compress = 'compress=zstd'
 	nodatacow = 'nodatacow'
 
+	@staticmethod
+	def compression_enabled(mount_options: list[str]) -> bool:
+		# the compression level may be appended, e.g. compress=zstd:3
+		return any(option.split(':', 1)[0] == BtrfsMountOption.compress.value for option in mount_options)
+
 
 @dataclass
 class _BtrfsSubvolumeInfo:
@@ -1130,6 +1171,8 @@ class _LvmVolumeSerialization(TypedDict):
 	mountpoint: str | None
 	mount_options: list[str]
 	btrfs: list[_SubvolumeModificationSerialization]
+	stripes: NotRequired[int]
+	stripe_size: NotRequired[_SizeSerialization]
 
 
 @dataclass
@@ -1141,6 +1184,9 @@ class LvmVolume:
 	mountpoint: Path | None
 	mount_options: list[str] = field(default_factory=list)
 	btrfs_subvols: list[SubvolumeModification] = field(default_factory=list)
+	# number of PVs the volume is striped across, the stripe size defaults to 64KiB
+	stripes: int = 1
+	stripe_size: Size | None = None
 
 	# volume group name
 	vg_name: str | None = None
@@ -1210,6 +1256,8 @@ class LvmVolume:
 			mountpoint=Path(arg['mountpoint']) if arg['mountpoint'] else None,
 			mount_options=arg.get('mount_options', []),
 			btrfs_subvols=SubvolumeModification.parse_args(arg.get('btrfs', [])),
+			stripes=arg.get('stripes', 1),
+			stripe_size=Size.parse_args(stripe_size) if (stripe_size := arg.get('stripe_size')) else None,
 		)
 
 		volume._obj_id = arg['obj_id']
@@ -1217,7 +1265,7 @@ class LvmVolume:
 		return volume
 
 	def json(self) -> _LvmVolumeSerialization:
-		return {
+		volume: _LvmVolumeSerialization = {
 			'obj_id': self.obj_id,
 			'status': self.status.value,
 			'name': self.name,
@@ -1228,6 +1276,14 @@ class LvmVolume:
 			'btrfs': [vol.json() for vol in self.btrfs_subvols],
 		}
 
+		if self.is_striped():
+			volume['stripes'] = self.stripes
+
+			if self.stripe_size:
+				volume['stripe_size'] = self.stripe_size.json()
+
+		return volume
+
 	def table_data(self) -> dict[str, str]:
 		part_mod = {
 			'Type': self.status.value,
@@ -1237,9 +1293,13 @@ class LvmVolume:
 			'Mountpoint': str(self.mountpoint) if self.mountpoint else '',
 			'Mount options': ', '.join(self.mount_options),
 			'Btrfs': '{} {}'.format(str(len(self.btrfs_subvols)), 'vol'),
+			'Stripes': str(self.stripes),
 		}
 		return part_mod
 
+	def is_striped(self) -> bool:
+		return self.stripes > 1
+
 	def is_modify(self) -> bool:
 		return self.status == ModificationStatus.MODIFY
 
@@ -1459,12 +1519,57 @@ class EncryptionType(StrEnum):
 		return type_to_text[self]
 
 
+class _PbkdfParamsSerialization(TypedDict):
+	iterations: int
+	memory: int
+	parallel: int
+
+
+@dataclass(frozen=True)
+class PbkdfParams:
+	"""
+	Explicit argon2id cost parameters, with these set cryptsetup
+	doesn't benchmark the key derivation for every volume.
+	"""
+
+	iterations: int
+	# memory cost in KiB
+	memory: int
+	parallel: int
+
+	def json(self) -> _PbkdfParamsSerialization:
+		return {
+			'iterations': self.iterations,
+			'memory': self.memory,
+			'parallel': self.parallel,
+		}
+
+	def cryptsetup_args(self) -> list[str]:
+		return [
+			'--pbkdf-force-iterations',
+			str(self.iterations),
+			'--pbkdf-memory',
+			str(self.memory),
+			'--pbkdf-parallel',
+			str(self.parallel),
+		]
+
+	@classmethod
+	def parse_arg(cls, arg: _PbkdfParamsSerialization) -> Self:
+		return cls(
+			iterations=arg['iterations'],
+			memory=arg['memory'],
+			parallel=arg['parallel'],
+		)
+
+
 class _DiskEncryptionSerialization(TypedDict):
 	encryption_type: str
 	partitions: list[str]
 	lvm_volumes: list[str]
 	hsm_device: NotRequired[_Fido2DeviceSerialization]
 	iter_time: NotRequired[int]
+	pbkdf: NotRequired[_PbkdfParamsSerialization]
 
 
 @dataclass
@@ -1475,6 +1580,7 @@ class DiskEncryption:
 	lvm_volumes: list[LvmVolume] = field(default_factory=list)
 	hsm_device: Fido2Device | None = None
 	iter_time: int = DEFAULT_ITER_TIME
+	pbkdf: PbkdfParams | None = None
 
 	def __post_init__(self) -> None:
 		if self.encryption_type in [EncryptionType.LUKS, EncryptionType.LVM_ON_LUKS] and not self.partitions:
@@ -1502,6 +1608,9 @@ class DiskEncryption:
 		if self.iter_time != DEFAULT_ITER_TIME:  # Only include if not default
 			obj['iter_time'] = self.iter_time
 
+		if self.pbkdf:
+			obj['pbkdf'] = self.pbkdf.json()
+
 		return obj
 
 	@staticmethod
@@ -1559,6 +1668,9 @@ class DiskEncryption:
 		if iter_time := disk_encryption.get('iter_time', None):
 			enc.iter_time = iter_time
 
+		if pbkdf := disk_encryption.get('pbkdf', None):
+			enc.pbkdf = PbkdfParams.parse_arg(pbkdf)
+
 		return enc
 
 
@@ -150,6 +150,18 @@ class MirrorRegion:
 		return self.name == other.name
 
 
+class MirrorSelectionMode(Enum):
+	Manual = 'manual'
+	Auto = 'auto'
+
+	def display_msg(self) -> str:
+		match self:
+			case MirrorSelectionMode.Manual:
+				return tr('Manual region selection')
+			case MirrorSelectionMode.Auto:
+				return tr('Automatic selection')
+
+
 class SignCheck(Enum):
 	Never = 'Never'
 	Optional = 'Optional'
@@ -229,6 +241,7 @@ class CustomServer:
 
 
 class _MirrorConfigurationSerialization(TypedDict):
+	selection_mode: str
 	mirror_regions: dict[str, list[str]]
 	custom_servers: list[CustomServer]
 	optional_repositories: list[str]
@@ -237,6 +250,7 @@ class _MirrorConfigurationSerialization(TypedDict):
 
 @dataclass
 class MirrorConfiguration(SubConfig):
+	selection_mode: MirrorSelectionMode = MirrorSelectionMode.Manual
 	mirror_regions: list[MirrorRegion] = field(default_factory=list)
 	custom_servers: list[CustomServer] = field(default_factory=list)
 	optional_repositories: list[Repository] = field(default_factory=list)
@@ -257,6 +271,7 @@ class MirrorConfiguration(SubConfig):
 			regions.update(m.json())
 
 		return {
+			'selection_mode': self.selection_mode.value,
 			'mirror_regions': regions,
 			'custom_servers': self.custom_servers,
 			'optional_repositories': [r.value for r in self.optional_repositories],
@@ -267,7 +282,9 @@ class MirrorConfiguration(SubConfig):
 	def summary(self) -> list[str]:
 		out: list[str] = []
 
-		if self.mirror_regions:
+		if self.selection_mode == MirrorSelectionMode.Auto:
+			out.append(tr('Mirrors selected automatically'))
+		elif self.mirror_regions:
 			out.append(tr('Mirror regions "{}"').format(', '.join(m.name for m in self.mirror_regions)))
 
 		if self.optional_repositories:
@@ -298,6 +315,17 @@ class MirrorConfiguration(SubConfig):
 	) -> str:
 		config = ''
 
+		if self.selection_mode == MirrorSelectionMode.Auto:
+			mirrors = mirror_list_handler.get_auto_mirrors()
+
+			if mirrors:
+				config += '\n\n## Automatically selected\n'
+
+				for status in mirrors:
+					config += f'Server = {status.server_url}\n'
+
+			return config
+
 		for mirror_region in self.mirror_regions:
 			sorted_stati = mirror_list_handler.get_status_by_region(
 				mirror_region.name,
@@ -329,6 +357,9 @@ class MirrorConfiguration(SubConfig):
 	) -> Self:
 		config = cls()
 
+		if selection_mode := args.get('selection_mode'):
+			config.selection_mode = MirrorSelectionMode(selection_mode)
+
 		mirror_regions = args.get('mirror_regions', [])
 		if mirror_regions:
 			for region, urls in mirror_regions.items():
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Self, TypedDict, override
+from typing import NotRequired, Self, TypedDict, override
 
 from archinstall.lib.models.config import SubConfig
 from archinstall.lib.translationhandler import tr
@@ -8,18 +8,21 @@ from archinstall.lib.translationhandler import tr
 class PacmanConfigSerialization(TypedDict):
 	parallel_downloads: int
 	color: bool
+	segmented_downloads: NotRequired[bool]
 
 
 @dataclass
 class PacmanConfiguration(SubConfig):
 	parallel_downloads: int = 5
 	color: bool = True
+	segmented_downloads: bool = False
 
 	@override
 	def json(self) -> PacmanConfigSerialization:
 		return {
 			'parallel_downloads': self.parallel_downloads,
 			'color': self.color,
+			'segmented_downloads': self.segmented_downloads,
 		}
 
 	@override
@@ -31,7 +34,8 @@ class PacmanConfiguration(SubConfig):
 	def preview(self) -> str:
 		color_str = str(self.color)
 		output = '{}: {}\n'.format(tr('Parallel Downloads'), self.parallel_downloads)
-		output += '{}: {}'.format(tr('Color'), color_str)
+		output += '{}: {}\n'.format(tr('Color'), color_str)
+		output += '{}: {}'.format(tr('Segmented downloads'), str(self.segmented_downloads))
 		return output
 
 	@classmethod
@@ -42,5 +46,7 @@ class PacmanConfiguration(SubConfig):
 			config.parallel_downloads = int(args['parallel_downloads'])
 		if 'color' in args:
 			config.color = bool(args['color'])
+		if 'segmented_downloads' in args:
+			config.segmented_downloads = bool(args['segmented_downloads'])
 
 		return config
@@ -47,6 +47,18 @@ def install_network_config(
 			installation.enable_service('systemd-resolved')
 
 
+def mask_wait_online(network_config: NetworkConfiguration, installation: Installer) -> None:
+	"""
+	Masks the unit that holds back network-online.target until every link is configured,
+	services ordered after it would otherwise wait for DHCP or a wireless connection on boot.
+	"""
+	match network_config.type:
+		case NicType.NM | NicType.NM_IWD:
+			installation.mask_service('NetworkManager-wait-online.service')
+		case NicType.ISO | NicType.IWD | NicType.MANUAL:
+			installation.mask_service('systemd-networkd-wait-online.service')
+
+
 def _configure_nm_iwd(installation: Installer) -> None:
 	nm_conf_dir = installation.target / 'etc/NetworkManager/conf.d'
 	nm_conf_dir.mkdir(parents=True, exist_ok=True)
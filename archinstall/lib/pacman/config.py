@@ -1,6 +1,8 @@
 import re
 from pathlib import Path
 
+from archinstall.lib.mirror.segmented_download import MODULE as SEGMENTED_DOWNLOAD_MODULE
+from archinstall.lib.mirror.segmented_download import xfer_command
 from archinstall.lib.models.packages import Repository
 from archinstall.lib.models.pacman import PacmanConfiguration
 from archinstall.lib.pathnames import PACMAN_CONF
@@ -14,6 +16,7 @@ class PacmanConfig:
 			self._config_remote_path = target / PACMAN_CONF.relative_to_root()
 
 		self._repositories: list[Repository] = []
+		self._xfer_command: str | None = None
 
 	def enable(self, repo: Repository | list[Repository]) -> None:
 		if not isinstance(repo, list):
@@ -21,8 +24,15 @@ class PacmanConfig:
 
 		self._repositories += repo
 
+	def enable_segmented_downloads(self, target: Path) -> None:
+		"""
+		Makes pacman on the live system download through the segmented
+		multi-mirror downloader, for the packages strapped into target.
+		"""
+		self._xfer_command = xfer_command(target)
+
 	def apply(self) -> None:
-		if not self._repositories:
+		if not self._repositories and not self._xfer_command:
 			return
 
 		repos_to_enable = []
@@ -46,6 +56,11 @@ class PacmanConfig:
 				if row + 1 < len(content) and content[row + 1].lstrip().startswith('#'):
 					content[row + 1] = re.sub(r'^#\s*', '', content[row + 1])
 
+		if self._xfer_command:
+			content = [line for line in content if SEGMENTED_DOWNLOAD_MODULE not in line]
+			options = content.index('[options]\n') if '[options]\n' in content else 0
+			content.insert(options + 1, f'XferCommand = {self._xfer_command}\n')
+
 		# Write the modified content back to the file
 		with PACMAN_CONF.open('w') as f:
 			f.writelines(content)
@@ -67,6 +82,9 @@ class PacmanConfig:
 				result.append(f'ParallelDownloads = {pacman_config.parallel_downloads}')
 			elif re.match(r'^#?\s*Color\s*$', line):
 				result.append('Color' if pacman_config.color else '#Color')
+			elif SEGMENTED_DOWNLOAD_MODULE in line:
+				# The downloader is part of archinstall and not available on the target
+				continue
 			else:
 				result.append(line)
 
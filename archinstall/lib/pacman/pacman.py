@@ -3,19 +3,26 @@ import time
 from collections.abc import Callable
 from pathlib import Path
 
-from archinstall.lib.command import SysCommand
+from archinstall.lib.command import SysCommand, SysCommandWorker
 from archinstall.lib.exceptions import RequirementError, SysCallError
 from archinstall.lib.log import debug, error, info, warn
-from archinstall.lib.pathnames import PACMAN_CONF
+from archinstall.lib.mirror.mirror_health import MirrorHealthMonitor
+from archinstall.lib.pathnames import MIRRORLIST, PACMAN_CONF
 from archinstall.lib.plugins import plugins
 from archinstall.lib.translationhandler import tr
 
+# Automatic retries against the remaining mirrors before asking the user
+MIRROR_FAILOVER_RETRIES = 2
+
 
 class Pacman:
 	def __init__(self, target: Path, silent: bool = False):
 		self.synced = False
 		self.silent = silent
 		self.target = target
+		self.mirror_health = MirrorHealthMonitor(MIRRORLIST)
+		# pacstrap runs the hooks of the host's hook directory unless told otherwise
+		self.hook_dir: Path | None = None
 
 	@staticmethod
 	def run(args: str, default_cmd: str = 'pacman') -> SysCommand:
@@ -104,10 +111,48 @@ class Pacman:
 
 		info(f'Installing packages: {packages}')
 
+		cmd = f'pacstrap -C {PACMAN_CONF} -K {self.target} {" ".join(packages)} --noconfirm --needed'
+
+		if self.hook_dir is not None:
+			cmd += f' --hookdir {self.hook_dir}'
+
 		self.ask(
 			'Could not strap in packages',
 			'Pacstrap failed. See /var/log/archinstall/install.log or above message for error details',
-			SysCommand,
-			f'pacstrap -C {PACMAN_CONF} -K {self.target} {" ".join(packages)} --noconfirm --needed',
-			peek_output=True,
+			self._strap_with_failover,
+			cmd,
 		)
+
+	def _strap_with_failover(self, cmd: str) -> None:
+		"""
+		Runs pacstrap while tracking the health of the mirrors it downloads from.
+		When it fails on mirrors that failed or stalled, those are demoted in the
+		live mirrorlist and pacstrap is retried, without asking, against the rest.
+		"""
+		attempt = 0
+
+		while True:
+			try:
+				self._run_monitored(cmd)
+				break
+			except SysCallError:
+				if attempt >= MIRROR_FAILOVER_RETRIES or not self.mirror_health.demote_unhealthy():
+					raise
+
+				attempt += 1
+				warn(f'Pacstrap failed on unhealthy mirrors, retrying against the remaining mirrors ({attempt}/{MIRROR_FAILOVER_RETRIES})')
+
+		# Mirrors that misbehaved during a successful run are demoted as
+		# well, so that the following installation steps avoid them
+		self.mirror_health.demote_unhealthy()
+
+	def _run_monitored(self, cmd: str) -> None:
+		with SysCommandWorker(cmd, peek_output=True) as worker:
+			position = 0
+
+			while worker.is_alive():
+				if (end := len(worker._trace_log)) > position:
+					self.mirror_health.feed(worker._trace_log[position:end])
+					position = end
+
+			self.mirror_health.feed(worker._trace_log[position:] + b'\n')
@@ -43,8 +43,22 @@ class PacmanMenu(AbstractSubMenu[PacmanConfiguration]):
 				preview_action=lambda item: str(item.get_value()),
 				key='color',
 			),
+			MenuItem(
+				text=tr('Segmented downloads'),
+				action=select_segmented_downloads,
+				value=self._pacman_conf.segmented_downloads,
+				preview_action=self._prev_segmented_downloads,
+				key='segmented_downloads',
+				enabled=self._advanced,
+			),
 		]
 
+	def _prev_segmented_downloads(self, item: MenuItem) -> str:
+		output = f'{tr("Segmented downloads")}: {item.get_value()}\n\n'
+		output += tr('Large packages are downloaded in parallel segments from the top mirrors.') + '\n'
+		output += tr('Pacman downloads one file at a time in this mode.')
+		return output
+
 	@override
 	async def show(self) -> PacmanConfiguration | None:
 		config = await super().show()
@@ -115,3 +129,19 @@ async def select_color(preset: bool = True) -> bool | None:
 			return True
 		case ResultType.Selection:
 			return result.get_value()
+
+
+async def select_segmented_downloads(preset: bool = False) -> bool | None:
+	result = await Confirmation(
+		header=tr('Download large packages in parallel segments from multiple mirrors'),
+		preset=preset,
+		allow_skip=True,
+	).show()
+
+	match result.type_:
+		case ResultType.Skip:
+			return preset
+		case ResultType.Reset:
+			return False
+		case ResultType.Selection:
+			return result.get_value()
@@ -0,0 +1,180 @@
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Final
+
+from archinstall.lib.command import SysCommand
+from archinstall.lib.exceptions import SysCallError
+from archinstall.lib.hardware import read_meminfo
+from archinstall.lib.log import debug, info
+from archinstall.lib.models.application import ZramAlgorithm, ZramBenchmark, ZramConfiguration
+
+_PAGE_SIZE: Final = mmap.PAGESIZE
+# Swapped out memory is mostly heap data and pages of binaries and libraries
+_SAMPLE_GLOBS: Final = ('usr/lib/*.so*', 'usr/bin/*')
+_SAMPLE_SIZE: Final = 32 * 1024**2
+# An algorithm is only picked for its ratio if it doesn't fall
+# too far behind the fastest one, swap-in latency matters most
+_MIN_DECOMPRESS_SHARE: Final = 0.5
+_MIN_COMPRESS_SHARE: Final = 0.25
+# At most half of the memory is used for compressed pages
+_MAX_MEMORY_SHARE: Final = 0.5
+# zram has no seek cost, reading ahead only decompresses pages that may not be needed.
+# Boosting the watermarks makes kswapd reclaim too aggressively for in-memory swap.
+_ZRAM_SYSCTLS: Final = {
+	'vm.page-cluster': 0,
+	'vm.watermark_boost_factor': 0,
+	'vm.watermark_scale_factor': 125,
+}
+
+
+def zram_sample(root: Path) -> bytes:
+	"""
+	Page aligned sample of the binaries and libraries of a system.
+	"""
+	sample = b''
+
+	for pattern in _SAMPLE_GLOBS:
+		for path in sorted(root.glob(pattern)):
+			if path.is_symlink() or not path.is_file():
+				continue
+
+			with path.open('rb') as fp:
+				sample += fp.read(_SAMPLE_SIZE - len(sample))
+
+			if len(sample) >= _SAMPLE_SIZE:
+				return sample
+
+	return sample[: len(sample) - len(sample) % _PAGE_SIZE]
+
+
+def _transfer(dev_path: Path, sample: bytes, write: bool) -> float:
+	# O_DIRECT bypasses the page cache so that every page goes through the compressor
+	with mmap.mmap(-1, len(sample)) as buffer:
+		buffer.write(sample)
+		view = memoryview(buffer)
+		fd = os.open(dev_path, (os.O_WRONLY if write else os.O_RDONLY) | os.O_DIRECT)
+
+		try:
+			started = time.perf_counter()
+			position = 0
+
+			while position < len(sample):
+				if write:
+					position += os.pwrite(fd, view[position:], position)
+				else:
+					position += os.preadv(fd, [view[position:]], position)
+
+			if write:
+				os.fsync(fd)
+
+			return time.perf_counter() - started
+		finally:
+			view.release()
+			os.close(fd)
+
+
+def benchmark_algorithm(algorithm: ZramAlgorithm, sample: bytes) -> ZramBenchmark | None:
+	"""
+	Measures the compression ratio and the single core throughput of the
+	kernel's implementation of an algorithm on a temporary zram device.
+	"""
+	try:
+		dev_path = Path(SysCommand(f'zramctl --find --size {len(sample)} --algorithm {algorithm.value}').decode())
+	except SysCallError as err:
+		debug(f'Unable to benchmark zram algorithm {algorithm.value}: {err}')
+		return None
+
+	try:
+		write_time = _transfer(dev_path, sample, write=True)
+		# orig_data_size and compr_data_size, same-filled pages aren't compressed at all
+		stats = (Path('/sys/block') / dev_path.name / 'mm_stat').read_text().split()
+		read_time = _transfer(dev_path, sample, write=False)
+	except OSError as err:
+		debug(f'zram benchmark of {algorithm.value} failed: {err}')
+		return None
+	finally:
+		SysCommand(f'zramctl --reset {dev_path}')
+
+	original, compressed = int(stats[0]), max(1, int(stats[1]))
+
+	return ZramBenchmark(
+		algorithm=algorithm,
+		ratio=round(original / compressed, 2),
+		compress_rate=int(len(sample) / write_time),
+		decompress_rate=int(len(sample) / read_time),
+	)
+
+
+def select_algorithm(benchmarks: list[ZramBenchmark]) -> ZramBenchmark:
+	"""
+	The algorithm with the best compression ratio among those that
+	compress and decompress about as fast as the fastest ones.
+	"""
+	fastest_decompress = max(b.decompress_rate for b in benchmarks)
+	fastest_compress = max(b.compress_rate for b in benchmarks)
+
+	candidates = [
+		b for b in benchmarks if b.decompress_rate >= fastest_decompress * _MIN_DECOMPRESS_SHARE and b.compress_rate >= fastest_compress * _MIN_COMPRESS_SHARE
+	]
+
+	return max(candidates, key=lambda b: b.ratio)
+
+
+def zram_size(ratio: float, mem_total: int) -> str:
+	"""
+	The zram-size in MiB for which the compressed pages take up
+	at most half of the memory (given in KiB) when the device is full.
+	"""
+	share = min(1.0, _MAX_MEMORY_SHARE * ratio)
+	return str(int(mem_total * share) // 1024)
+
+
+def zram_swappiness(decompress_rate: int, io_rate: int) -> int:
+	"""
+	The swappiness for swap that is faster than the file system, as the kernel
+	documentation derives it from the relative I/O cost of swap and file pages.
+	"""
+	relative_speed = decompress_rate / io_rate
+	return max(60, min(200, round(200 * relative_speed / (1 + relative_speed))))
+
+
+def zram_sysctls(swappiness: int) -> dict[str, int]:
+	return {'vm.swappiness': swappiness, **_ZRAM_SYSCTLS}
+
+
+def tune_zram(root: Path, io_rate: int) -> ZramConfiguration:
+	"""
+	Benchmarks the zram algorithms on pages of the system at root and derives the zram-size
+	and swappiness from the best one, falling back to zstd if nothing could be measured.
+	"""
+	sample = zram_sample(root)
+	benchmarks = []
+
+	SysCommand('modprobe zram')
+
+	for algorithm in ZramAlgorithm:
+		if algorithm != ZramAlgorithm.AUTO and (benchmark := benchmark_algorithm(algorithm, sample)) is not None:
+			info(
+				f'zram {algorithm.value}: ratio {benchmark.ratio}, '
+				f'compression {benchmark.compress_rate // 1024**2}MiB/s, decompression {benchmark.decompress_rate // 1024**2}MiB/s'
+			)
+			benchmarks.append(benchmark)
+
+	if not benchmarks:
+		info('Unable to benchmark zram, using zstd')
+		return ZramConfiguration(enabled=True, algorithm=ZramAlgorithm.ZSTD)
+
+	best = select_algorithm(benchmarks)
+	mem_total = read_meminfo().mem_total
+	config = ZramConfiguration(
+		enabled=True,
+		algorithm=best.algorithm,
+		size=zram_size(best.ratio, mem_total),
+		swappiness=zram_swappiness(best.decompress_rate, io_rate),
+		benchmarks=tuple(benchmarks),
+	)
+
+	info(f'Selected zram algorithm {config.algorithm.value}, {config.size} MiB and swappiness {config.swappiness} for {mem_total // 1024} MiB of memory')
+	return config
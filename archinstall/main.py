@@ -1,6 +1,7 @@
 # Arch Linux installer - guided, templates etc.
 
 import importlib
+import json
 import os
 import sys
 import textwrap
@@ -8,11 +9,13 @@ import time
 import traceback
 from pathlib import Path
 
-from archinstall.lib.args import ArchConfigHandler, SubCommand
+from archinstall.lib.args import ArchConfigHandler, Arguments, MirrorsCommand, SubCommand
 from archinstall.lib.disk.utils import disk_layouts
 from archinstall.lib.hardware import MemInfo, SysInfo, read_meminfo
 from archinstall.lib.log import debug, error, info, logger, share_install_log, warn
 from archinstall.lib.menu.helpers import Confirmation
+from archinstall.lib.mirror.mirror_handler import MirrorListHandler
+from archinstall.lib.mirror.mirror_ranking import benchmark_mirrors, format_mirrorlist
 from archinstall.lib.network.wifi_handler import WifiHandler
 from archinstall.lib.networking import ping
 from archinstall.lib.packages.util import check_version_upgrade
@@ -107,6 +110,40 @@ def _share_log_command() -> None:
 			error(tr('Failed to upload log.'))
 
 
+def _mirrors_rank_command(args: Arguments) -> int:
+	handler = MirrorListHandler(offline=args.offline, verbose=args.verbose)
+	handler.load_mirrors()
+
+	regions = {region.name for region in handler.get_mirror_regions()}
+	selected = args.rank_regions or sorted(regions)
+
+	if unknown := [name for name in selected if name not in regions]:
+		error(f'Unknown mirror regions: {", ".join(unknown)}')
+		return 1
+
+	mirrors = [mirror for name in selected for mirror in handler.get_status_by_region(name, speed_sort=False)]
+	# stdout is reserved for the machine-readable result
+	debug(f'Ranking {len(mirrors)} mirrors from {len(selected)} regions')
+
+	results = benchmark_mirrors(mirrors, workers=args.rank_workers)
+
+	if args.rank_limit is not None:
+		results = results[: args.rank_limit]
+
+	if args.rank_mirrorlist:
+		output = format_mirrorlist(results)
+	else:
+		output = json.dumps({'regions': selected, 'mirrors': [result.json() for result in results]}, indent=4)
+
+	if args.rank_output:
+		args.rank_output.write_text(output + '\n')
+		info(f'Mirror ranking written to {args.rank_output}')
+	else:
+		print(output)
+
+	return 0
+
+
 def run() -> int:
 	"""
 	This can either be run as the compiled and installed application: python setup.py install
@@ -123,6 +160,13 @@ def run() -> int:
 		case SubCommand.SHARE_LOG:
 			_share_log_command()
 			exit(0)
+		case SubCommand.MIRRORS:
+			match arch_config_handler.args.mirrors_command:
+				case MirrorsCommand.RANK:
+					return _mirrors_rank_command(arch_config_handler.args)
+				case None:
+					arch_config_handler.print_help()
+					return 1
 		case None:
 			pass
 
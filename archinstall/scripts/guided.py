@@ -11,6 +11,7 @@ from archinstall.lib.disk.filesystem import FilesystemHandler
 from archinstall.lib.disk.utils import disk_layouts
 from archinstall.lib.general.general_menu import PostInstallationAction, select_post_installation
 from archinstall.lib.global_menu import GlobalMenu
+from archinstall.lib.hardware import SysInfo
 from archinstall.lib.installer import Installer, accessibility_tools_in_use, run_custom_user_commands
 from archinstall.lib.log import debug, error, info
 from archinstall.lib.menu.util import delayed_warning
@@ -18,7 +19,7 @@ from archinstall.lib.mirror.mirror_handler import MirrorListHandler
 from archinstall.lib.models import Bootloader
 from archinstall.lib.models.device import DiskLayoutType, EncryptionType
 from archinstall.lib.models.users import User
-from archinstall.lib.network.network_handler import install_network_config
+from archinstall.lib.network.network_handler import install_network_config, mask_wait_online
 from archinstall.lib.packages.util import check_version_upgrade
 from archinstall.lib.profile.profiles_handler import profile_handler
 from archinstall.lib.translationhandler import tr
@@ -71,7 +72,8 @@ def perform_installation(
 		return
 
 	disk_config = config.disk_config
-	run_mkinitcpio = not config.bootloader_config or not config.bootloader_config.uki
+	run_mkinitcpio = not config.bootloader_config or not config.bootloader_config.uki_enabled(SysInfo.has_uefi())
+	fast_boot = config.bootloader_config is not None and config.bootloader_config.fast_boot
 	locale_config = config.locale_config
 	optional_repositories = config.mirror_config.optional_repositories if config.mirror_config else []
 	mountpoint = disk_config.mountpoint if disk_config.mountpoint else mountpoint
@@ -98,6 +100,7 @@ def perform_installation(
 				installation.generate_key_files()
 
 		if mirror_config := config.mirror_config:
+			mirror_list_handler.timezone = config.timezone
 			installation.set_mirrors(mirror_list_handler, mirror_config, on_target=False)
 
 		installation.minimal_installation(
@@ -106,18 +109,26 @@ def perform_installation(
 			hostname=arch_config_handler.config.hostname,
 			locale_config=locale_config,
 			pacman_config=config.pacman_config,
+			initramfs_compression=config.bootloader_config.initramfs_compression if config.bootloader_config else None,
+			fast_boot=fast_boot,
 		)
 
 		if mirror_config := config.mirror_config:
 			installation.set_mirrors(mirror_list_handler, mirror_config, on_target=True)
 
 		if config.swap and config.swap.enabled:
-			installation.setup_swap(algo=config.swap.algorithm)
+			config.swap = installation.setup_swap(config.swap.algorithm, config.swap.size, config.swap.swappiness)
+			# the tuned parameters can be reused for installations on the same hardware
+			if config.swap.benchmarks:
+				arch_config_handler.config.save()
+
+		if app_config := config.app_config:
+			application_handler.tune_performance(installation, app_config, config.profile_config)
 
 		if config.bootloader_config and config.bootloader_config.bootloader != Bootloader.NO_BOOTLOADER:
 			installation.add_bootloader(
 				config.bootloader_config.bootloader,
-				config.bootloader_config.uki,
+				config.bootloader_config.uki_enabled(SysInfo.has_uefi()),
 				config.bootloader_config.removable,
 				config.bootloader_config.plymouth,
 			)
@@ -129,6 +140,9 @@ def perform_installation(
 				config.profile_config,
 			)
 
+			if fast_boot:
+				mask_wait_online(config.network_config, installation)
+
 		users = None
 		if config.auth_config:
 			if config.auth_config.users:
@@ -169,6 +183,9 @@ def perform_installation(
 		if services := config.services:
 			installation.enable_service(services)
 
+		if fast_boot:
+			installation.add_boot_report()
+
 		if disk_config.has_default_btrfs_vols():
 			btrfs_options = disk_config.btrfs_options
 			snapshot_config = btrfs_options.snapshot_config if btrfs_options else None
@@ -183,6 +200,10 @@ def perform_installation(
 
 		installation.genfstab()
 
+		# the images have to be complete before the post installation actions
+		if not installation.build_initramfs():
+			error('Error generating initramfs (continuing anyway)')
+
 		debug(f'Disk states after installing:\n{disk_layouts()}')
 
 		if not arch_config_handler.args.silent:
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark the mirror status parser against the full pydantic validation.
+
+Run manually from the repository root after changing the mirror status parsing
+in archinstall/lib/mirror/mirror_handler.py:
+
+	python3 test_tooling/benchmark_mirror_parser.py [status.json]
+
+Without an argument a synthetic status document is built from the servers in
+tests/data/mirrorlists, replicated to the size of the real document (~1100
+entries, most of which are filtered out). A real document can be fetched from
+https://archlinux.org/mirrors/status/json/ and passed instead.
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from archinstall.lib.mirror.mirror_handler import MirrorListHandler
+from archinstall.lib.models.mirrors import MirrorStatusEntryV3, MirrorStatusListV3
+
+FIXTURES = Path(__file__).parent.parent / 'tests/data/mirrorlists'
+TARGET_ENTRIES = 1100
+ROUNDS = 20
+
+
+def fixture_document() -> bytes:
+	servers: list[str] = []
+
+	for mirrorlist in sorted(FIXTURES.iterdir()):
+		for line in mirrorlist.read_text().splitlines():
+			if line.startswith('Server = '):
+				servers.append(line.removeprefix('Server = ').removesuffix('$repo/os/$arch'))
+
+	urls = []
+	index = 0
+
+	while len(urls) < TARGET_ENTRIES:
+		url = servers[index % len(servers)].replace('://', f'://m{index}.')
+		urls.append(
+			{
+				'url': url,
+				'protocol': 'https',
+				'active': index % 3 != 0,
+				'country': 'United States',
+				'country_code': 'US',
+				'isos': True,
+				'ipv4': True,
+				'ipv6': True,
+				'details': url,
+				'last_sync': '2025-01-11T05:00:00Z' if index % 4 else None,
+				'score': float(index % 150),
+				'delay': 600,
+				'duration_avg': 0.5,
+				'duration_stddev': 0.1,
+				'completion_pct': 1.0,
+			}
+		)
+		index += 1
+
+	return json.dumps(
+		{
+			'cutoff': 86400,
+			'last_check': '2025-01-11T05:17:17Z',
+			'num_checks': 1,
+			'urls': urls,
+			'version': 3,
+		}
+	).encode()
+
+
+def validate_all(data: bytes) -> dict[str, list[MirrorStatusEntryV3]]:
+	"""The previous implementation: validate every entry, then filter."""
+	mirror_status = MirrorStatusListV3.model_validate_json(data, context={'verbose': False})
+	regions: dict[str, list[MirrorStatusEntryV3]] = {}
+
+	for mirror in mirror_status.urls:
+		if mirror.active is False or mirror.last_sync is None or mirror.score is None or mirror.score >= 100:
+			continue
+
+		if mirror.url.startswith('http'):
+			regions.setdefault(mirror.country or 'Worldwide', []).append(mirror)
+
+	return dict(sorted(regions.items()))
+
+
+def main() -> int:
+	data = Path(sys.argv[1]).read_bytes() if len(sys.argv) > 1 else fixture_document()
+	handler = MirrorListHandler()
+
+	expected = validate_all(data)
+	result = handler._parse_remote_mirror_list(data)
+
+	if {k: [m.url for m in v] for k, v in expected.items()} != {k: [m.url for m in v] for k, v in result.items()}:
+		print('MISMATCH: filter-first parser returned different mirrors')
+		return 1
+
+	baseline = timeit.timeit(lambda: validate_all(data), number=ROUNDS) / ROUNDS
+	lean = timeit.timeit(lambda: handler._parse_remote_mirror_list(data), number=ROUNDS) / ROUNDS
+
+	kept = sum(len(v) for v in result.values())
+	print(f'{len(data)} bytes, {kept} mirrors kept')
+	print(f'validate all:  {baseline * 1000:.2f}ms')
+	print(f'filter first:  {lean * 1000:.2f}ms ({baseline / lean:.1f}x)')
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
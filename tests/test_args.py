@@ -6,7 +6,7 @@ from pathlib import Path
 from pytest import MonkeyPatch
 
 from archinstall.default_profiles.profile import CustomSetting, GreeterType
-from archinstall.lib.args import ArchConfig, ArchConfigHandler, Arguments
+from archinstall.lib.args import ArchConfig, ArchConfigHandler, Arguments, MirrorsCommand, SubCommand
 from archinstall.lib.hardware import GfxDriver
 from archinstall.lib.models.application import (
 	ApplicationConfiguration,
@@ -443,3 +443,32 @@ def test_example_config_partitions(example_config_fixture: Path) -> None:
 				assert start >= previous_end
 
 			previous_end = end
+
+
+def test_mirrors_rank_args(monkeypatch: MonkeyPatch) -> None:
+	monkeypatch.setattr(
+		'sys.argv',
+		[
+			'archinstall',
+			'mirrors',
+			'rank',
+			'--regions',
+			'Germany',
+			'Netherlands',
+			'--limit',
+			'5',
+			'--mirrorlist',
+			'--output',
+			'/tmp/mirrorlist',
+		],
+	)
+	handler = ArchConfigHandler()
+	args = handler.args
+
+	assert args.command == SubCommand.MIRRORS
+	assert args.mirrors_command == MirrorsCommand.RANK
+	assert args.rank_regions == ['Germany', 'Netherlands']
+	assert args.rank_limit == 5
+	assert args.rank_mirrorlist is True
+	assert args.rank_output == Path('/tmp/mirrorlist')
+	assert args.rank_workers == 8
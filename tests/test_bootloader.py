@@ -0,0 +1,221 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from archinstall.lib import installer
+from archinstall.lib.hardware import SysInfo
+from archinstall.lib.installer import Installer
+from archinstall.lib.log import logger
+from archinstall.lib.models.device import (
+	DiskEncryption,
+	DiskLayoutConfiguration,
+	DiskLayoutType,
+	EncryptionType,
+	FilesystemType,
+	ModificationStatus,
+	PartitionFlag,
+	PartitionModification,
+	PartitionType,
+	SectorSize,
+	Size,
+	Unit,
+)
+from archinstall.lib.models.network import NetworkConfiguration, NicType
+from archinstall.lib.network.network_handler import mask_wait_online
+
+
+def _partition(dev_path: str, fs_type: FilesystemType, mountpoint: str, uuid: str | None = 'boot-uuid', **kwargs: Any) -> PartitionModification:
+	size = Size(1, Unit.GiB, SectorSize.default())
+	return PartitionModification(
+		ModificationStatus.CREATE,
+		PartitionType.PRIMARY,
+		size,
+		size,
+		fs_type,
+		dev_path=Path(dev_path),
+		mountpoint=Path(mountpoint),
+		uuid=uuid,
+		**kwargs,
+	)
+
+
+@pytest.fixture
+def grub_installer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Installer:
+	monkeypatch.setattr(installer, 'accessibility_tools_in_use', lambda: False)
+	monkeypatch.setattr(SysInfo, 'has_uefi', staticmethod(lambda: False))
+
+	installation = Installer(tmp_path, DiskLayoutConfiguration(DiskLayoutType.Manual))
+	installation.init_time = '2026-01-01_00-00-00'
+	monkeypatch.setattr(installation, '_get_kernel_params', lambda root, **kwargs: ['root=PARTUUID=root-partuuid', 'rw'])
+	monkeypatch.setattr(installation, '_get_microcode', lambda: Path('intel-ucode.img'))
+
+	(tmp_path / 'etc/default').mkdir(parents=True)
+	(tmp_path / 'etc/default/grub').write_text('GRUB_TIMEOUT=3\nGRUB_CMDLINE_LINUX_DEFAULT="loglevel=3 quiet"\n')
+	(tmp_path / 'boot').mkdir()
+
+	for image in ('initramfs-linux.img', 'initramfs-linux-fallback.img', 'intel-ucode.img'):
+		(tmp_path / 'boot' / image).write_bytes(b'')
+
+	return installation
+
+
+def _grub_cfg(installation: Installer) -> str:
+	return (installation.target / 'boot/grub/grub.cfg').read_text()
+
+
+def test_grub_config_bios(grub_installer: Installer) -> None:
+	boot = _partition('/dev/sda1', FilesystemType.EXT4, '/boot')
+	root = _partition('/dev/sda2', FilesystemType.EXT4, '/', uuid='root-uuid')
+
+	# the microcode hook embeds the microcode into the initramfs
+	assert grub_installer._write_grub_config(boot, root, None)
+	config = _grub_cfg(grub_installer)
+
+	assert 'insmod ext2\n' in config
+	assert 'set timeout=3\n' in config
+	assert 'search --no-floppy --fs-uuid --set=root boot-uuid\n' in config
+	assert "menuentry 'Arch Linux (linux)' --class arch --class gnu-linux --class os {\n" in config
+	assert '\tlinux /vmlinuz-linux root=PARTUUID=root-partuuid rw loglevel=3 quiet\n' in config
+	assert '\tinitrd /initramfs-linux.img\n' in config
+	assert '\tinitrd /initramfs-linux-fallback.img\n' in config
+
+	grub_installer._hooks.remove('microcode')
+	assert grub_installer._write_grub_config(boot, root, None)
+	assert '\tinitrd /intel-ucode.img /initramfs-linux.img\n' in _grub_cfg(grub_installer)
+
+	(grub_installer.target / 'boot/intel-ucode.img').unlink()
+	assert grub_installer._write_grub_config(boot, root, None)
+	assert '\tinitrd /initramfs-linux.img\n' in _grub_cfg(grub_installer)
+
+	# only the images that were built get an entry
+	(grub_installer.target / 'boot/initramfs-linux-fallback.img').unlink()
+	assert grub_installer._write_grub_config(boot, root, None)
+	assert 'fallback' not in _grub_cfg(grub_installer)
+
+
+def test_grub_config_uki(grub_installer: Installer, monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(SysInfo, 'has_uefi', staticmethod(lambda: True))
+
+	esp = _partition('/dev/nvme0n1p1', FilesystemType.FAT32, '/efi', uuid='AAAA-BBBB', flags=[PartitionFlag.ESP])
+	boot = _partition('/dev/nvme0n1p2', FilesystemType.EXT4, '/boot')
+	root = _partition('/dev/nvme0n1p3', FilesystemType.EXT4, '/', uuid='root-uuid')
+
+	assert grub_installer._write_grub_config(boot, root, esp, uki_enabled=True)
+	config = _grub_cfg(grub_installer)
+
+	# the UKIs are looked up on the ESP, not on /boot
+	assert 'insmod fat\n' in config
+	assert 'search --no-floppy --fs-uuid --set=root AAAA-BBBB\n' in config
+	assert "menuentry 'Arch Linux (linux)' --class arch --class gnu-linux --class os {\n\tchainloader /EFI/Linux/arch-linux.efi\n}\n" in config
+	assert 'initrd' not in config
+
+
+def test_grub_config_mkconfig_fallback(grub_installer: Installer, monkeypatch: pytest.MonkeyPatch) -> None:
+	root = _partition('/dev/sda2', FilesystemType.EXT4, '/', uuid='root-uuid')
+	boot = _partition('/dev/sda1', FilesystemType.EXT4, '/boot')
+
+	# /boot on the root file system
+	assert not grub_installer._write_grub_config(root, root, None)
+	# file systems GRUB needs further modules or setup for
+	assert not grub_installer._write_grub_config(_partition('/dev/sda1', FilesystemType.BTRFS, '/boot'), root, None)
+	# no UUID to search for
+	assert not grub_installer._write_grub_config(_partition('/dev/sda1', FilesystemType.EXT4, '/boot', uuid=None), root, None)
+	# an encrypted /boot
+	grub_installer._disk_encryption = DiskEncryption(EncryptionType.LUKS, partitions=[boot])
+	assert not grub_installer._write_grub_config(boot, root, None)
+	grub_installer._disk_encryption = DiskEncryption()
+
+	# UKIs without an ESP
+	with monkeypatch.context() as uefi:
+		uefi.setattr(SysInfo, 'has_uefi', staticmethod(lambda: True))
+		assert not grub_installer._write_grub_config(boot, root, None, uki_enabled=True)
+
+	# no initramfs images were built
+	for image in ('initramfs-linux.img', 'initramfs-linux-fallback.img'):
+		(grub_installer.target / 'boot' / image).unlink()
+	assert not grub_installer._write_grub_config(boot, root, None)
+
+	assert not (grub_installer.target / 'boot/grub/grub.cfg').exists()
+
+
+def _hooks(installation: Installer) -> str:
+	installation.mkinitcpio(['-P'])
+	config = (installation.target / 'etc/mkinitcpio.conf').read_text()
+	return config.partition('\nHOOKS=(')[2].partition(')')[0]
+
+
+def test_fast_boot_hooks(grub_installer: Installer) -> None:
+	mkinitcpio_conf = grub_installer.target / 'etc/mkinitcpio.conf'
+	mkinitcpio_conf.write_text('# mkinitcpio.conf\nMODULES=()\nBINARIES=()\nFILES=()\nHOOKS=(base udev)\n')
+	grub_installer._fast_boot = True
+
+	# nothing has to be typed in and the GPU driver is loaded from the root file system
+	assert _hooks(grub_installer) == 'base systemd autodetect microcode modconf block filesystems fsck'
+
+	grub_installer._hooks.insert(grub_installer._hooks.index('block'), 'plymouth')
+	assert _hooks(grub_installer) == 'base systemd autodetect microcode modconf kms plymouth block filesystems fsck'
+	grub_installer._hooks.remove('plymouth')
+
+	# the passphrase prompt needs the keyboard and the keymap
+	grub_installer._disk_encryption = DiskEncryption(EncryptionType.LUKS, partitions=[_partition('/dev/sda2', FilesystemType.EXT4, '/')])
+	grub_installer._prepare_encrypt()
+	assert _hooks(grub_installer) == 'base udev autodetect microcode modconf keyboard keymap consolefont block encrypt filesystems fsck'
+
+	grub_installer._fast_boot = False
+	assert _hooks(grub_installer) == 'base udev autodetect microcode modconf kms keyboard keymap consolefont block encrypt filesystems fsck'
+
+
+def test_fast_boot_timeouts(grub_installer: Installer, monkeypatch: pytest.MonkeyPatch) -> None:
+	commands: list[str] = []
+	monkeypatch.setattr(installer, 'SysCommand', lambda cmd, **kwargs: commands.append(str(cmd)))
+	monkeypatch.setattr(installer, 'get_parent_device_path', lambda dev_path: Path('/dev/sda'))
+	monkeypatch.setattr(installer, 'installed_package', lambda package: None)
+	monkeypatch.setattr(grub_installer.pacman, 'strap', lambda packages: None)
+	monkeypatch.setattr(grub_installer, 'arch_chroot', lambda cmd, **kwargs: commands.append(cmd))
+	grub_installer._fast_boot = True
+
+	boot = _partition('/dev/sda1', FilesystemType.EXT4, '/boot')
+	root = _partition('/dev/sda2', FilesystemType.EXT4, '/', uuid='root-uuid')
+
+	grub_installer._add_grub_bootloader(boot, root, None)
+	assert 'GRUB_TIMEOUT=0\n' in (grub_installer.target / 'etc/default/grub').read_text()
+	assert 'set timeout=0\n' in _grub_cfg(grub_installer)
+	assert not any('grub-mkconfig' in command for command in commands)
+
+	monkeypatch.setattr(SysInfo, 'has_uefi', staticmethod(lambda: True))
+	esp = _partition('/dev/sda1', FilesystemType.FAT32, '/boot', uuid='AAAA-BBBB', flags=[PartitionFlag.ESP])
+	loader_conf = grub_installer.target / 'boot/loader/loader.conf'
+	loader_conf.parent.mkdir(parents=True)
+	loader_conf.write_text('#timeout 3\n#console-mode keep\n')
+
+	grub_installer._add_systemd_bootloader(esp, root, esp, uki_enabled=True)
+	assert loader_conf.read_text() == '#console-mode keep\ntimeout 0\n'
+
+
+def test_boot_report(grub_installer: Installer, monkeypatch: pytest.MonkeyPatch) -> None:
+	enabled: list[str] = []
+	monkeypatch.setattr(grub_installer, 'enable_service', enabled.append)
+	(grub_installer.target / 'etc/systemd/system').mkdir(parents=True)
+
+	grub_installer.add_boot_report()
+
+	report = logger.directory / 'first-boot-analyze.txt'
+	unit = (grub_installer.target / 'etc/systemd/system/archinstall-boot-report.service').read_text()
+
+	assert enabled == ['archinstall-boot-report.service']
+	assert f'ConditionPathExists=!{report}\n' in unit
+	assert f'until systemd-analyze time > {report}.tmp' in unit
+	assert f'systemd-analyze blame >> {report}.tmp; mv {report}.tmp {report}' in unit
+	assert 'WantedBy=multi-user.target\n' in unit
+	assert (grub_installer.target / str(logger.directory).lstrip('/')).is_dir()
+
+
+def test_mask_wait_online(grub_installer: Installer, monkeypatch: pytest.MonkeyPatch) -> None:
+	masked: list[str] = []
+	monkeypatch.setattr(grub_installer, 'mask_service', masked.append)
+
+	mask_wait_online(NetworkConfiguration(NicType.NM), grub_installer)
+	mask_wait_online(NetworkConfiguration(NicType.ISO), grub_installer)
+
+	assert masked == ['NetworkManager-wait-online.service', 'systemd-networkd-wait-online.service']
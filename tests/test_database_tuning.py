@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from archinstall.lib.database_tuning import DatabaseResources, _mount_of, mariadb_settings, postgresql_settings
+from archinstall.lib.disk.fstab import TargetMount
+
+
+def test_database_settings() -> None:
+	# 32GiB of memory and 16 cores on an SSD
+	ssd = DatabaseResources(mem_total=32 * 1024**2, cores=16, rotational=False)
+
+	postgresql = postgresql_settings(ssd)
+	assert postgresql['shared_buffers'] == '8192MB'
+	assert postgresql['effective_cache_size'] == '24576MB'
+	assert postgresql['maintenance_work_mem'] == '2048MB'
+	assert postgresql['max_worker_processes'] == '16'
+	assert postgresql['max_parallel_workers_per_gather'] == '4'
+	assert postgresql['random_page_cost'] == '1.1'
+
+	hdd = DatabaseResources(mem_total=2 * 1024**2, cores=2, rotational=True)
+	assert postgresql_settings(hdd)['max_worker_processes'] == '8'
+	assert postgresql_settings(hdd)['random_page_cost'] == '4.0'
+
+	mariadb = mariadb_settings(ssd, Path('/srv/fast/mysql-redo'))
+	assert mariadb['innodb_buffer_pool_size'] == '16384M'
+	assert mariadb['innodb_log_file_size'] == '2048M'
+	assert mariadb['innodb_flush_neighbors'] == '0'
+	assert mariadb['innodb_log_group_home_dir'] == '/srv/fast/mysql-redo'
+	assert 'innodb_log_group_home_dir' not in mariadb_settings(hdd)
+
+
+def test_data_dir_mount() -> None:
+	mounts = [
+		TargetMount(Path('/'), 'btrfs', '/dev/sda2'),
+		TargetMount(Path('/var'), 'xfs', '/dev/sdb1'),
+		TargetMount(Path('/var/lib'), 'ext4', '/dev/nvme0n1p1'),
+	]
+
+	assert _mount_of(mounts, Path('/var/lib/postgres/data')) == mounts[2]
+	assert _mount_of(mounts, Path('/var/log')) == mounts[1]
+	assert _mount_of(mounts, Path('/srv')) == mounts[0]
@@ -0,0 +1,220 @@
+import struct
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from archinstall.lib.disk import fs_tuning, wipe
+from archinstall.lib.disk.fs_tuning import DeviceTopology, advise_mount_options, mkfs_tuning
+from archinstall.lib.disk.fstab import fstab_entries
+from archinstall.lib.disk.udev import parse_uevent
+from archinstall.lib.disk.utils import LsblkOutput, _LsblkSnapshot
+from archinstall.lib.models.device import (
+	DiskLayoutConfiguration,
+	DiskLayoutType,
+	FilesystemType,
+	LsblkInfo,
+	LvmConfiguration,
+	LvmGroupInfo,
+	LvmLayoutType,
+	LvmVolume,
+	LvmVolumeGroup,
+	ModificationStatus,
+	PartitionFlag,
+	PartitionModification,
+	PartitionType,
+	PbkdfParams,
+	SectorSize,
+	Size,
+	SubvolumeModification,
+	Unit,
+	WipeMode,
+)
+
+
+def _udev_message(properties: dict[str, str]) -> bytes:
+	payload = b''.join(f'{key}={value}'.encode() + b'\0' for key, value in properties.items())
+	header_size = 40
+	header = b'libudev\0' + struct.pack('>I', 0xFEEDCAFE) + struct.pack('=III', header_size, header_size, len(payload))
+	return header.ljust(header_size, b'\0') + payload
+
+
+def test_parse_udev_uevent() -> None:
+	message = _udev_message({'ACTION': 'change', 'DEVNAME': '/dev/sda1', 'SUBSYSTEM': 'block', 'ID_FS_UUID': '1234-ABCD'})
+
+	assert parse_uevent(message) == {'ACTION': 'change', 'DEVNAME': '/dev/sda1', 'SUBSYSTEM': 'block', 'ID_FS_UUID': '1234-ABCD'}
+	assert parse_uevent(b'libudev\0' + struct.pack('>I', 0xDEADBEEF) + bytes(28)) is None
+
+
+def test_parse_kernel_uevent() -> None:
+	message = b'add@/devices/virtual/block/loop0\0ACTION=add\0DEVNAME=loop0\0SUBSYSTEM=block\0'
+
+	assert parse_uevent(message) == {'ACTION': 'add', 'DEVNAME': 'loop0', 'SUBSYSTEM': 'block'}
+
+
+def _lsblk_entry(name: str, pkname: str | None = None, **fields: Any) -> dict[str, Any]:
+	entry: dict[str, Any] = {field: None for field in LsblkInfo.fields()}
+	entry.update(
+		{
+			'name': name,
+			'path': f'/dev/{name}',
+			'pkname': pkname,
+			'log-sec': 512,
+			'size': 1024,
+			'rota': False,
+			'type': 'part' if pkname else 'disk',
+			'mountpoints': [],
+			'fsroots': [],
+		}
+	)
+	entry.update(fields)
+	return entry
+
+
+def test_lsblk_snapshot_indexes() -> None:
+	disk = _lsblk_entry('sda')
+	disk['children'] = [
+		_lsblk_entry('sda1', 'sda', uuid='AAAA-BBBB', partuuid='1111', mountpoint='/mnt/boot', mountpoints=['/mnt/boot']),
+		_lsblk_entry('sda2', 'sda', uuid='cccc', partuuid='2222', mountpoint='/mnt', mountpoints=['/mnt', '/mnt/home']),
+	]
+	output = LsblkOutput.model_validate({'blockdevices': [disk]})
+
+	snapshot = _LsblkSnapshot(output.blockdevices)
+
+	assert snapshot.find(Path('/dev/sda1')) is not None
+	assert snapshot.find(Path('/dev/sdb')) is None
+	assert snapshot.by_uuid['cccc'].name == 'sda2'
+	assert snapshot.by_partuuid['1111'].name == 'sda1'
+	assert [info.name for info in snapshot.by_mountpoint[Path('/mnt/home')]] == ['sda2']
+	assert snapshot.parents[Path('/dev/sda2')].path == Path('/dev/sda')
+	assert Path('/dev/sda') not in snapshot.parents
+
+
+def test_pbkdf_params() -> None:
+	pbkdf = PbkdfParams.parse_arg({'iterations': 4, 'memory': 524288, 'parallel': 2})
+
+	assert pbkdf.json() == {'iterations': 4, 'memory': 524288, 'parallel': 2}
+	assert pbkdf.cryptsetup_args() == ['--pbkdf-force-iterations', '4', '--pbkdf-memory', '524288', '--pbkdf-parallel', '2']
+
+
+@pytest.mark.parametrize(
+	('queue', 'expected'),
+	[
+		({'rotational': '0', 'discard_max_bytes': '2147450880', 'write_zeroes_max_bytes': '0'}, WipeMode.Discard),
+		({'rotational': '1', 'discard_max_bytes': '0', 'write_zeroes_max_bytes': '33550336'}, WipeMode.ZeroOut),
+		({'rotational': '1', 'discard_max_bytes': '0', 'write_zeroes_max_bytes': '0'}, WipeMode.Overwrite),
+	],
+)
+def test_resolve_wipe_mode(monkeypatch: pytest.MonkeyPatch, queue: dict[str, str], expected: WipeMode) -> None:
+	monkeypatch.setattr(wipe, 'block_queue_attr', lambda dev_path, attr: queue.get(attr))
+
+	assert wipe.resolve_wipe_mode(Path('/dev/sda'), WipeMode.Auto) == expected
+	assert wipe.resolve_wipe_mode(Path('/dev/sda'), WipeMode.ZeroOut) == WipeMode.ZeroOut
+
+
+def test_mkfs_tuning_striped() -> None:
+	# RAID0 with 512KiB chunks over two 512e disks
+	topology = DeviceTopology(logical_block_size=512, physical_block_size=4096, minimum_io_size=524288, optimal_io_size=1048576)
+
+	assert topology.striped
+	assert mkfs_tuning(FilesystemType.EXT4, topology) == ['-b', '4096', '-E', 'lazy_itable_init=1,lazy_journal_init=1,stride=128,stripe_width=256']
+	assert mkfs_tuning(FilesystemType.XFS, topology) == ['-d', 'su=524288,sw=2']
+	assert mkfs_tuning(FilesystemType.FAT32, topology, 1024**3) == ['-S', '512', '-s', '8']
+	# 65536 4KiB blocks, but the FATs and reserved sectors leave too few clusters for FAT32
+	assert mkfs_tuning(FilesystemType.FAT32, topology, 256 * 1024**2) == ['-S', '512']
+	assert mkfs_tuning(FilesystemType.XFS, DeviceTopology()) == []
+
+
+def test_advise_mount_options(monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(fs_tuning, 'zstd_level', lambda write_rate: 1 if write_rate > 1024**3 else 3)
+
+	nvme = DeviceTopology(rotational=False, discard=True, nvme=True)
+	hdd = DeviceTopology()
+
+	assert advise_mount_options(FilesystemType.BTRFS, nvme, ['compress=zstd']) == ['compress=zstd:1', 'noatime', 'ssd', 'discard=async']
+	assert advise_mount_options(FilesystemType.BTRFS, hdd, ['compress=zstd', 'relatime']) == ['compress=zstd:3', 'relatime', 'nossd']
+	assert advise_mount_options(FilesystemType.EXT4, nvme, []) == ['noatime']
+	assert advise_mount_options(FilesystemType.FAT32, nvme, []) == []
+
+
+def test_striped_lvm_volume() -> None:
+	volume = LvmVolume(
+		status=ModificationStatus.CREATE,
+		name='root',
+		fs_type=FilesystemType.XFS,
+		length=Size(64, Unit.GiB, SectorSize.default()),
+		mountpoint=Path('/'),
+		stripes=4,
+		stripe_size=Size(256, Unit.KiB, SectorSize.default()),
+	)
+
+	parsed = LvmVolume.parse_arg(volume.json())
+
+	assert parsed.stripes == 4
+	assert parsed.stripe_size == volume.stripe_size
+	assert 'stripes' not in LvmVolume.parse_arg({**volume.json(), 'stripes': 1}).json()
+
+
+def test_setup_lvm_offsets(monkeypatch: pytest.MonkeyPatch) -> None:
+	# the device handler probes the devices of this machine when it's imported
+	from archinstall.lib.disk import filesystem
+
+	def size(value: int, unit: Unit) -> Size:
+		return Size(value, unit, SectorSize.default())
+
+	def partition(dev_path: str, length: Size) -> PartitionModification:
+		return PartitionModification(ModificationStatus.CREATE, PartitionType.PRIMARY, size(1, Unit.MiB), length, FilesystemType.XFS, dev_path=Path(dev_path))
+
+	def volume(name: str, length: Size) -> LvmVolume:
+		return LvmVolume(ModificationStatus.CREATE, name, FilesystemType.XFS, length, Path(f'/{name}'), stripes=2)
+
+	created: dict[str, Size | None] = {}
+	vg_size = size(1396, Unit.GiB)
+
+	monkeypatch.setattr(filesystem, 'lvm_pv_create', lambda pvs: None)
+	monkeypatch.setattr(filesystem, 'lvm_vg_create', lambda pvs, name: None)
+	monkeypatch.setattr(filesystem, 'lvm_group_info', lambda name: LvmGroupInfo(vg_size=vg_size, vg_uuid='uuid'))
+	monkeypatch.setattr(filesystem, 'lvm_vols_create', lambda vg_name, offsets: created.update({lv.name: offset for lv, offset in offsets.items()}))
+
+	# a 500GB and a 1TB disk, the striped volumes take 465GiB from each of them
+	pvs = [partition('/dev/sda1', size(465, Unit.GiB)), partition('/dev/sdb1', size(931, Unit.GiB))]
+	vg = LvmVolumeGroup('ArchinstallVg', pvs, [volume('root', size(64, Unit.GiB)), volume('home', size(866, Unit.GiB))])
+	handler = filesystem.FilesystemHandler(DiskLayoutConfiguration(DiskLayoutType.Default))
+
+	handler._setup_lvm(LvmConfiguration(LvmLayoutType.Default, [vg]))
+	assert created == {'root': None, 'home': None}
+
+	# the group metadata takes some space, the largest volume gives it up in whole extents of every stripe
+	vg_size = size(929, Unit.GiB) + size(1020, Unit.MiB)
+	handler._setup_lvm(LvmConfiguration(LvmLayoutType.Default, [vg]))
+	assert created == {'root': None, 'home': size(8, Unit.MiB)}
+
+
+def test_fstab_entries() -> None:
+	def partition(dev_path: str, uuid: str, fs_type: FilesystemType, **kwargs: Any) -> PartitionModification:
+		size = Size(1, Unit.GiB, SectorSize.default())
+		return PartitionModification(ModificationStatus.CREATE, PartitionType.PRIMARY, size, size, fs_type, dev_path=Path(dev_path), uuid=uuid, **kwargs)
+
+	partitions = [
+		partition('/dev/sda1', 'AAAA-BBBB', FilesystemType.FAT32, mountpoint=Path('/boot'), flags=[PartitionFlag.ESP]),
+		partition('/dev/sda2', 'swap-uuid', FilesystemType.LINUX_SWAP),
+		partition(
+			'/dev/sda3',
+			'root-uuid',
+			FilesystemType.BTRFS,
+			mount_options=['compress=zstd:3'],
+			btrfs_subvols=[SubvolumeModification('@home', Path('/home')), SubvolumeModification('@', Path('/'))],
+		),
+	]
+	disk_config = DiskLayoutConfiguration(DiskLayoutType.Default, [SimpleNamespace(partitions=partitions)])  # type: ignore[list-item]
+
+	entries = fstab_entries(disk_config)
+
+	assert entries is not None
+	assert [entry.line() for entry in entries] == [
+		'# /dev/sda3\nUUID=root-uuid\t/\tbtrfs\tcompress=zstd:3,subvol=@\t0 0\n',
+		'# /dev/sda1\nUUID=AAAA-BBBB\t/boot\tvfat\tfmask=0077,dmask=0077\t0 2\n',
+		'# /dev/sda3\nUUID=root-uuid\t/home\tbtrfs\tcompress=zstd:3,subvol=@home\t0 0\n',
+		'# /dev/sda2\nUUID=swap-uuid\tnone\tswap\tdefaults\t0 0\n',
+	]
@@ -0,0 +1,154 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib import initramfs
+from archinstall.lib.benchmark import compression_sample
+from archinstall.lib.exceptions import SysCallError
+from archinstall.lib.hardware import MemInfo
+from archinstall.lib.initramfs import MKINITCPIO_PACMAN_HOOK, InitramfsBuilder, select_compression
+from archinstall.lib.models.bootloader import InitramfsCompression
+
+
+class _Output:
+	def __init__(self, cmd: str) -> None:
+		self._cmd = cmd
+
+	def output(self) -> bytes:
+		return f'{self._cmd}\n'.encode()
+
+
+def _builder(target: Path, builds: list[str], failing: str | None = None) -> InitramfsBuilder:
+	def run(cmd: str, peek_output: bool) -> _Output:
+		builds.append(cmd)
+		if failing and cmd.endswith(failing):
+			raise SysCallError(cmd, 1, b'==> ERROR: module not found\n')
+		return _Output(cmd)
+
+	return InitramfsBuilder(target, run, target)  # type: ignore[arg-type]
+
+
+def test_initramfs_builds_deduplicated(tmp_path: Path) -> None:
+	builds: list[str] = []
+	builder = _builder(tmp_path, builds)
+
+	(tmp_path / 'etc').mkdir()
+	(tmp_path / 'etc/mkinitcpio.conf').write_text('HOOKS=(base udev)\n')
+	modules = tmp_path / 'usr/lib/modules/6.12.1-arch1-1'
+	modules.mkdir(parents=True)
+	(modules / 'modules.dep').write_text('')
+
+	hook_dir = builder.mask_pacman_hook()
+	assert os.readlink(hook_dir / MKINITCPIO_PACMAN_HOOK) == os.devnull
+
+	# requests are only built once flushed, and only if an input changed
+	builder.request()
+	builder.request()
+	assert builds == []
+	assert builder.flush()
+	builder.request()
+	assert builder.flush()
+	assert builds == ['mkinitcpio -P']
+
+	(tmp_path / 'etc/mkinitcpio.conf').write_text('HOOKS=(base udev plymouth)\n')
+	builder.request()
+	assert builder.flush()
+	assert len(builds) == 2
+
+	# modules installed after the last build are picked up at the end
+	os.utime(modules / 'modules.dep', ns=(0, 0))
+	assert builder.finalize()
+	assert len(builds) == 3
+	assert not (hook_dir / MKINITCPIO_PACMAN_HOOK).is_symlink()
+
+
+def test_initramfs_presets_built_concurrently(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(initramfs.os, 'cpu_count', lambda: 8)
+	monkeypatch.setattr(initramfs, 'read_meminfo', lambda: MemInfo(mem_total=16 * 1024**2, mem_free=0, mem_available=16 * 1024**2))
+
+	builds: list[str] = []
+	builder = _builder(tmp_path, builds, failing='linux-zen')
+
+	presets = tmp_path / 'etc/mkinitcpio.d'
+	presets.mkdir(parents=True)
+	for kernel in ('linux', 'linux-lts', 'linux-zen'):
+		(presets / f'{kernel}.preset').write_text(f"ALL_kver='/boot/vmlinuz-{kernel}'\n")
+
+	assert builder.build_slots(3) == 3
+	builder.request()
+	assert not builder.flush()
+
+	assert sorted(builds) == ['mkinitcpio -p linux', 'mkinitcpio -p linux-lts', 'mkinitcpio -p linux-zen']
+	assert (tmp_path / 'mkinitcpio-linux-lts.log').read_text() == 'mkinitcpio -p linux-lts\n'
+	assert (tmp_path / 'mkinitcpio-linux-zen.log').read_text() == '==> ERROR: module not found\n'
+
+
+def test_initramfs_kernels_installed_before_build(tmp_path: Path) -> None:
+	builds: list[str] = []
+	builder = _builder(tmp_path, builds)
+
+	modules = tmp_path / 'usr/lib/modules/6.12.1-arch1-1'
+	modules.mkdir(parents=True)
+	(modules / 'vmlinuz').write_bytes(b'kernel')
+	(modules / 'pkgbase').write_text('linux\n')
+	template = tmp_path / 'usr/share/mkinitcpio/hook.preset'
+	template.parent.mkdir(parents=True)
+	template.write_text("ALL_kver='/boot/vmlinuz-%PKGBASE%'\n")
+
+	builder.mask_pacman_hook()
+	builder.request()
+	assert builder.flush()
+
+	# the preset exists by the time the build runs, so it's built by name
+	assert builds == ['mkinitcpio -p linux']
+	assert (tmp_path / 'boot/vmlinuz-linux').read_bytes() == b'kernel'
+	assert (tmp_path / 'etc/mkinitcpio.d/linux.preset').read_text() == "ALL_kver='/boot/vmlinuz-linux'\n"
+
+	# an updated kernel replaces the installed one
+	(modules / 'vmlinuz').write_bytes(b'kernel 2')
+	builder.install_kernels()
+	assert (tmp_path / 'boot/vmlinuz-linux').read_bytes() == b'kernel 2'
+
+
+def test_select_initramfs_compression(monkeypatch: pytest.MonkeyPatch) -> None:
+	# compressed size of a 4MiB sample and the time to unpack it
+	results = {
+		InitramfsCompression.ZSTD_1: (1.6 * 1024**2, 0.004),
+		InitramfsCompression.ZSTD_3: (1.45 * 1024**2, 0.0045),
+		InitramfsCompression.ZSTD_9: (1.3 * 1024**2, 0.005),
+		InitramfsCompression.ZSTD_19: (1.1 * 1024**2, 0.0055),
+		InitramfsCompression.LZ4: (2 * 1024**2, 0.002),
+		InitramfsCompression.XZ: (1024**2, 0.04),
+		InitramfsCompression.NONE: (4 * 1024**2, 0.0),
+	}
+	monkeypatch.setattr(initramfs, '_benchmark', lambda compression, sample: results.get(compression))
+	sample = bytes(4 * 1024**2)
+
+	# reading dominates on slow devices, unpacking on fast ones
+	assert select_compression(sample, 1024**2) == InitramfsCompression.XZ
+	assert select_compression(sample, 800 * 1024**2) == InitramfsCompression.LZ4
+	assert select_compression(sample, 10**15) == InitramfsCompression.NONE
+
+	# compressions that can't be benchmarked are left out
+	del results[InitramfsCompression.LZ4]
+	assert select_compression(sample, 800 * 1024**2) == InitramfsCompression.NONE
+	assert select_compression(b'', 800 * 1024**2) == InitramfsCompression.ZSTD_3
+
+	assert InitramfsCompression.ZSTD_9.mkinitcpio_options() == ('zstd', ['-9', '-T0'])
+	assert InitramfsCompression.NONE.mkinitcpio_options() == ('cat', [])
+
+
+def test_initramfs_compression_benchmark(tmp_path: Path) -> None:
+	bash = tmp_path / 'usr/bin/bash'
+	bash.parent.mkdir(parents=True)
+	bash.write_bytes(b''.join(f'export VAR_{i}="{i * 7919}"\n'.encode() for i in range(10000)))
+
+	sample = compression_sample(tmp_path, 64 * 1024)
+	assert len(sample) == 64 * 1024
+
+	result = initramfs._benchmark(InitramfsCompression.XZ, sample)
+	assert result is not None
+	size, decompress_time = result
+	assert 0 < size < len(sample)
+	assert decompress_time > 0
@@ -1,6 +1,16 @@
+import io
+import json
+import tarfile
 from pathlib import Path
 
+import pytest
+
+from archinstall.lib.mirror import segmented_download
 from archinstall.lib.mirror.mirror_handler import MirrorListHandler
+from archinstall.lib.mirror.mirror_health import MirrorHealthMonitor
+from archinstall.lib.mirror.mirror_ranking import latency_cluster
+from archinstall.lib.mirror.segmented_download import failure_line, mirror_urls, progress_line, split_ranges, sync_db_checksum
+from archinstall.lib.models.mirrors import MirrorConfiguration, MirrorSelectionMode
 
 
 def test_mirrorlist_no_country(mirrorlist_no_country_fixture: Path) -> None:
@@ -48,3 +58,194 @@ def test_mirrorlist_multiple_countries(mirrorlist_multiple_countries_fixture: Pa
 	assert regions[1].urls == [
 		'https://au.mirror.pkgbuild.com/$repo/os/$arch',
 	]
+
+
+def test_auto_mirrors_local_fallback(mirrorlist_multiple_countries_fixture: Path) -> None:
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_multiple_countries_fixture, offline=True)
+
+	mirrors = handler.get_auto_mirrors()
+
+	assert [mirror.server_url for mirror in mirrors] == [
+		'https://geo.mirror.pkgbuild.com/$repo/os/$arch',
+		'https://america.mirror.pkgbuild.com/$repo/os/$arch',
+		'https://au.mirror.pkgbuild.com/$repo/os/$arch',
+	]
+
+
+def test_latency_cluster() -> None:
+	latencies = {'DE': 12.0, 'NL': 15.5, 'FR': 19.0, 'US': 95.0, 'AU': 290.0}
+
+	assert latency_cluster(latencies) == ['DE', 'NL', 'FR']
+	assert latency_cluster(latencies, max_size=2) == ['DE', 'NL']
+	assert latency_cluster({}) == []
+
+
+def test_mirror_selection_mode_parsing() -> None:
+	config = MirrorConfiguration.parse_args({'selection_mode': 'auto'})
+
+	assert config.selection_mode == MirrorSelectionMode.Auto
+	assert config.json()['selection_mode'] == 'auto'
+	assert MirrorConfiguration.parse_args({}).selection_mode == MirrorSelectionMode.Manual
+
+
+def _status_document(mirrorlist: Path) -> bytes:
+	urls = []
+
+	for line in mirrorlist.read_text().splitlines():
+		if not line.startswith('Server = '):
+			continue
+
+		url = line.removeprefix('Server = ').removesuffix('$repo/os/$arch')
+		entry = {
+			'url': url,
+			'protocol': 'https',
+			'active': True,
+			'country': 'United States',
+			'country_code': 'US',
+			'isos': True,
+			'ipv4': True,
+			'ipv6': True,
+			'details': url,
+			'last_sync': '2025-01-11T05:00:00Z',
+			'score': 1.5,
+		}
+
+		urls += [
+			entry,
+			entry | {'active': False},
+			entry | {'last_sync': None},
+			entry | {'score': 120.0},
+			entry | {'score': None},
+			entry | {'url': url.replace('https://', 'rsync://'), 'protocol': 'rsync'},
+			entry | {'country': ''},
+		]
+
+	document = {
+		'cutoff': 86400,
+		'last_check': '2025-01-11T05:17:17Z',
+		'num_checks': 1,
+		'urls': urls,
+		'version': 3,
+	}
+
+	return json.dumps(document).encode()
+
+
+def test_remote_mirrorlist_filtering(mirrorlist_multiple_countries_fixture: Path) -> None:
+	handler = MirrorListHandler()
+	data = _status_document(mirrorlist_multiple_countries_fixture)
+
+	regions = handler._parse_remote_mirror_list(data)
+
+	assert list(regions.keys()) == ['United States', 'Worldwide']
+	assert [m.url for m in regions['United States']] == [
+		'https://geo.mirror.pkgbuild.com/',
+		'https://america.mirror.pkgbuild.com/',
+		'https://au.mirror.pkgbuild.com/',
+	]
+	assert len(regions['Worldwide']) == 3
+	assert regions['Worldwide'][0]._hostname == 'geo.mirror.pkgbuild.com'
+
+
+def test_remote_mirrorlist_version_check() -> None:
+	handler = MirrorListHandler()
+
+	with pytest.raises(ValueError):
+		handler._parse_remote_mirror_list(json.dumps({'version': 2, 'urls': []}).encode())
+
+
+def test_mirror_health_demotion(tmp_path: Path, mirrorlist_multiple_countries_fixture: Path) -> None:
+	mirrorlist = tmp_path / 'mirrorlist'
+	mirrorlist.write_text(mirrorlist_multiple_countries_fixture.read_text())
+
+	monitor = MirrorHealthMonitor(mirrorlist)
+	assert monitor.primary == 'geo.mirror.pkgbuild.com'
+
+	monitor.feed(b"error: failed retrieving file 'linux-6.12.pkg.tar.zst' from geo.mirror.pkgbuild.com : Operation too slow.\n")
+	assert monitor.primary == 'america.mirror.pkgbuild.com'
+
+	# progress bars are redrawn with carriage returns
+	monitor.feed(b' linux-firmware   12.5 MiB  20.0 KiB/s 09:58 [##---]  10%\r', now=0)
+	monitor.feed(b' linux-firmware   12.6 MiB  18.0 KiB/s 09:59 [##---]  10%\r', now=25)
+
+	assert sorted(h.host for h in monitor.unhealthy) == ['america.mirror.pkgbuild.com', 'geo.mirror.pkgbuild.com']
+	assert monitor.demote_unhealthy()
+
+	servers = [line for line in mirrorlist.read_text().splitlines() if line.startswith('Server')]
+	assert servers == [
+		'Server = https://au.mirror.pkgbuild.com/$repo/os/$arch',
+		'Server = https://geo.mirror.pkgbuild.com/$repo/os/$arch',
+		'Server = https://america.mirror.pkgbuild.com/$repo/os/$arch',
+	]
+	assert monitor.primary == 'au.mirror.pkgbuild.com'
+	assert not monitor.unhealthy
+
+
+def test_mirror_health_never_demotes_all(tmp_path: Path, mirrorlist_no_country_fixture: Path) -> None:
+	mirrorlist = tmp_path / 'mirrorlist'
+	mirrorlist.write_text(mirrorlist_no_country_fixture.read_text())
+
+	monitor = MirrorHealthMonitor(mirrorlist)
+	monitor.feed(b'warning: too many errors from geo.mirror.pkgbuild.com, skipping for the remainder of this transaction\n')
+	monitor.feed(b'warning: too many errors from america.mirror.pkgbuild.com, skipping for the remainder of this transaction\n')
+
+	assert not monitor.demote_unhealthy()
+	assert mirrorlist.read_text() == mirrorlist_no_country_fixture.read_text()
+
+
+def test_segmented_download_mirror_urls() -> None:
+	templates = [
+		'https://geo.mirror.pkgbuild.com/$repo/os/$arch',
+		'https://america.mirror.pkgbuild.com/$repo/os/$arch',
+		'https://au.mirror.pkgbuild.com/$repo/os/$arch',
+	]
+
+	urls = mirror_urls('https://america.mirror.pkgbuild.com/extra/os/x86_64/nvidia-1.0-1-x86_64.pkg.tar.zst', templates)
+
+	assert urls == [
+		'https://america.mirror.pkgbuild.com/extra/os/x86_64/nvidia-1.0-1-x86_64.pkg.tar.zst',
+		'https://geo.mirror.pkgbuild.com/extra/os/x86_64/nvidia-1.0-1-x86_64.pkg.tar.zst',
+		'https://au.mirror.pkgbuild.com/extra/os/x86_64/nvidia-1.0-1-x86_64.pkg.tar.zst',
+	]
+	assert mirror_urls('https://example.com/other.pkg.tar.zst', templates) == ['https://example.com/other.pkg.tar.zst']
+
+
+def test_segmented_download_ranges() -> None:
+	assert split_ranges(10, 3) == [(0, 3), (4, 7), (8, 9)]
+	assert split_ranges(9, 3) == [(0, 2), (3, 5), (6, 8)]
+	assert split_ranges(2, 4) == [(0, 0), (1, 1)]
+
+
+def test_segmented_download_output_monitored(tmp_path: Path, mirrorlist_multiple_countries_fixture: Path) -> None:
+	mirrorlist = tmp_path / 'mirrorlist'
+	mirrorlist.write_text(mirrorlist_multiple_countries_fixture.read_text())
+	monitor = MirrorHealthMonitor(mirrorlist)
+
+	# pacman shows no progress bars for an XferCommand, the helper prints them in its format
+	url = 'https://geo.mirror.pkgbuild.com/extra/os/x86_64/nvidia-1.0-1-x86_64.pkg.tar.zst'
+	monitor.feed(failure_line(url, 'timed out').encode() + b'\n')
+	assert monitor.primary == 'america.mirror.pkgbuild.com'
+
+	monitor.feed(progress_line('nvidia-1.0-1-x86_64.pkg.tar.zst', 12 * 1024**2, 20 * 1024).encode() + b'\r', now=0)
+	monitor.feed(progress_line('nvidia-1.0-1-x86_64.pkg.tar.zst', 12 * 1024**2, 10).encode() + b'\r', now=25)
+	assert sorted(h.host for h in monitor.unhealthy) == ['america.mirror.pkgbuild.com', 'geo.mirror.pkgbuild.com']
+
+
+def test_sync_db_checksum(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	db = tmp_path / 'sync/extra.db'
+	db.parent.mkdir()
+
+	with tarfile.open(db, 'w:gz') as archive:
+		for name in ('nvidia', 'linux'):
+			desc = f'%FILENAME%\n{name}-1.0-1-x86_64.pkg.tar.zst\n\n%SHA256SUM%\n{name}-checksum\n'.encode()
+			member = tarfile.TarInfo(f'{name}-1.0-1/desc')
+			member.size = len(desc)
+			archive.addfile(member, io.BytesIO(desc))
+
+	monkeypatch.setattr(segmented_download.tempfile, 'gettempdir', lambda: str(tmp_path))
+	assert sync_db_checksum('linux-1.0-1-x86_64.pkg.tar.zst', 'extra', [tmp_path]) == 'linux-checksum'
+
+	# every download runs in its own process, the database is only read once
+	monkeypatch.setattr(segmented_download, '_read_sync_db', lambda db: pytest.fail('sync database read again'))
+	assert sync_db_checksum('nvidia-1.0-1-x86_64.pkg.tar.zst', 'extra', [tmp_path]) == 'nvidia-checksum'
+	assert sync_db_checksum('missing-1.0-1-x86_64.pkg.tar.zst', 'extra', [tmp_path]) is None
@@ -0,0 +1,30 @@
+from archinstall.applications.performance import dirty_writeback, io_scheduler, performance_settings
+from archinstall.lib.disk.fs_tuning import DeviceTopology
+from archinstall.lib.models.application import ApplicationConfiguration, PerformanceConfiguration, PerformanceTuning
+
+
+def test_performance_settings() -> None:
+	nvme = DeviceTopology(rotational=False, nvme=True)
+	hdd = DeviceTopology(rotational=True)
+
+	assert io_scheduler('nvme0n1', nvme, server=False) == 'none'
+	assert io_scheduler('sda', hdd, server=False) == 'bfq'
+	assert io_scheduler('sda', hdd, server=True) == 'mq-deadline'
+
+	# 64GiB of memory, a hard disk bounds the limits long before the memory does
+	assert dirty_writeback(hdd.write_rate, 64 * 1024**2) == {'vm.dirty_background_bytes': 150 * 1024**2, 'vm.dirty_bytes': 300 * 1024**2}
+	assert dirty_writeback(nvme.write_rate, 2 * 1024**2)['vm.dirty_background_bytes'] == int(0.05 * 2 * 1024**3)
+
+	config = PerformanceConfiguration(tunings=list(PerformanceTuning))
+	disks = {'nvme0n1': nvme, 'sda': hdd}
+
+	desktop = performance_settings(config, disks, 16 * 1024**2, server=False, power_management=False)
+	assert desktop.kernel_params == []
+	assert desktop.sysctls['vm.dirty_bytes'] == 300 * 1024**2
+	assert len(desktop.udev_rules) == 3
+
+	server = performance_settings(config, disks, 16 * 1024**2, server=True, power_management=True)
+	assert server.kernel_params == ['transparent_hugepage=madvise']
+
+	app_config = ApplicationConfiguration(performance_config=config)
+	assert ApplicationConfiguration.parse_arg(dict(app_config.json())) == app_config
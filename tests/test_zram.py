@@ -0,0 +1,35 @@
+from archinstall.lib.models.application import ZramAlgorithm, ZramBenchmark, ZramConfiguration
+from archinstall.lib.zram import select_algorithm, zram_size, zram_swappiness
+
+
+def test_select_zram_algorithm() -> None:
+	benchmarks = [
+		ZramBenchmark(ZramAlgorithm.LZ4, ratio=2.1, compress_rate=800 * 1024**2, decompress_rate=3000 * 1024**2),
+		ZramBenchmark(ZramAlgorithm.ZSTD, ratio=3.2, compress_rate=300 * 1024**2, decompress_rate=1500 * 1024**2),
+		# compresses best but swaps in too slowly
+		ZramBenchmark(ZramAlgorithm.LZ4HC, ratio=3.5, compress_rate=40 * 1024**2, decompress_rate=2900 * 1024**2),
+	]
+
+	assert select_algorithm(benchmarks).algorithm == ZramAlgorithm.ZSTD
+
+	# 16GiB of memory, compressed pages take up at most half of it
+	assert zram_size(3.2, 16 * 1024**2) == '16384'
+	assert zram_size(1.5, 16 * 1024**2) == '12288'
+
+	assert zram_swappiness(1500 * 1024**2, 150 * 1024**2) == 182
+	assert zram_swappiness(100 * 1024**2, 2000 * 1024**2) == 60
+
+
+def test_zram_configuration_roundtrip() -> None:
+	assert ZramConfiguration.parse_arg(True) == ZramConfiguration(enabled=True)
+
+	config = ZramConfiguration(
+		enabled=True,
+		algorithm=ZramAlgorithm.ZSTD,
+		size='12288',
+		swappiness=182,
+		benchmarks=(ZramBenchmark(ZramAlgorithm.ZSTD, ratio=3.2, compress_rate=1, decompress_rate=2),),
+	)
+
+	assert ZramConfiguration.parse_arg(dict(config.json())) == config
+	assert ZramConfiguration(enabled=True).json() == {'enabled': True, 'algorithm': 'zstd'}